@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Latency and peak-memory benchmarks for the manifest-dev hooks.
+
+Generates synthetic transcripts (see generate_transcript.py) from 1 KB up to
+1 GB and measures, for each size:
+
+- every hook entry point, run the way Claude Code runs it (a fresh
+  `hook_client.py <hook>` process, no daemon), and
+- the hook_utils transcript functions, each in a fresh worker process.
+
+Each measurement runs in its own process so peak RSS (from wait4) belongs to
+that call alone; it includes the interpreter itself and, for the mmap-based
+scan, file pages mapped while scanning. Latency is the best of --repeat runs;
+peak RSS the highest. Transcripts are generated in a subprocess too, because
+a child process inherits its parent's RSS high-water mark.
+Results are written as JSON (--output) and can be compared against a saved
+baseline (--compare) to flag regressions.
+
+Usage:
+    python3 bench_hooks.py --sizes 1KB,1MB,16MB --output results.json
+    python3 bench_hooks.py --sizes 1KB,1MB,16MB --compare
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from generate_transcript import GENERATOR_VERSION, format_size, parse_size
+
+BENCH_DIR = Path(__file__).resolve().parent
+HOOKS_DIR = BENCH_DIR.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+DEFAULT_SIZES = "1KB,64KB,1MB,16MB,128MB,1GB"
+
+# Hook entry points: name -> hook input for a transcript path
+HOOK_TARGETS: dict[str, Callable[[str], dict[str, Any]]] = {
+    "stop_do_hook": lambda path: {"transcript_path": path},
+    "post_compact_hook": lambda path: {"transcript_path": path, "source": "compact"},
+    "pretool_verify_hook": lambda path: {
+        "transcript_path": path,
+        "tool_name": "Skill",
+        "tool_input": {"skill": "manifest-dev:verify", "args": "/tmp/manifest.md"},
+    },
+}
+
+# hook_utils functions, measured inside a worker process
+FUNCTION_TARGETS = (
+    "scan_transcript",
+    "scan_transcript[no-anchor]",
+    "scan_transcript[no-prefilter]",
+    "scan_transcript[checkpoint-hit]",
+    "parse_do_flow",
+    "has_recent_api_error",
+    "count_consecutive_short_outputs",
+)
+
+# Slower than baseline by more than this factor counts as a regression
+DEFAULT_TOLERANCE = 1.5
+
+# Measurements faster than this are too noisy to compare by ratio
+MIN_COMPARABLE_SECONDS = 0.005
+
+
+@dataclass
+class Measurement:
+    """Best latency and peak RSS of one target on one transcript size."""
+
+    target: str
+    kind: str  # "hook" or "function"
+    size: str
+    size_bytes: int
+    lines: int
+    seconds: float
+    peak_rss_kb: int
+
+
+def _rss_kb(ru_maxrss: int) -> int:
+    """ru_maxrss is KB on Linux and bytes on macOS."""
+    return ru_maxrss // 1024 if sys.platform == "darwin" else ru_maxrss
+
+
+def run_measured(
+    args: list[str], stdin: bytes, env: dict[str, str]
+) -> tuple[float, int, bytes]:
+    """Run a process; return its wall time, peak RSS (KB) and stdout."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    # communicate() would reap the child and lose its rusage
+    assert proc.stdin is not None and proc.stdout is not None
+    proc.stdin.write(stdin)
+    proc.stdin.close()
+    stdout = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args} exited with {proc.returncode}")
+    return elapsed, _rss_kb(rusage.ru_maxrss), stdout
+
+
+def _fresh_env(state_dir: str) -> dict[str, str]:
+    """Environment with an isolated state dir and no daemon."""
+    env = dict(os.environ)
+    env["MANIFEST_DEV_STATE_DIR"] = state_dir
+    env["MANIFEST_DEV_HOOK_SOCKET"] = os.path.join(state_dir, "absent.sock")
+    env.pop("MANIFEST_DEV_HOOK_DAEMON", None)
+    return env
+
+
+def measure_hook(hook_name: str, transcript: str, repeat: int) -> tuple[float, int]:
+    """Best wall time and peak RSS of a cold hook process."""
+    payload = json.dumps(HOOK_TARGETS[hook_name](transcript)).encode()
+    best, peak = float("inf"), 0
+    for _ in range(repeat):
+        # Fresh state dir: no checkpoint from a previous run
+        with tempfile.TemporaryDirectory() as state_dir:
+            seconds, rss, _ = run_measured(
+                [sys.executable, str(HOOKS_DIR / "hook_client.py"), hook_name],
+                payload,
+                _fresh_env(state_dir),
+            )
+        best, peak = min(best, seconds), max(peak, rss)
+    return best, peak
+
+
+def measure_function(target: str, transcript: str, repeat: int) -> tuple[float, int]:
+    """Best in-process latency and peak RSS of a hook_utils function."""
+    best, peak = float("inf"), 0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as state_dir:
+            env = _fresh_env(state_dir)
+            if target.endswith("[checkpoint-hit]"):
+                # Prime the checkpoint in another process, so its scan's
+                # memory isn't attributed to the timed call
+                run_measured(_worker_args("parse_do_flow", transcript), b"", env)
+            _, rss, stdout = run_measured(_worker_args(target, transcript), b"", env)
+        best, peak = min(best, float(stdout)), max(peak, rss)
+    return best, peak
+
+
+def _worker_args(target: str, transcript: str) -> list[str]:
+    return [sys.executable, __file__, "--worker", target, transcript]
+
+
+def run_worker(target: str, transcript: str) -> None:
+    """Time one hook_utils call in this process and print the seconds."""
+    sys.path.insert(0, str(HOOKS_DIR))
+    import hook_utils
+
+    calls: dict[str, Callable[[], object]] = {
+        "scan_transcript": lambda: hook_utils.scan_transcript(
+            transcript, use_checkpoint=False
+        ),
+        "scan_transcript[no-anchor]": lambda: hook_utils.scan_transcript(
+            transcript, use_checkpoint=False, anchor=False
+        ),
+        "scan_transcript[no-prefilter]": lambda: hook_utils.scan_transcript(
+            transcript, use_checkpoint=False, prefilter=False
+        ),
+        "scan_transcript[checkpoint-hit]": lambda: hook_utils.scan_transcript(
+            transcript
+        ),
+        "parse_do_flow": lambda: hook_utils.parse_do_flow(transcript),
+        "has_recent_api_error": lambda: hook_utils.has_recent_api_error(transcript),
+        "count_consecutive_short_outputs": lambda: (
+            hook_utils.count_consecutive_short_outputs(transcript)
+        ),
+    }
+    call = calls[target]
+    started = time.perf_counter()
+    call()
+    print(time.perf_counter() - started)
+
+
+def ensure_transcript(workdir: Path, size: int, seed: int) -> tuple[str, int]:
+    """Generate (or reuse) the transcript for a size; return path and lines."""
+    path = (
+        workdir / f"transcript-v{GENERATOR_VERSION}-s{seed}-{format_size(size)}.jsonl"
+    )
+    meta = path.with_suffix(".lines")
+    if not (path.exists() and meta.exists()):
+        generated = subprocess.run(
+            [
+                sys.executable,
+                str(BENCH_DIR / "generate_transcript.py"),
+                str(path),
+                f"--size={size}",
+                f"--seed={seed}",
+                "--json",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        meta.write_text(str(json.loads(generated.stdout)["lines"]))
+    return str(path), int(meta.read_text())
+
+
+def run_benchmarks(
+    sizes: list[int],
+    seed: int,
+    repeat: int,
+    workdir: Path,
+    targets: set[str] | None = None,
+    progress: Callable[[Measurement], None] | None = None,
+) -> list[Measurement]:
+    """Measure every selected target on every transcript size."""
+    results: list[Measurement] = []
+    for size in sizes:
+        transcript, lines = ensure_transcript(workdir, size, seed)
+        actual_bytes = os.path.getsize(transcript)
+        jobs = [(name, "hook", measure_hook) for name in HOOK_TARGETS] + [
+            (name, "function", measure_function) for name in FUNCTION_TARGETS
+        ]
+        for name, kind, measure in jobs:
+            if targets and name not in targets:
+                continue
+            seconds, rss = measure(name, transcript, repeat)
+            result = Measurement(
+                target=name,
+                kind=kind,
+                size=format_size(size),
+                size_bytes=actual_bytes,
+                lines=lines,
+                seconds=round(seconds, 6),
+                peak_rss_kb=rss,
+            )
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def environment_info(seed: int, repeat: int) -> dict[str, Any]:
+    """What the numbers depend on besides the code."""
+    sys.path.insert(0, str(HOOKS_DIR))
+    import hook_utils
+
+    return {
+        "generator_version": GENERATOR_VERSION,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "json_backend": hook_utils.json_backend(),
+    }
+
+
+def compare(
+    results: list[Measurement], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Describe measurements slower or bigger than tolerance x their baseline."""
+    previous = {
+        (entry["target"], entry["size"]): entry for entry in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        entry = previous.get((result.target, result.size))
+        if entry is None:
+            continue
+        label = f"{result.target} @ {result.size}"
+        ratio = result.seconds / max(entry["seconds"], 1e-9)
+        comparable = max(result.seconds, entry["seconds"]) >= MIN_COMPARABLE_SECONDS
+        if comparable and ratio > tolerance:
+            regressions.append(
+                f"{label}: {result.seconds:.4f}s vs "
+                f"{entry['seconds']:.4f}s baseline ({ratio:.2f}x)"
+            )
+        rss_ratio = result.peak_rss_kb / max(entry["peak_rss_kb"], 1)
+        if rss_ratio > tolerance:
+            regressions.append(
+                f"{label}: peak RSS {result.peak_rss_kb} KB vs "
+                f"{entry['peak_rss_kb']} KB baseline ({rss_ratio:.2f}x)"
+            )
+    return regressions
+
+
+def _print_measurement(result: Measurement) -> None:
+    print(
+        f"{result.target:36} {result.size:>6} {result.seconds * 1000:10.2f} ms "
+        f"{result.peak_rss_kb / 1024:8.1f} MB",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark manifest-dev hooks.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--targets", help="Comma-separated hook or function names (default: all)"
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "manifest-dev-bench",
+        help="Where generated transcripts are cached",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        nargs="?",
+        const=BASELINE_PATH,
+        help="Baseline JSON to compare to (default: baseline.json)",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    targets = set(args.targets.split(",")) if args.targets else None
+
+    results = run_benchmarks(
+        sizes, args.seed, args.repeat, args.workdir, targets, _print_measurement
+    )
+
+    if args.output:
+        report = {
+            "environment": environment_info(args.seed, args.repeat),
+            "results": [asdict(result) for result in results],
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
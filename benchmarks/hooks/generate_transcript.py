@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Deterministic generator of realistic Claude Code transcripts for benchmarks.
+
+Produces JSONL shaped like real sessions: user prompts, assistant text and
+tool calls, large tool_result payloads, /do invocations (command line plus
+isMeta skill expansion) that reset the workflow, /verify, /done and /escalate
+skill calls, compaction boundaries and API errors. The same size and seed
+always produce the same bytes.
+
+Usage: python3 generate_transcript.py OUT --size 16MB [--seed 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Bump when the output for a given size and seed changes
+GENERATOR_VERSION = 1
+
+SIZE_UNITS = {"KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+# Claude Code writes compact JSON
+_SEPARATORS = (",", ":")
+
+_VOCABULARY = (
+    "manifest criterion verify deliverable acceptance invariant log approach "
+    "function return value module import error test assert file path line "
+    "the a of to and in for with on is that this it be by from as not "
+    "should must update check run build output result config state parse"
+)
+
+_TOOLS = ("Bash", "Read", "Edit", "Grep", "Glob", "Write")
+
+_SKILL_EXPANSION = (
+    "Base directory for this skill: /home/user/.claude/plugins/manifest-dev/"
+    "skills/{skill}\n\n# /{skill}\n\n{body}"
+)
+
+
+@dataclass
+class TranscriptStats:
+    """What a generated transcript contains, including its expected /do flow."""
+
+    size_bytes: int = 0
+    lines: int = 0
+    do_invocations: int = 0
+    compactions: int = 0
+    api_errors: int = 0
+    tool_results: int = 0
+    # Expected DoFlowState at the end of the transcript
+    do_args: str | None = None
+    has_verify: bool = False
+    has_done: bool = False
+    has_escalate: bool = False
+    skills: list[str] = field(default_factory=list)
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes like '512', '64KB' or '1GB' into bytes."""
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[: -len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    """Format a byte count using the largest exact unit."""
+    for unit, factor in reversed(SIZE_UNITS.items()):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+class _SessionWriter:
+    """Builds transcript lines with consistent ids and timestamps."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.session_id = self._uuid()
+        self.parent: str | None = None
+        self.clock = 1_735_689_600  # 2025-01-01T00:00:00Z
+        # Pre-built text for slicing payloads cheaply
+        words = _VOCABULARY.split()
+        self.corpus = " ".join(rng.choice(words) for _ in range(200_000))
+
+    def _uuid(self) -> str:
+        h = f"{self.rng.getrandbits(128):032x}"
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def text(self, size: int) -> str:
+        start = self.rng.randrange(max(1, len(self.corpus) - size))
+        chunk = self.corpus[start : start + size]
+        while len(chunk) < size:
+            chunk += "\n" + self.corpus[: size - len(chunk) - 1]
+        return chunk
+
+    def line(self, line_type: str, message: dict[str, Any], **extra: Any) -> str:
+        uuid = self._uuid()
+        self.clock += self.rng.randint(1, 30)
+        data = {
+            "parentUuid": self.parent,
+            "isSidechain": False,
+            "userType": "external",
+            "cwd": "/home/user/project",
+            "sessionId": self.session_id,
+            "version": "1.0.0",
+            "type": line_type,
+            "message": message,
+            "uuid": uuid,
+            "timestamp": f"{self.clock}",
+            **extra,
+        }
+        self.parent = uuid
+        return json.dumps(data, separators=_SEPARATORS)
+
+    def user_prompt(self) -> str:
+        return self.line(
+            "user",
+            {"role": "user", "content": self.text(self.rng.randint(20, 400))},
+        )
+
+    def assistant_text(self, size: int) -> str:
+        return self.line(
+            "assistant",
+            {
+                "role": "assistant",
+                "content": [{"type": "text", "text": self.text(size)}],
+            },
+        )
+
+    def tool_use(self, tool_id: str) -> str:
+        tool = self.rng.choice(_TOOLS)
+        return self.line(
+            "assistant",
+            {
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "tool_use",
+                        "id": tool_id,
+                        "name": tool,
+                        "input": {"command": self.text(self.rng.randint(10, 120))},
+                    }
+                ],
+            },
+        )
+
+    def tool_result(self, tool_id: str, size: int) -> str:
+        return self.line(
+            "user",
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": tool_id,
+                        "content": self.text(size),
+                    }
+                ],
+            },
+        )
+
+    def skill_call(self, skill: str, args: str) -> str:
+        return self.line(
+            "assistant",
+            {
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "tool_use",
+                        "id": f"toolu_{self.rng.getrandbits(64):016x}",
+                        "name": "Skill",
+                        "input": {"skill": f"manifest-dev:{skill}", "args": args},
+                    }
+                ],
+            },
+        )
+
+    def do_command(self, manifest: str, max_body: int) -> Iterator[str]:
+        yield self.line(
+            "user",
+            {
+                "role": "user",
+                "content": "<command-message>manifest-dev:do</command-message>"
+                "<command-name>/manifest-dev:do</command-name>"
+                f"<command-args>{manifest}</command-args>",
+            },
+        )
+        body = self.text(min(self.rng.randint(2_000, 8_000), max_body))
+        yield self.line(
+            "user",
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": _SKILL_EXPANSION.format(skill="do", body=body),
+                    }
+                ],
+            },
+            isMeta=True,
+        )
+
+    def compaction(self) -> Iterator[str]:
+        yield self.line(
+            "system",
+            {"role": "system", "content": "Conversation compacted"},
+            subtype="compact_boundary",
+        )
+        yield self.line(
+            "user",
+            {"role": "user", "content": self.text(self.rng.randint(1_000, 6_000))},
+            isCompactSummary=True,
+        )
+
+    def api_error(self) -> str:
+        return self.line(
+            "assistant",
+            {
+                "role": "assistant",
+                "content": [{"type": "text", "text": "API Error: 529 Overloaded"}],
+            },
+            isApiErrorMessage=True,
+        )
+
+
+def _payload_size(rng: random.Random, remaining: int) -> int:
+    """Tool result size: mostly small, sometimes huge (file dumps, logs)."""
+    roll = rng.random()
+    if roll < 0.80:
+        size = rng.randint(100, 4_000)
+    elif roll < 0.98:
+        size = rng.randint(4_000, 32_000)
+    else:
+        size = rng.randint(32_000, 1_000_000)
+    return max(16, min(size, remaining // 2))
+
+
+def iter_transcript(
+    target_bytes: int, seed: int = 0, stats: TranscriptStats | None = None
+) -> Iterator[str]:
+    """
+    Yield transcript lines (without newlines) until target_bytes is reached.
+
+    The transcript always starts with a /do, so hooks see an active workflow.
+    """
+    rng = random.Random(seed)
+    session = _SessionWriter(rng)
+    stats = stats if stats is not None else TranscriptStats()
+    written = 0
+    turn = 0
+
+    def emit(line: str) -> str:
+        nonlocal written
+        written += len(line.encode("utf-8")) + 1
+        stats.lines += 1
+        return line
+
+    def start_do() -> Iterator[str]:
+        stats.do_invocations += 1
+        manifest = f"/tmp/manifest-{stats.do_invocations}.md"
+        stats.do_args = manifest
+        stats.has_verify = stats.has_done = stats.has_escalate = False
+        for line in session.do_command(manifest, max(100, target_bytes // 4)):
+            yield emit(line)
+
+    yield from start_do()
+    while written < target_bytes:
+        turn += 1
+        roll = rng.random()
+        if roll < 0.02:
+            yield from start_do()
+        elif roll < 0.03:
+            stats.compactions += 1
+            for line in session.compaction():
+                yield emit(line)
+        elif roll < 0.04:
+            stats.api_errors += 1
+            yield emit(session.api_error())
+        elif roll < 0.06 and stats.do_args:
+            skill = rng.choice(("verify", "verify", "done", "escalate"))
+            stats.skills.append(skill)
+            setattr(stats, f"has_{skill}", True)
+            yield emit(session.skill_call(skill, stats.do_args))
+        elif roll < 0.15:
+            yield emit(session.user_prompt())
+        elif roll < 0.45:
+            yield emit(session.assistant_text(rng.choice((40, 80, 300, 2_000))))
+        else:
+            tool_id = f"toolu_{turn:016x}"
+            yield emit(session.tool_use(tool_id))
+            stats.tool_results += 1
+            size = _payload_size(rng, target_bytes - written)
+            yield emit(session.tool_result(tool_id, size))
+    stats.size_bytes = written
+
+
+def generate_transcript(
+    path: Path, target_bytes: int, seed: int = 0
+) -> TranscriptStats:
+    """Write a transcript of about target_bytes to path and describe it."""
+    stats = TranscriptStats()
+    with open(path, "w", encoding="utf-8") as f:
+        for line in iter_transcript(target_bytes, seed, stats):
+            f.write(line)
+            f.write("\n")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic transcript.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--size", type=parse_size, default=parse_size("1MB"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print stats as JSON")
+    args = parser.parse_args()
+
+    stats = generate_transcript(args.output, args.size, args.seed)
+    if args.json:
+        print(json.dumps(asdict(stats)))
+        return
+    print(
+        f"{args.output}: {stats.size_bytes} bytes, {stats.lines} lines, "
+        f"{stats.do_invocations} /do, {stats.compactions} compactions, "
+        f"{stats.api_errors} API errors"
+    )
+
+
+if __name__ == "__main__":
+    main()
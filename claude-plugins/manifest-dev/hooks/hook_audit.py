@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Audit /do compliance across a directory of archived session transcripts.
+
+Replays every transcript's Stop hook decisions in one forward pass (see
+hook_utils.iter_stop_points) and reports, per session and in aggregate:
+how the session last stopped (no /do, /done, /escalate, loop detector,
+API error, or blocked - stopped without /done), how many Stop calls were
+blocked, how often the loop detector let a stop through, and how often
+each workflow skill was invoked.
+
+Usage: python3 hook_audit.py PATH... [--jobs N] [--glob PATTERN]
+                             [--output FILE] [--json]
+
+Directories are searched recursively for PATTERN (default *.jsonl).
+Transcripts are audited by a pool of --jobs worker processes (default: the
+CPUs this process may run on); each worker streams one transcript at a time
+line by line, never buffering more than hook_utils.MAX_LINE_BYTES of a line,
+so memory per worker stays bounded however large transcripts get.
+Per-session records are written to --output as JSON lines as they arrive
+("-" for stdout, moving the report to stderr); the aggregate report is
+printed at the end.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any, TextIO
+
+from stop_do_hook import decide_stop
+
+from hook_telemetry import outcome_of
+from hook_utils import (
+    WORKFLOW_SKILLS,
+    DoFlowState,
+    TranscriptScan,
+    available_cpus,
+    iter_stop_points,
+)
+
+DEFAULT_GLOB = "*.jsonl"
+
+# How a session last stopped, in report order
+STATUS_NO_STOP = "no-stop"  # the assistant never ended a turn
+STATUS_NO_DO = "no-do"  # not in a /do flow
+STATUS_DONE = "done"  # /do verified with /done
+STATUS_ESCALATED = "escalated"  # /do ended with /escalate
+STATUS_LOOP = "loop-detector"  # stop let through by the loop detector
+STATUS_API_ERROR = "api-error"  # stopped on an API error
+STATUS_BLOCKED = "blocked"  # the hook was still blocking when the session ended
+STATUSES = (
+    STATUS_NO_STOP,
+    STATUS_NO_DO,
+    STATUS_DONE,
+    STATUS_ESCALATED,
+    STATUS_LOOP,
+    STATUS_API_ERROR,
+    STATUS_BLOCKED,
+)
+# Statuses of sessions in a /do flow that stopped without /done
+WITHOUT_DONE = frozenset(
+    {STATUS_ESCALATED, STATUS_LOOP, STATUS_API_ERROR, STATUS_BLOCKED}
+)
+
+# Transcripts handed to a worker at a time, at most (fewer for small runs,
+# so the work still spreads over every worker)
+MAX_CHUNK_SIZE = 16
+
+
+def iter_transcripts(
+    paths: Iterable[str], pattern: str = DEFAULT_GLOB
+) -> Iterator[str]:
+    """Transcript files among paths, searching directories recursively, sorted."""
+    from pathlib import Path
+
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(str(p) for p in Path(path).rglob(pattern) if p.is_file())
+        else:
+            yield path
+
+
+def session_status(scan: TranscriptScan, outcome: str) -> str:
+    """Classify how a session stopped, from its last Stop hook call."""
+    state: DoFlowState = scan.do_flow
+    if not state.has_do:
+        return STATUS_NO_DO
+    if state.has_done:
+        return STATUS_DONE
+    if state.has_escalate:
+        return STATUS_ESCALATED
+    if scan.api_error:
+        return STATUS_API_ERROR
+    if outcome == "allow":
+        return STATUS_LOOP
+    return STATUS_BLOCKED
+
+
+def audit_transcript(path: str) -> dict[str, Any]:
+    """
+    Audit one transcript's Stop hook decisions.
+
+    Returns the session record: size, Stop calls, blocks, loop-detector
+    trips, workflow skill invocations, final status and /do arguments. An
+    unreadable transcript gives a record with just its path and an error.
+    """
+    record: dict[str, Any] = {
+        "path": path,
+        "bytes": 0,
+        "stops": 0,
+        "blocks": 0,
+        "loop_trips": 0,
+        "invocations": dict.fromkeys(sorted(WORKFLOW_SKILLS), 0),
+        "status": STATUS_NO_STOP,
+        "do_args": None,
+    }
+    try:
+        with open(path, "rb") as f:
+            for point in iter_stop_points(f):
+                outcome = outcome_of(decide_stop(point.scan))
+                record["stops"] += 1
+                record["blocks"] += outcome == "block"
+                # The Stop hook only answers "allow" when the loop detector fires
+                record["loop_trips"] += outcome == "allow"
+                for skill, count in point.invoked.items():
+                    record["invocations"][skill] += count
+                record["status"] = session_status(point.scan, outcome)
+                record["do_args"] = point.scan.do_flow.do_args
+            record["bytes"] = f.tell()
+    except OSError as e:
+        return {"path": path, "error": str(e)}
+    return record
+
+
+class FleetReport:
+    """Aggregate of session records, in constant memory."""
+
+    def __init__(self) -> None:
+        self.sessions = 0
+        self.errors = 0
+        self.bytes = 0
+        self.stops = 0
+        self.blocks = 0
+        self.loop_trips = 0
+        self.sessions_with_loop_trips = 0
+        self.statuses = dict.fromkeys(STATUSES, 0)
+        self.invocations = dict.fromkeys(sorted(WORKFLOW_SKILLS), 0)
+        self.sessions_invoking = dict.fromkeys(sorted(WORKFLOW_SKILLS), 0)
+
+    def add(self, record: dict[str, Any]) -> None:
+        """Count one session record (see audit_transcript)."""
+        if "error" in record:
+            self.errors += 1
+            return
+        self.sessions += 1
+        self.bytes += record["bytes"]
+        self.stops += record["stops"]
+        self.blocks += record["blocks"]
+        self.loop_trips += record["loop_trips"]
+        self.sessions_with_loop_trips += record["loop_trips"] > 0
+        self.statuses[record["status"]] += 1
+        for skill, count in record["invocations"].items():
+            self.invocations[skill] += count
+            self.sessions_invoking[skill] += count > 0
+
+    def summary(self) -> dict[str, Any]:
+        """The aggregate as a JSON-ready dict."""
+        in_do = sum(
+            count
+            for status, count in self.statuses.items()
+            if status not in (STATUS_NO_STOP, STATUS_NO_DO)
+        )
+        return {
+            "sessions": self.sessions,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "stops": self.stops,
+            "blocks": self.blocks,
+            "loop_trips": self.loop_trips,
+            "sessions_with_loop_trips": self.sessions_with_loop_trips,
+            "sessions_in_do": in_do,
+            "stopped_without_done": sum(
+                count
+                for status, count in self.statuses.items()
+                if status in WITHOUT_DONE
+            ),
+            "statuses": dict(self.statuses),
+            "invocations": dict(self.invocations),
+            "sessions_invoking": dict(self.sessions_invoking),
+        }
+
+
+def format_report(summary: dict[str, Any], elapsed: float, jobs: int) -> str:
+    """Human-readable fleet report."""
+    sessions = summary["sessions"]
+
+    def share(count: int, total: int) -> str:
+        return f"{count} ({100 * count / total:.1f}%)" if total else str(count)
+
+    lines = [
+        f"{sessions} transcripts, {summary['bytes'] / 1024**2:.1f} MB "
+        f"in {elapsed:.2f} s with {jobs} workers"
+        + (f", {summary['errors']} unreadable" if summary["errors"] else ""),
+        f"Stop calls: {summary['stops']}, blocked {share(summary['blocks'], summary['stops'])}",
+        f"sessions in a /do flow: {share(summary['sessions_in_do'], sessions)}",
+        "stopped without /done: "
+        + share(summary["stopped_without_done"], summary["sessions_in_do"]),
+        f"loop-detector trips: {summary['loop_trips']} in "
+        f"{share(summary['sessions_with_loop_trips'], sessions)} sessions",
+        "last stop:",
+    ]
+    lines += [
+        f"  {status:<14}{share(count, sessions)}"
+        for status, count in summary["statuses"].items()
+    ]
+    lines.append("invocations:")
+    lines += [
+        f"  /{skill:<13}{count} in {summary['sessions_invoking'][skill]} sessions"
+        for skill, count in summary["invocations"].items()
+    ]
+    return "\n".join(lines)
+
+
+def audit_fleet(
+    transcripts: list[str], jobs: int, output: TextIO | None = None
+) -> FleetReport:
+    """
+    Audit transcripts with jobs worker processes, streaming records to output.
+
+    Records arrive in completion order. With one job, runs in this process.
+    """
+    import multiprocessing
+
+    report = FleetReport()
+
+    def collect(records: Iterable[dict[str, Any]]) -> None:
+        for record in records:
+            report.add(record)
+            if output is not None:
+                output.write(json.dumps(record) + "\n")
+
+    jobs = max(1, min(jobs, len(transcripts)))
+    if jobs == 1:
+        collect(map(audit_transcript, transcripts))
+        return report
+    chunk_size = max(1, min(MAX_CHUNK_SIZE, len(transcripts) // (jobs * 4)))
+    with multiprocessing.Pool(jobs) as pool:
+        collect(pool.imap_unordered(audit_transcript, transcripts, chunk_size))
+    return report
+
+
+def main() -> None:
+    """Audit transcripts and print the fleet report."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Audit /do compliance across session transcripts."
+    )
+    parser.add_argument("paths", nargs="+", help="Transcript files or directories")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=available_cpus(),
+        help="Worker processes (default: available CPUs)",
+    )
+    parser.add_argument(
+        "--glob", default=DEFAULT_GLOB, help="Transcript file pattern in directories"
+    )
+    parser.add_argument(
+        "--output", help='Write per-session JSON lines here ("-" for stdout)'
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the aggregate report as JSON"
+    )
+    args = parser.parse_args()
+
+    transcripts = list(iter_transcripts(args.paths, args.glob))
+    start = time.perf_counter()
+    if args.output is None:
+        report = audit_fleet(transcripts, args.jobs)
+    elif args.output == "-":
+        report = audit_fleet(transcripts, args.jobs, sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            report = audit_fleet(transcripts, args.jobs, output)
+    elapsed = time.perf_counter() - start
+
+    summary = report.summary()
+    # Records on stdout: keep the report apart from them
+    report_file = sys.stderr if args.output == "-" else sys.stdout
+    if args.json:
+        print(json.dumps(summary, indent=2), file=report_file)
+    else:
+        jobs = max(1, min(args.jobs, len(transcripts)))
+        print(format_report(summary, elapsed, jobs), file=report_file)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
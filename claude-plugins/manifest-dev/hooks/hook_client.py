@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Thin hook entry point that forwards to the hook daemon when it's running.
+
+Usage: python3 hook_client.py <hook-module> (e.g. stop_do_hook)
+
+Sends the hook's stdin payload to hook_daemon.py over a Unix domain socket
+and prints the response. The caller's working directory and hook settings
+(FORWARDED_ENV_PREFIXES) travel with the payload. If the daemon is absent, belongs to another hooks
+directory, or fails, the hook runs in-process instead, so the output is the
+same either way. Startup is kept minimal: socket is imported only when the
+daemon's socket file exists, and the hook module (with its transcript
+machinery) only on fallback.
+
+With MANIFEST_DEV_HOOK_DAEMON=1, a missing daemon is started in the
+background so later hook calls can use it. With MANIFEST_DEV_PROFILE set,
+the daemon is bypassed so the profile covers the hook (see
+hook_telemetry.run_main).
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+
+from hook_telemetry import PROFILE_ENV, state_dir
+
+# Hooks that can be forwarded, by module name
+HOOK_MODULES = (
+    "stop_do_hook",
+    "post_compact_hook",
+    "pre_compact_hook",
+    "pretool_verify_hook",
+    "workflow_event_hook",
+)
+
+# Overrides the daemon's Unix socket path
+SOCKET_ENV = "MANIFEST_DEV_HOOK_SOCKET"
+# Default socket name; {install} identifies HOOKS_DIR (see get_socket_path)
+SOCKET_NAME = "hookd-{install}.sock"
+
+# Set to "1" to start the daemon on demand
+DAEMON_ENV = "MANIFEST_DEV_HOOK_DAEMON"
+
+# Environment hooks read (budget, fail mode, telemetry, JSON backend, state
+# dir); sent with each call so the daemon evaluates under the caller's
+# settings instead of its own
+FORWARDED_ENV_PREFIXES = ("MANIFEST_DEV_", "XDG_CACHE_HOME")
+
+# Seconds to wait for a daemon response before evaluating in-process
+RESPONSE_TIMEOUT = 10.0
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_socket_path() -> str:
+    """
+    Path of the daemon's Unix socket.
+
+    Each plugin install gets its own socket, so after an update the old
+    daemon is left to idle out instead of holding the path.
+    """
+    override = os.environ.get(SOCKET_ENV)
+    if override:
+        return override
+    import zlib
+
+    install = f"{zlib.crc32(HOOKS_DIR.encode()):08x}"
+    return os.path.join(state_dir(), SOCKET_NAME.format(install=install))
+
+
+def request_header(hook_name: str) -> bytes | None:
+    """
+    First line of a daemon request: tab-separated hook name, hooks
+    directory, working directory and forwarded KEY=VALUE settings.
+
+    None when the caller's context can't be sent on one line.
+    """
+    try:
+        cwd = os.getcwd()
+    except OSError:
+        return None
+    fields = [hook_name, HOOKS_DIR, cwd]
+    fields += [
+        f"{key}={value}"
+        for key, value in os.environ.items()
+        if key.startswith(FORWARDED_ENV_PREFIXES)
+    ]
+    if any("\t" in field or "\n" in field for field in fields):
+        return None
+    return ("\t".join(fields) + "\n").encode()
+
+
+def forward(hook_name: str, payload: bytes) -> tuple[str, str] | None:
+    """
+    Ask the daemon to evaluate a hook.
+
+    Returns the text the hook would print to stdout and stderr (possibly
+    empty), or None if the daemon couldn't answer.
+    """
+    socket_path = get_socket_path()
+    # No daemon listening - don't pay for importing socket
+    if not os.path.exists(socket_path):
+        return None
+
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    header = request_header(hook_name)
+    if header is None:
+        return None
+    chunks: list[bytes] = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall(header + payload)
+            sock.shutdown(socket.SHUT_WR)
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+    except OSError:
+        return None
+
+    status, _, body = b"".join(chunks).partition(b"\n")
+    ok, _, stdout_size = status.partition(b" ")
+    if ok != b"OK" or not stdout_size.isdigit():
+        return None
+    size = int(stdout_size)
+    return body[:size].decode("utf-8"), body[size:].decode("utf-8")
+
+
+def start_daemon() -> None:
+    """Start hook_daemon.py detached from this process."""
+    import contextlib
+    import subprocess
+
+    with contextlib.suppress(OSError):
+        subprocess.Popen(
+            [sys.executable, os.path.join(HOOKS_DIR, "hook_daemon.py")],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+def run_in_process(hook_name: str, payload: bytes) -> None:
+    """Run the hook's own main() on the payload (exits the process)."""
+    if HOOKS_DIR not in sys.path:
+        sys.path.insert(0, HOOKS_DIR)
+    module = __import__(hook_name)
+    from hook_telemetry import run_main
+
+    sys.stdin = io.TextIOWrapper(io.BytesIO(payload), encoding="utf-8")
+    run_main(hook_name, module.main)
+
+
+def main() -> None:
+    """Main hook entry point."""
+    hook_name = sys.argv[1] if len(sys.argv) > 1 else ""
+    if hook_name not in HOOK_MODULES:
+        # Unknown hook - nothing to enforce (fail open)
+        sys.exit(0)
+
+    payload = sys.stdin.buffer.read()
+
+    response = None if os.environ.get(PROFILE_ENV) else forward(hook_name, payload)
+    if response is not None:
+        stdout, stderr = response
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        sys.exit(0)
+
+    if os.environ.get(DAEMON_ENV) == "1":
+        start_daemon()
+
+    run_in_process(hook_name, payload)
+
+
+if __name__ == "__main__":
+    main()
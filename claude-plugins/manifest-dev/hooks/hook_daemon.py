@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Optional long-lived server that evaluates hooks without per-call startup.
+
+hook_client.py forwards each hook's stdin payload over a Unix domain socket.
+The daemon runs the hook's evaluate() in-process, in the client's working
+directory and with its hook settings, and keeps transcript scan checkpoints
+in memory, so a Stop or SessionStart call pays neither
+interpreter startup nor imports, and only decodes newly appended lines.
+
+The daemon exits after an idle timeout. Per-session checkpoints are evicted
+when unused for a while or when too many sessions are tracked, and are
+flushed to the on-disk checkpoint store on exit.
+
+Usage: python3 hook_daemon.py [--socket PATH] [--idle-timeout SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+
+from hook_client import (
+    FORWARDED_ENV_PREFIXES,
+    HOOK_MODULES,
+    HOOKS_DIR,
+    get_socket_path,
+)
+from hook_manifest import pending_manifest_cache
+from hook_telemetry import start_telemetry
+from hook_utils import (
+    JSON_BACKEND_ENV,
+    FileCheckpointStore,
+    ScanCheckpoint,
+    pending_checkpoints,
+    reload_json_backend,
+    report_strategy,
+    set_checkpoint_store,
+)
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_SESSION_TTL = 3600.0
+DEFAULT_MAX_SESSIONS = 64
+
+
+class SessionCheckpointStore:
+    """
+    In-memory transcript checkpoints with idle and LRU eviction.
+
+    Misses fall back to the on-disk store, so a fresh daemon resumes where
+    in-process hook runs left off.
+    """
+
+    def __init__(
+        self,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._disk = FileCheckpointStore()
+        # transcript path -> (checkpoint, last used), least recently used first
+        self._sessions: OrderedDict[str, tuple[ScanCheckpoint, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def load(self, transcript_path: str) -> ScanCheckpoint | None:
+        entry = self._sessions.get(transcript_path)
+        if entry is None:
+            return self._disk.load(transcript_path)
+        self._sessions[transcript_path] = (entry[0], self._clock())
+        self._sessions.move_to_end(transcript_path)
+        return entry[0]
+
+    def save(self, transcript_path: str, checkpoint: ScanCheckpoint) -> None:
+        self._sessions[transcript_path] = (checkpoint, self._clock())
+        self._sessions.move_to_end(transcript_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop sessions idle past the TTL, then the oldest beyond the cap."""
+        cutoff = self._clock() - self.session_ttl
+        for transcript_path, (checkpoint, last_used) in list(self._sessions.items()):
+            if last_used >= cutoff:
+                break
+            self._disk.save(transcript_path, checkpoint)
+            del self._sessions[transcript_path]
+
+        while len(self._sessions) > self.max_sessions:
+            transcript_path, (checkpoint, _) = self._sessions.popitem(last=False)
+            self._disk.save(transcript_path, checkpoint)
+
+    def flush(self) -> None:
+        """Persist every in-memory checkpoint to disk."""
+        for transcript_path, (checkpoint, _) in self._sessions.items():
+            self._disk.save(transcript_path, checkpoint)
+
+
+def _set_forwarded_env(values: dict[str, str]) -> None:
+    """Make the forwarded settings exactly values, leaving the rest alone."""
+    backend = os.environ.get(JSON_BACKEND_ENV)
+    for key in [key for key in os.environ if key.startswith(FORWARDED_ENV_PREFIXES)]:
+        del os.environ[key]
+    os.environ.update(values)
+    if os.environ.get(JSON_BACKEND_ENV) != backend:
+        reload_json_backend()
+
+
+@contextlib.contextmanager
+def client_context(cwd: str, env: dict[str, str]) -> Iterator[None]:
+    """
+    Run with the client's working directory and hook settings.
+
+    Requests are handled one at a time, so the process-wide state is the
+    client's for the whole call and restored afterwards.
+    """
+    previous_cwd = os.getcwd()
+    previous_env = {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(FORWARDED_ENV_PREFIXES)
+    }
+    os.chdir(cwd)
+    _set_forwarded_env(env)
+    try:
+        yield
+    finally:
+        _set_forwarded_env(previous_env)
+        os.chdir(previous_cwd)
+
+
+def evaluate_hook(hook_name: str, payload: bytes) -> tuple[str, str]:
+    """
+    Evaluate a hook on its raw stdin payload.
+
+    Returns exactly what the hook's main() would print, as (stdout, stderr):
+    stderr carries report_strategy's degraded-mode note.
+    """
+    if hook_name not in HOOK_MODULES:
+        raise ValueError(f"Unknown hook: {hook_name}")
+    module = importlib.import_module(hook_name)
+    telemetry = start_telemetry(hook_name)
+
+    try:
+        with telemetry.phase("stdin"):
+            hook_input = json.loads(payload)
+    except ValueError:
+        # Hooks print nothing for unreadable input
+        telemetry.finish(None, None, daemon=True)
+        return "", ""
+
+    # evaluate() holds back its cache writes, as under main(): checkpoints
+    # go to the session store, manifest parses to disk
+    strategy = None
+    with (
+        telemetry.phase("decision"),
+        pending_checkpoints() as checkpoints,
+        pending_manifest_cache() as manifests,
+    ):
+        if hasattr(module, "evaluate_with_strategy"):
+            output, strategy = module.evaluate_with_strategy(hook_input)
+        else:
+            output = module.evaluate(hook_input)
+    checkpoints.flush()
+    manifests.flush()
+
+    stderr = io.StringIO()
+    if strategy is not None:
+        with contextlib.redirect_stderr(stderr):
+            report_strategy(hook_name, strategy)
+    telemetry.finish(hook_input, output, daemon=True)
+    stdout = "" if output is None else json.dumps(output) + "\n"
+    return stdout, stderr.getvalue()
+
+
+class HookRequestHandler(socketserver.StreamRequestHandler):
+    """Handles one forwarded hook call: header line, then the payload."""
+
+    server: HookDaemon
+
+    def handle(self) -> None:
+        header = self.rfile.readline().decode("utf-8").rstrip("\n")
+        if not header:
+            # Liveness probe (is_daemon_running) - nothing to answer
+            return
+        hook_name, hooks_dir, cwd, *settings = [*header.split("\t"), "", ""]
+        payload = self.rfile.read()
+
+        # A client from another plugin install must not run this code. It
+        # shares this socket only through MANIFEST_DEV_HOOK_SOCKET; step
+        # aside so the daemon it starts can take over.
+        if hooks_dir != HOOKS_DIR:
+            self.wfile.write(b"ERR\nhooks directory mismatch")
+            self.server.retire()
+            return
+
+        env = dict(item.partition("=")[::2] for item in settings if item)
+        try:
+            with client_context(cwd, env):
+                stdout, stderr = evaluate_hook(hook_name, payload)
+        except Exception as e:  # reported to the client, which falls back
+            self.wfile.write(f"ERR\n{type(e).__name__}: {e}".encode())
+            return
+        # The status line gives stdout's length; stderr follows it
+        out = stdout.encode("utf-8")
+        self.wfile.write(f"OK {len(out)}\n".encode() + out + stderr.encode("utf-8"))
+
+
+class HookDaemon(socketserver.UnixStreamServer):
+    """Single-threaded hook server that stops after an idle timeout."""
+
+    def __init__(
+        self, socket_path: str, idle_timeout: float, store: SessionCheckpointStore
+    ) -> None:
+        self.timeout = idle_timeout
+        self.store = store
+        self.socket_path = socket_path
+        self.idle = False
+        super().__init__(socket_path, HookRequestHandler)
+        os.chmod(socket_path, 0o600)
+        self.socket_inode = os.stat(socket_path).st_ino
+
+    def handle_timeout(self) -> None:
+        self.idle = True
+
+    def retire(self) -> None:
+        """Stop after this request and free the socket path right away."""
+        self.idle = True
+        self.remove_socket()
+
+    def remove_socket(self) -> None:
+        """Unlink the socket unless another daemon has bound the path since."""
+        with contextlib.suppress(OSError):
+            if os.stat(self.socket_path).st_ino == self.socket_inode:
+                os.unlink(self.socket_path)
+
+    def serve_until_idle(self) -> None:
+        """Handle requests until none arrives within the idle timeout."""
+        while not self.idle:
+            self.handle_request()
+            self.store.evict()
+
+
+def is_daemon_running(socket_path: str) -> bool:
+    """Check whether a daemon is accepting connections on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(
+    socket_path: str,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    session_ttl: float = DEFAULT_SESSION_TTL,
+    max_sessions: int = DEFAULT_MAX_SESSIONS,
+) -> bool:
+    """
+    Run the daemon until idle.
+
+    Returns False without serving if another daemon owns the socket.
+    """
+    if is_daemon_running(socket_path):
+        return False
+    # Stale socket from a daemon that didn't exit cleanly
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(socket_path) or ".", mode=0o700, exist_ok=True)
+
+    store = SessionCheckpointStore(session_ttl, max_sessions)
+    previous_store = set_checkpoint_store(store)
+    try:
+        with HookDaemon(socket_path, idle_timeout, store) as server:
+            try:
+                server.serve_until_idle()
+            finally:
+                server.remove_socket()
+    finally:
+        store.flush()
+        set_checkpoint_store(previous_store)
+    return True
+
+
+def main() -> None:
+    """Daemon entry point."""
+    parser = argparse.ArgumentParser(description="Serve manifest-dev hooks.")
+    parser.add_argument("--socket", default=get_socket_path())
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT)
+    parser.add_argument("--session-ttl", type=float, default=DEFAULT_SESSION_TTL)
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    args = parser.parse_args()
+
+    # Requests run in their client's directory; don't pin the launch one
+    os.chdir("/")
+    if not serve(args.socket, args.idle_timeout, args.session_ttl, args.max_sessions):
+        print(f"Hook daemon already running on {args.socket}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Change-impact index: which of a manifest's criteria a change can affect.
+
+Records, for every INV-G* and AC-* in force, the files and globs it reads:
+
+- the `scope`, `files` or `paths` globs of its verify block (codebase
+  checks, or any check that names its inputs),
+- the path arguments of its bash `command`, when every program in it reads
+  only what it's given (grep, cat, ruff ...), plus those programs' config
+  files,
+- files named in the output of its past runs, which hook_verify records.
+
+Given the changed files - listed, or `git diff` against --base plus
+untracked files - it returns the minimal set of criteria to re-verify:
+those whose inputs match a changed file, plus every criterion whose inputs
+can't be bounded (a test suite, a reviewer reading the whole diff), since
+any change may affect those.
+
+Usage: python3 hook_impact.py MANIFEST [FILE ...] [--base REF] [--cwd DIR]
+                              [--json] [--ids]
+
+--ids prints only the comma-separated IDs to re-verify, ready for
+`hook_verify.py --criteria`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from hook_manifest import Manifest, ManifestItem, load_manifest
+from hook_utils import get_state_dir, git_paths
+
+# Bump when the learned-paths record format changes
+IMPACT_INDEX_VERSION = 1
+
+# Verify-block keys whose globs name the files a check reads
+SCOPE_KEYS = ("scope", "files", "paths")
+
+# Programs that read only the files they're given (or stdin), so a command
+# made of nothing else is bounded by its path arguments - plus the config
+# files each one also looks for, anywhere under the working directory.
+# Programs that can read or run files their arguments don't name (find
+# -exec, awk and sed scripts) aren't listed.
+_PYPROJECT = "**/pyproject.toml"
+ARGUMENT_READERS: dict[str, tuple[str, ...]] = {
+    "[": (),
+    "ag": ("**/.gitignore", "**/.ignore", "**/.agignore"),
+    "black": (_PYPROJECT,),
+    "cat": (),
+    "cmp": (),
+    "comm": (),
+    "cut": (),
+    "diff": (),
+    "du": (),
+    "echo": (),
+    "egrep": (),
+    "eslint": (
+        "**/.eslintrc*",
+        "**/eslint.config.*",
+        "**/.eslintignore",
+        "**/package.json",
+    ),
+    "false": (),
+    "fgrep": (),
+    "file": (),
+    "flake8": ("**/setup.cfg", "**/tox.ini", "**/.flake8"),
+    "grep": (),
+    "hadolint": ("**/.hadolint.yaml", "**/.hadolint.yml"),
+    "head": (),
+    "isort": (
+        _PYPROJECT,
+        "**/setup.cfg",
+        "**/tox.ini",
+        "**/.isort.cfg",
+        "**/.editorconfig",
+    ),
+    "jq": (),
+    "ls": (),
+    "markdownlint": ("**/.markdownlint*",),
+    "md5sum": (),
+    "prettier": (
+        "**/.prettierrc*",
+        "**/prettier.config.*",
+        "**/.prettierignore",
+        "**/.editorconfig",
+        "**/package.json",
+    ),
+    "printf": (),
+    "rg": ("**/.gitignore", "**/.ignore", "**/.rgignore"),
+    "ruff": (_PYPROJECT, "**/ruff.toml", "**/.ruff.toml"),
+    "sha256sum": (),
+    "shellcheck": ("**/.shellcheckrc",),
+    "sort": (),
+    "stat": (),
+    "tail": (),
+    "test": (),
+    "tr": (),
+    "true": (),
+    "uniq": (),
+    "wc": (),
+    "yamllint": ("**/.yamllint", "**/.yamllint.yaml", "**/.yamllint.yml"),
+}
+
+# Learned paths kept per criterion, most recent last
+LEARNED_MAX_PATHS = 200
+
+# Tokens that end a simple shell command
+_COMMAND_SEPARATORS = frozenset({"|", "||", "&&", ";", "&", "(", ")", "|&", ";;"})
+
+# Redirections whose target is written, not read
+_OUTPUT_REDIRECTS = frozenset({">", ">>", "&>", ">|", "&>>"})
+
+# An argument that is a path even when nothing exists there yet: it has a
+# directory part, a glob or a file extension
+_PATH_ARGUMENT_PATTERN = re.compile(
+    r"[^\s=:]*(?:/|[*?\[])[^\s]*|[\w.-]*\w\.[A-Za-z]\w*"
+)
+
+# A file path as tools print it: src/app.py, ./a/b.ts:12:3, /repo/x.md
+_OUTPUT_PATH_PATTERN = re.compile(
+    r"(?<![\w./-])(?:\.{1,2}/|/)?(?:[\w.-]+/)*[\w-][\w.-]*\.\w+"
+)
+
+
+@dataclass
+class CriterionInputs:
+    """What one criterion reads, as globs relative to the working directory."""
+
+    id: str
+    patterns: list[str]  # declared by its verify block or command
+    learned: list[str]  # named in the output of its past runs
+    bounded: bool  # the patterns cover everything it reads
+
+    def matching(self, changed: Iterable[str]) -> list[str]:
+        """The changed files among this criterion's inputs."""
+        regexes = [_glob_regex(p) for p in (*self.patterns, *self.learned)]
+        return [path for path in changed if any(r.fullmatch(path) for r in regexes)]
+
+
+def relative_path(path: str, cwd: str) -> str:
+    """A path or glob relative to cwd, normalized, with / separators."""
+    if os.path.isabs(path):
+        path = os.path.relpath(path, cwd)
+    path = os.path.normpath(path).replace(os.sep, "/")
+    return "" if path == "." else path
+
+
+@functools.lru_cache(maxsize=1024)
+def _glob_regex(pattern: str) -> re.Pattern[str]:
+    """
+    Regex for a glob: ** spans directories, * ? and [...] stay within one.
+
+    A pattern also matches everything below it, so a directory stands for
+    its contents; the empty pattern (the working directory) matches all.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            members = pattern[i + 1 : end].replace("\\", "\\\\")
+            if members.startswith("!"):
+                members = "^" + members[1:]
+            parts.append(f"[{members}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "".join(parts)
+    return re.compile(f"{prefix}(?:/.*)?" if prefix else ".*")
+
+
+def command_paths(command: str, cwd: str) -> list[str] | None:
+    """
+    The paths a bash command reads, or None if they can't be bounded.
+
+    Bounded only when every simple command in it runs a program from
+    ARGUMENT_READERS and at least one path argument is found; the programs'
+    config files follow the arguments. Arguments count as paths when they
+    exist under cwd or look like one (see _PATH_ARGUMENT_PATTERN); a regex
+    that looks like a path only widens the match. Redirection targets are
+    written, so they're left out.
+    """
+    import shlex
+
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+
+    paths: list[str] = []
+    configs: dict[str, None] = {}
+    program: str | None = None
+    skip_next = False
+    for token in tokens:
+        if skip_next:
+            skip_next = False
+        elif token in _COMMAND_SEPARATORS:
+            program = None
+        elif token in _OUTPUT_REDIRECTS:
+            skip_next = True
+        elif token == "<":
+            continue
+        elif program is None:
+            # Environment assignments and negation come before the program
+            if token == "!" or re.match(r"\w+=", token):
+                continue
+            program = os.path.basename(token)
+            if program not in ARGUMENT_READERS:
+                return None
+            configs.update(dict.fromkeys(ARGUMENT_READERS[program]))
+        else:
+            if token.startswith("-"):
+                if "=" not in token:
+                    continue
+                token = token.split("=", 1)[1]
+            if token and (
+                _PATH_ARGUMENT_PATTERN.fullmatch(token)
+                or os.path.exists(os.path.join(cwd, token))
+            ):
+                paths.append(relative_path(token, cwd))
+    return paths + list(configs) if paths else None
+
+
+def declared_inputs(item: ManifestItem, cwd: str) -> list[str] | None:
+    """
+    The globs a criterion's verify block says it reads, or None if unknown.
+
+    scope/files/paths globs win; otherwise a bash command's paths.
+    """
+    verify = item.verify or {}
+    for key in SCOPE_KEYS:
+        value = verify.get(key)
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list) and value:
+            return [relative_path(str(pattern), cwd) for pattern in value]
+    command = verify.get("command")
+    if item.method == "bash" and isinstance(command, str):
+        return command_paths(command, cwd)
+    return None
+
+
+def _learned_path(manifest_path: str) -> Path:
+    """Learned-paths file for a manifest, keyed by its absolute path."""
+    key = hashlib.sha256(os.path.abspath(manifest_path).encode()).hexdigest()[:32]
+    return get_state_dir() / "impact" / f"{key}.json"
+
+
+def load_learned(manifest_path: str) -> dict[str, list[str]]:
+    """Paths seen in each criterion's past output, by ID ({} if none)."""
+    try:
+        with open(_learned_path(manifest_path), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(entry, dict) or entry.get("version") != IMPACT_INDEX_VERSION:
+        return {}
+    criteria = entry.get("criteria")
+    return criteria if isinstance(criteria, dict) else {}
+
+
+def output_paths(text: str, cwd: str) -> list[str]:
+    """Existing files under cwd named in a command's output, in order."""
+    paths: dict[str, None] = {}
+    for match in _OUTPUT_PATH_PATTERN.finditer(text):
+        path = relative_path(match.group(), cwd)
+        if not path.startswith("../") and os.path.isfile(os.path.join(cwd, path)):
+            paths[path] = None
+    return list(paths)
+
+
+def record_run(manifest_path: str, records: list[dict[str, Any]], cwd: str) -> None:
+    """
+    Learn the files named in the output of criteria that just ran.
+
+    records are hook_verify's; cached ones didn't run and are skipped.
+    Written atomically, only when something new was seen. Failures are
+    ignored.
+    """
+    learned = load_learned(manifest_path)
+    changed = False
+    for record in records:
+        if record.get("cached"):
+            continue
+        seen = output_paths(f"{record['stdout']}\n{record['stderr']}", cwd)
+        known = learned.get(record["id"], [])
+        new = [path for path in seen if path not in known]
+        if new:
+            learned[record["id"]] = (known + new)[-LEARNED_MAX_PATHS:]
+            changed = True
+    if not changed:
+        return
+
+    path = _learned_path(manifest_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    entry = {"version": IMPACT_INDEX_VERSION, "criteria": learned}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+
+
+def build_index(manifest: Manifest, cwd: str) -> list[CriterionInputs]:
+    """Inputs of every criterion in force, in manifest order."""
+    learned = load_learned(manifest.path) if manifest.path else {}
+    index = []
+    for item in manifest.criteria():
+        patterns = declared_inputs(item, cwd)
+        index.append(
+            CriterionInputs(
+                id=item.id,
+                patterns=patterns or [],
+                learned=list(learned.get(item.id, [])),
+                bounded=patterns is not None,
+            )
+        )
+    return index
+
+
+def changed_files(cwd: str, base: str = "HEAD") -> list[str] | None:
+    """
+    Files changed since base, untracked ones included, relative to cwd.
+
+    Only files under cwd are listed. None outside a git repository.
+    """
+    diff = git_paths(["diff", "--name-only", "--relative", "-z", base], cwd)
+    untracked = git_paths(["ls-files", "--others", "--exclude-standard", "-z"], cwd)
+    if diff is None or untracked is None:
+        return None
+    return list(dict.fromkeys(diff + untracked))
+
+
+def impact(
+    manifest: Manifest, changed: Iterable[str], cwd: str
+) -> list[dict[str, Any]]:
+    """
+    Every criterion in force with what decides whether to re-verify it.
+
+    Records carry "affected", "files" (the changed files among its inputs)
+    and "bounded" (False: inputs unknown, so always affected).
+    """
+    changed = [relative_path(path, cwd) for path in changed]
+    records = []
+    for inputs in build_index(manifest, cwd):
+        files = inputs.matching(changed) if inputs.bounded else []
+        records.append(
+            {
+                **asdict(inputs),
+                "affected": not inputs.bounded or bool(files),
+                "files": files,
+            }
+        )
+    return records
+
+
+def format_impact(records: list[dict[str, Any]]) -> str:
+    """Human-readable impact: affected criteria and why, then the rest."""
+    lines = []
+    affected = [r for r in records if r["affected"]]
+    lines.append(f"{len(affected)} of {len(records)} criteria to re-verify:")
+    for record in affected:
+        reason = (
+            ", ".join(record["files"])
+            if record["bounded"]
+            else "reads files that can't be determined"
+        )
+        lines.append(f"  {record['id']:<12}{reason}")
+    unaffected = [r["id"] for r in records if not r["affected"]]
+    if unaffected:
+        lines.append(f"Unaffected: {' '.join(unaffected)}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Print the criteria a change can affect."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Find the manifest criteria a change can affect."
+    )
+    parser.add_argument("manifest", help="Manifest file")
+    parser.add_argument(
+        "files", nargs="*", help="Changed files (default: git diff and untracked)"
+    )
+    parser.add_argument(
+        "--base", default="HEAD", help="Revision to diff against (default: HEAD)"
+    )
+    parser.add_argument("--cwd", default=os.getcwd(), help="Directory criteria run in")
+    parser.add_argument("--json", action="store_true", help="Print records as JSON")
+    parser.add_argument(
+        "--ids", action="store_true", help="Print only the IDs to re-verify"
+    )
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except OSError as e:
+        print(f"Cannot read {args.manifest}: {e}", file=sys.stderr)
+        sys.exit(2)
+    changed = args.files or changed_files(args.cwd, args.base)
+    if changed is None:
+        print(f"Cannot diff {args.cwd} against {args.base}", file=sys.stderr)
+        sys.exit(2)
+
+    records = impact(manifest, changed, args.cwd)
+    if args.ids:
+        print(",".join(r["id"] for r in records if r["affected"]))
+    elif args.json:
+        print(json.dumps({"changed": changed, "criteria": records}, indent=2))
+    else:
+        print(format_impact(records))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Structured parsing of the manifests /define writes.
+
+Parses a manifest (schema in skills/define/SKILL.md) into typed records:
+global invariants (INV-G*) and acceptance criteria (AC-{D}.{N}) with their
+`verify:` YAML blocks, process guidance (PG-*), risk areas (R-*), trade-offs
+(T-*), known assumptions (ASM-*) and amendments (INV-G1.1 amends INV-G1).
+Hooks and batch tools can then count criteria, list IDs and group them by
+verify method without anyone re-reading the whole file.
+
+Parses are cached on disk per manifest path, with the content hash they
+were parsed from: an unchanged manifest (same mtime and size) is answered
+from the cache without reading it, a touched but identical one after
+hashing it, and only a changed one is parsed again.
+
+Usage: python3 hook_manifest.py MANIFEST [--json] [--no-cache]
+
+`verify:` blocks are read with a small YAML subset (nested mappings,
+plain/quoted scalars, | and > block scalars, flow and block lists), which
+covers what the schema asks for without a YAML dependency. A block it
+can't read is reported as a warning and leaves the criterion unverified.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from hook_utils import get_state_dir
+
+# Bump when parsing or the cached record format changes
+MANIFEST_CACHE_VERSION = 1
+
+# Entry kinds, by ID prefix (see the ID scheme in skills/define/SKILL.md)
+KIND_INVARIANT = "invariant"  # INV-G{N}: verified by /verify
+KIND_ACCEPTANCE = "acceptance"  # AC-{D}.{N}: verified by /verify
+KIND_GUIDANCE = "guidance"  # PG-{N}: followed during /do
+KIND_RISK = "risk"  # R-{N}: watched during /do
+KIND_TRADEOFF = "tradeoff"  # T-{N}: consulted during /do
+KIND_ASSUMPTION = "assumption"  # ASM-{N}: audited by /verify
+_KIND_BY_PREFIX = {
+    "INV-G": KIND_INVARIANT,
+    "AC-": KIND_ACCEPTANCE,
+    "PG-": KIND_GUIDANCE,
+    "R-": KIND_RISK,
+    "T-": KIND_TRADEOFF,
+    "ASM-": KIND_ASSUMPTION,
+}
+# Kinds /verify checks
+CRITERION_KINDS = frozenset({KIND_INVARIANT, KIND_ACCEPTANCE})
+
+# Verification methods a verify: block may name
+VERIFY_METHODS = ("bash", "codebase", "subagent", "research", "manual")
+# Methods /verify hands to criteria-checker (see skills/verify/SKILL.md)
+CHECKER_METHODS = frozenset({"bash", "codebase", "research"})
+CRITERIA_CHECKER = "criteria-checker"
+# Agent for subagent criteria that don't name one
+DEFAULT_SUBAGENT = "general-purpose"
+
+# An ID: its base (INV-G1, AC-2.3, ...) then amendment suffixes (.1, .2, ...)
+_ID = r"(?:INV-G\d+|AC-\d+\.\d+|PG-\d+|R-\d+|T-\d+|ASM-\d+)(?:\.\d+)*"
+# A list entry with an ID, bracketed as the schema writes it or bare
+_ENTRY_PATTERN = re.compile(rf"^(\s*)[-*]\s+\[?({_ID})\]?(?=[\s:|]|$)[\s:]*(.*)$")
+# "amends <ID>" in an amendment's text
+_AMENDS_PATTERN = re.compile(rf"\bamends\s+\[?({_ID})\]?", re.IGNORECASE)
+# Inline "| Verify: <method> ..." on the entry line
+_INLINE_VERIFY_PATTERN = re.compile(r"\|\s*Verify:\s*`?(\w+)", re.IGNORECASE)
+_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_DELIVERABLE_PATTERN = re.compile(r"^Deliverable\s+(\d+)\s*:?\s*(.*)$", re.IGNORECASE)
+_FENCE_PATTERN = re.compile(r"^\s*(```+|~~~+)\s*(\w*)")
+_TITLE_PREFIX = "Definition:"
+
+
+class ManifestYamlError(ValueError):
+    """A verify: block outside the YAML subset hook_manifest reads."""
+
+
+@dataclass
+class ManifestItem:
+    """One entry with an ID: criterion, guidance, risk, trade-off or assumption."""
+
+    id: str  # e.g. "INV-G1", "AC-2.3", "AC-2.3.1" (an amendment)
+    kind: str  # KIND_* for the ID's prefix
+    text: str  # entry text after the ID, continuation lines joined
+    line: int  # 1-based line of the entry in the manifest
+    section: str  # heading of the section the entry is in
+    deliverable: int | None = None  # D of AC-{D}.{N}
+    verify: dict[str, Any] | None = None  # the verify: block, if any
+    amends: str | None = None  # ID this entry amends, if it's an amendment
+
+    @property
+    def description(self) -> str:
+        """Entry text without its labels, "amends <ID>" and "| Verify:" part."""
+        text = self.text.split(" | ", 1)[0].strip()
+        text = text.removeprefix("Description:").strip()
+        # "amends <ID>:" leading an amendment
+        amends = _AMENDS_PATTERN.match(text)
+        if amends:
+            text = text[amends.end() :].lstrip(" :").removeprefix("Description:")
+        return text.strip()
+
+    @property
+    def method(self) -> str | None:
+        """Verification method: from the verify: block, else the inline Verify:."""
+        if self.verify is not None:
+            method = self.verify.get("method")
+            return str(method).strip().lower() if method is not None else None
+        match = _INLINE_VERIFY_PATTERN.search(self.text)
+        if match and match.group(1).lower() in VERIFY_METHODS:
+            return match.group(1).lower()
+        return None
+
+    @property
+    def verifier(self) -> str | None:
+        """
+        Agent /verify spawns for this criterion.
+
+        criteria-checker for automated checks, the named agent for subagent
+        criteria; None for manual criteria and ones without a method.
+        """
+        method = self.method
+        if method in CHECKER_METHODS:
+            return CRITERIA_CHECKER
+        if method == "subagent":
+            agent = self.verify.get("agent") if self.verify else None
+            return str(agent) if agent else DEFAULT_SUBAGENT
+        return None
+
+    @property
+    def is_criterion(self) -> bool:
+        """Checked by /verify (INV-G* or AC-*)."""
+        return self.kind in CRITERION_KINDS
+
+
+@dataclass
+class Manifest:
+    """A parsed manifest."""
+
+    path: str  # absolute path parsed
+    digest: str  # sha256 of the content parsed
+    title: str | None  # from "# Definition: <title>"
+    deliverables: dict[int, str]  # deliverable number -> name
+    items: list[ManifestItem]  # every entry with an ID, in file order
+    warnings: list[str] = field(default_factory=list)  # unreadable blocks etc.
+
+    def effective_items(self) -> list[ManifestItem]:
+        """Items in force: those amended are replaced by their amendments."""
+        amended = {item.amends for item in self.items if item.amends}
+        return [item for item in self.items if item.id not in amended]
+
+    def criteria(self) -> list[ManifestItem]:
+        """Criteria /verify must check, amendments applied."""
+        return [item for item in self.effective_items() if item.is_criterion]
+
+    def get(self, item_id: str) -> ManifestItem | None:
+        """The item with this ID (its last definition), or None."""
+        found = None
+        for item in self.items:
+            if item.id == item_id:
+                found = item
+        return found
+
+    def by_kind(self) -> dict[str, list[ManifestItem]]:
+        """Items in force grouped by kind, in the ID scheme's order."""
+        grouped: dict[str, list[ManifestItem]] = {
+            kind: [] for kind in _KIND_BY_PREFIX.values()
+        }
+        for item in self.effective_items():
+            grouped[item.kind].append(item)
+        return grouped
+
+    def by_method(self) -> dict[str, list[ManifestItem]]:
+        """Criteria grouped by verify method ("unspecified" when none is given)."""
+        grouped: dict[str, list[ManifestItem]] = {}
+        for item in self.criteria():
+            grouped.setdefault(item.method or "unspecified", []).append(item)
+        return grouped
+
+    def summary(self) -> dict[str, Any]:
+        """Counts and IDs as a JSON-ready dict."""
+        return {
+            "path": self.path,
+            "title": self.title,
+            "deliverables": len(self.deliverables),
+            "counts": {kind: len(items) for kind, items in self.by_kind().items()},
+            "amendments": sum(1 for item in self.items if item.amends),
+            "methods": {
+                method: [item.id for item in items]
+                for method, items in self.by_method().items()
+            },
+            "warnings": list(self.warnings),
+        }
+
+
+def kind_of(item_id: str) -> str:
+    """KIND_* for an ID."""
+    for prefix, kind in _KIND_BY_PREFIX.items():
+        if item_id.startswith(prefix):
+            return kind
+    raise ValueError(f"not a manifest ID: {item_id}")
+
+
+def amended_id(item_id: str) -> str | None:
+    """The ID an amendment ID amends by its shape (INV-G1.1 -> INV-G1), if any."""
+    base_parts = 2 if item_id.startswith("AC-") else 1
+    prefix, number = item_id.split("-", 1)
+    parts = number.split(".")
+    if len(parts) <= base_parts:
+        return None
+    return f"{prefix}-{'.'.join(parts[:-1])}"
+
+
+def _parse_scalar(value: str) -> Any:
+    """A plain, quoted or flow-list YAML scalar."""
+    value = value.strip()
+    if not value:
+        return None
+    if value[0] == '"':
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            raise ManifestYamlError(f"bad double-quoted string: {value}") from e
+    if value[0] == "'":
+        if len(value) < 2 or value[-1] != "'":
+            raise ManifestYamlError(f"bad single-quoted string: {value}")
+        return value[1:-1].replace("''", "'")
+    if value[0] == "[":
+        if value[-1] != "]":
+            raise ManifestYamlError(f"bad flow list: {value}")
+        inner = value[1:-1].strip()
+        return [_parse_scalar(part) for part in inner.split(",")] if inner else []
+    # A comment after a plain scalar
+    value = re.split(r"\s+#", value, maxsplit=1)[0]
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered in ("null", "~"):
+        return None
+    with contextlib.suppress(ValueError):
+        return int(value)
+    return value
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _skip_blank(rows: list[str], position: int) -> int:
+    """First row at or after position that isn't blank or a comment."""
+    while position < len(rows) and (
+        not rows[position].strip() or rows[position].lstrip().startswith("#")
+    ):
+        position += 1
+    return position
+
+
+def parse_yaml_block(lines: list[str]) -> dict[str, Any]:
+    """
+    Parse a verify: block with the YAML subset hook_manifest reads.
+
+    Raises ManifestYamlError for anything outside it (tabs, anchors,
+    multi-line flow collections, ...).
+    """
+    rows = [line.rstrip() for line in lines]
+    if any("\t" in row[: len(row) - len(row.lstrip())] for row in rows):
+        raise ManifestYamlError("tabs in indentation")
+    position = _skip_blank(rows, 0)
+    if position == len(rows):
+        return {}
+    value, position = _parse_node(rows, position, _indent(rows[position]))
+    position = _skip_blank(rows, position)
+    if position != len(rows):
+        raise ManifestYamlError(f"unexpected line: {rows[position].strip()}")
+    if not isinstance(value, dict):
+        raise ManifestYamlError("block is not a mapping")
+    return value
+
+
+def _is_list_item(row: str) -> bool:
+    stripped = row.strip()
+    return stripped.startswith("- ") or stripped == "-"
+
+
+def _parse_node(rows: list[str], position: int, indent: int) -> tuple[Any, int]:
+    """Parse the mapping or list whose rows start at position with indent."""
+    if _is_list_item(rows[position]):
+        items: list[Any] = []
+        while True:
+            position = _skip_blank(rows, position)
+            # A list at its key's indentation ends at the next key
+            if (
+                position == len(rows)
+                or _indent(rows[position]) != indent
+                or not _is_list_item(rows[position])
+            ):
+                break
+            items.append(_parse_scalar(rows[position].strip()[1:]))
+            position += 1
+        return items, position
+
+    mapping: dict[str, Any] = {}
+    while True:
+        position = _skip_blank(rows, position)
+        if position == len(rows) or _indent(rows[position]) < indent:
+            break
+        row = rows[position].strip()
+        if _indent(rows[position]) > indent:
+            raise ManifestYamlError(f"bad indentation: {row}")
+        key, sep, rest = row.partition(":")
+        if not sep or not key or key[0] in "&*!{[-":
+            raise ManifestYamlError(f"expected key: value: {row}")
+        key = key.strip().strip("\"'")
+        rest = rest.strip()
+        position += 1
+        if rest[:1] in ("|", ">"):
+            mapping[key], position = _parse_block_scalar(rows, position, indent, rest)
+            continue
+        if rest and not rest.startswith("#"):
+            mapping[key] = _parse_scalar(rest)
+            continue
+        position = _skip_blank(rows, position)
+        if position < len(rows) and (
+            _indent(rows[position]) > indent
+            # A list may sit at its key's indentation
+            or (_indent(rows[position]) == indent and _is_list_item(rows[position]))
+        ):
+            mapping[key], position = _parse_node(
+                rows, position, _indent(rows[position])
+            )
+        else:
+            mapping[key] = None
+    return mapping, position
+
+
+def _parse_block_scalar(
+    rows: list[str], position: int, indent: int, header: str
+) -> tuple[str, int]:
+    """A | (literal) or > (folded) block scalar under a key at indent."""
+    block: list[str] = []
+    while position < len(rows) and (
+        not rows[position].strip() or _indent(rows[position]) > indent
+    ):
+        block.append(rows[position])
+        position += 1
+    while block and not block[-1].strip():
+        block.pop()
+    margin = min((_indent(line) for line in block if line.strip()), default=0)
+    body = [line[margin:] for line in block]
+    if header[0] == "|":
+        text = "\n".join(body)
+    else:
+        paragraphs = "\n".join(body).split("\n\n")
+        text = "\n".join(" ".join(p.split("\n")) for p in paragraphs)
+    # Clip (the default) keeps one final newline, strip (|-) none
+    return (text if "-" in header else text + "\n"), position
+
+
+def parse_manifest(text: str, path: str = "", digest: str = "") -> Manifest:
+    """
+    Parse manifest text into typed records.
+
+    Entries are list items starting with an ID; indented lines under an
+    entry continue its text, and a ```yaml block holding `verify:` under a
+    criterion becomes its verify spec. Never raises on content: what can't
+    be read is noted in the manifest's warnings.
+    """
+    title: str | None = None
+    deliverables: dict[int, str] = {}
+    items: list[ManifestItem] = []
+    warnings: list[str] = []
+    section = ""
+    current: ManifestItem | None = None
+    current_indent = 0
+    fence: str | None = None
+    fence_line = fence_indent = 0
+    block: list[str] = []
+
+    for number, line in enumerate(text.splitlines(), 1):
+        if fence is not None:
+            if line.strip().startswith(fence):
+                if current is not None:
+                    _attach_verify(current, block, fence_line, warnings)
+                    # An unindented block ends the entry it follows
+                    if fence_indent <= current_indent:
+                        current = None
+                fence = None
+            else:
+                block.append(line)
+            continue
+
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence_match:
+            fence, fence_line, block = fence_match.group(1), number, []
+            fence_indent = _indent(line)
+            continue
+
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            current = None
+            section = heading.group(2)
+            if len(heading.group(1)) == 1 and section.startswith(_TITLE_PREFIX):
+                title = section.removeprefix(_TITLE_PREFIX).strip()
+            deliverable = _DELIVERABLE_PATTERN.match(section)
+            if deliverable:
+                deliverables[int(deliverable.group(1))] = deliverable.group(2)
+            continue
+
+        entry = _ENTRY_PATTERN.match(line)
+        if entry:
+            indent, item_id, rest = entry.groups()
+            amends = _AMENDS_PATTERN.search(rest)
+            current = ManifestItem(
+                id=item_id,
+                kind=kind_of(item_id),
+                text=rest.strip(),
+                line=number,
+                section=section,
+                amends=amends.group(1) if amends else amended_id(item_id),
+            )
+            if current.kind == KIND_ACCEPTANCE:
+                current.deliverable = int(item_id[3:].split(".", 1)[0])
+            current_indent = len(indent)
+            items.append(current)
+            continue
+
+        if current is not None:
+            if not line.strip():
+                continue
+            if _indent(line) > current_indent:
+                current.text = f"{current.text} {line.strip()}".strip()
+            else:
+                current = None
+
+    if fence is not None and current is not None:
+        warnings.append(f"line {fence_line}: unterminated code block")
+    return Manifest(
+        path=path,
+        digest=digest,
+        title=title,
+        deliverables=deliverables,
+        items=items,
+        warnings=warnings,
+    )
+
+
+def _attach_verify(
+    item: ManifestItem, block: list[str], fence_line: int, warnings: list[str]
+) -> None:
+    """Set an entry's verify spec from a code block, if it holds one."""
+    if not any(line.strip().startswith("verify:") for line in block):
+        return
+    try:
+        verify = parse_yaml_block(block).get("verify")
+    except ManifestYamlError as e:
+        warnings.append(f"line {fence_line}: {item.id} verify block: {e}")
+        return
+    if not isinstance(verify, dict):
+        warnings.append(f"line {fence_line}: {item.id} verify block is not a mapping")
+        return
+    item.verify = verify
+
+
+def _cache_path(manifest_path: str) -> Path:
+    """Cache file for a manifest, keyed by its absolute path."""
+    key = hashlib.sha256(manifest_path.encode()).hexdigest()[:32]
+    return get_state_dir() / "manifests" / f"{key}.json"
+
+
+def _from_record(data: dict[str, Any]) -> Manifest:
+    """Rebuild a Manifest from its asdict() form."""
+    data["items"] = [ManifestItem(**item) for item in data["items"]]
+    data["deliverables"] = {int(k): v for k, v in data["deliverables"].items()}
+    return Manifest(**data)
+
+
+def _load_cached(manifest_path: str) -> dict[str, Any] | None:
+    """The cache entry for a manifest, or None if absent/corrupt/outdated."""
+    try:
+        with open(_cache_path(manifest_path), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != MANIFEST_CACHE_VERSION:
+        return None
+    return entry
+
+
+def _save_cached(manifest: Manifest, st: os.stat_result) -> None:
+    """Atomically store a parse with the stat it was read at. Failures are ignored."""
+    path = _cache_path(manifest.path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    entry = {
+        "version": MANIFEST_CACHE_VERSION,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "manifest": asdict(manifest),
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+
+
+class PendingManifestCache:
+    """Parse-cache writes held back until flush()."""
+
+    def __init__(self) -> None:
+        # Parses not yet saved, with the stat they were read at
+        self.pending: list[tuple[Manifest, os.stat_result]] = []
+
+    def flush(self) -> None:
+        """Save the held-back parses."""
+        for manifest, st in self.pending:
+            _save_cached(manifest, st)
+        self.pending.clear()
+
+
+_pending_cache: PendingManifestCache | None = None
+
+
+@contextlib.contextmanager
+def pending_manifest_cache() -> Iterator[PendingManifestCache]:
+    """
+    Hold back the parse-cache writes made inside the block.
+
+    Like hook_utils.pending_checkpoints: on exit the held-back writes are
+    dropped, unless an enclosing block collects them. Hook evaluate()
+    functions load manifests inside one; entry points flush() another.
+    """
+    global _pending_cache
+    previous = _pending_cache
+    store = PendingManifestCache()
+    _pending_cache = store
+    try:
+        yield store
+    finally:
+        _pending_cache = previous
+        if previous is not None:
+            previous.pending.extend(store.pending)
+
+
+def load_manifest(manifest_path: str, cache: bool = True) -> Manifest:
+    """
+    Parse a manifest file, through the on-disk cache.
+
+    A cached parse is used as is when the file's mtime and size match, and
+    after hashing the file when only those changed; a fresh parse is
+    cached (held back inside pending_manifest_cache). With cache=False,
+    the file is always parsed and nothing is read from or written to the
+    cache. Raises OSError if the manifest can't be read.
+    """
+    path = os.path.abspath(manifest_path)
+    entry = _load_cached(path) if cache else None
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == (
+            st.st_mtime_ns,
+            st.st_size,
+        ):
+            with contextlib.suppress(KeyError, TypeError, ValueError):
+                return _from_record(entry["manifest"])
+        content = f.read()
+
+    digest = hashlib.sha256(content).hexdigest()
+    manifest: Manifest | None = None
+    if entry is not None:
+        with contextlib.suppress(KeyError, TypeError, ValueError, AttributeError):
+            if entry["manifest"]["digest"] == digest:
+                manifest = _from_record(entry["manifest"])
+    if manifest is None:
+        manifest = parse_manifest(content.decode("utf-8", "replace"), path, digest)
+    if cache and _pending_cache is not None:
+        _pending_cache.pending.append((manifest, st))
+    elif cache:
+        _save_cached(manifest, st)
+    return manifest
+
+
+def format_manifest(manifest: Manifest) -> str:
+    """Human-readable summary: counts, then criteria by verify method."""
+    summary = manifest.summary()
+    lines = [
+        f"{manifest.title or manifest.path}: "
+        f"{summary['deliverables']} deliverables, "
+        + ", ".join(f"{count} {kind}" for kind, count in summary["counts"].items()),
+    ]
+    if summary["amendments"]:
+        lines.append(f"{summary['amendments']} amendments")
+    for method, ids in summary["methods"].items():
+        lines.append(f"  {method:<12}{' '.join(ids)}")
+    lines += [f"warning: {warning}" for warning in manifest.warnings]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Parse a manifest and print its summary."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse a /define manifest.")
+    parser.add_argument("manifest", help="Manifest file")
+    parser.add_argument(
+        "--json", action="store_true", help="Print every parsed item as JSON"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Parse without the on-disk cache"
+    )
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest, cache=not args.no_cache)
+    except OSError as e:
+        print(f"Cannot read {args.manifest}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(asdict(manifest), indent=2))
+    else:
+        print(format_manifest(manifest))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Replay a transcript through the Stop hook, one assistant turn at a time.
+
+Finds where the assistant ended each turn (hook_utils.iter_stop_points),
+copies the transcript up to there into a scratch file, and runs the Stop
+hook's evaluate() against that prefix, as Claude Code would have. Prints the decision timeline with
+per-step latency: where the loop detector fires (decision "allow"), which
+strategy answered, and how hook cost grows over the session.
+
+Usage: python3 hook_replay.py TRANSCRIPT [--cold] [--event-log] [--json]
+
+Scan checkpoints carry over between steps as they do between real Stop
+calls, but live in a scratch state directory, so replays never touch real
+hook state. --cold discards them after every step, for a full scan each
+time. --event-log also feeds each /do, /verify, /done and /escalate through
+workflow_event_hook.py, so the Stop hook reads the event log instead.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+from collections.abc import Iterator
+from typing import Any, BinaryIO
+
+import stop_do_hook
+import workflow_event_hook
+
+from hook_telemetry import (
+    REPORT_PERCENTILES,
+    STATE_DIR_ENV,
+    percentile,
+    start_telemetry,
+)
+from hook_utils import (
+    SKIP_CHUNK_BYTES,
+    WORKFLOW_MARKERS,
+    decode_sized_line,
+    get_message_text,
+    iter_bounded_lines,
+    iter_stop_points,
+    pending_checkpoints,
+)
+
+# Slash command typed by the user, as Claude Code writes it to the transcript
+_COMMAND_PATTERN = re.compile(
+    r"<command-name>(/[^<]+)</command-name>"
+    r"(?:\s*<command-args>(.*?)</command-args>)?",
+    re.DOTALL,
+)
+
+# Column headings of the timeline (see format_step)
+TIMELINE_HEADER = (
+    f"{'step':>6} {'line':>8} {'offset':>12} {'wall ms':>9} {'decoded':>8} "
+    f"{'strategy':<12} {'result':<6} reason"
+)
+
+
+@contextlib.contextmanager
+def scratch_state_dir(state_dir: str) -> Iterator[None]:
+    """Point the hooks' persistent state at state_dir for the block."""
+    previous = os.environ.get(STATE_DIR_ENV)
+    os.environ[STATE_DIR_ENV] = state_dir
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ[STATE_DIR_ENV]
+        else:
+            os.environ[STATE_DIR_ENV] = previous
+
+
+def workflow_hook_inputs(
+    line_data: dict[str, Any], transcript_path: str
+) -> list[dict[str, Any]]:
+    """
+    Inputs workflow_event_hook.py would have received for this line.
+
+    Skill tool calls become PostToolUse inputs and typed slash commands
+    UserPromptSubmit inputs; the hook itself picks out the workflow skills.
+    """
+    msg_type = line_data.get("type")
+    if msg_type == "assistant":
+        content = line_data.get("message", {}).get("content", [])
+        if isinstance(content, str):
+            return []
+        return [
+            {
+                "transcript_path": transcript_path,
+                "tool_name": "Skill",
+                "tool_input": block.get("input", {}),
+            }
+            for block in content
+            if isinstance(block, dict)
+            and block.get("type") == "tool_use"
+            and block.get("name") == "Skill"
+        ]
+
+    if msg_type == "user" and not line_data.get("isMeta"):
+        match = _COMMAND_PATTERN.search(get_message_text(line_data))
+        if match:
+            command, args = match.groups()
+            prompt = f"{command} {args.strip()}" if args else command
+            return [{"transcript_path": transcript_path, "prompt": prompt}]
+
+    return []
+
+
+def copy_bytes(source: BinaryIO, target: BinaryIO, size: int) -> None:
+    """Copy the next size bytes of source to target, a chunk at a time."""
+    while size > 0:
+        chunk = source.read(min(size, SKIP_CHUNK_BYTES))
+        if not chunk:
+            return
+        target.write(chunk)
+        size -= len(chunk)
+
+
+def feed_workflow_events(copied: BinaryIO, transcript_path: str) -> None:
+    """Pass the workflow skill invocations in copied's unread lines to the hook."""
+    for raw, size in iter_bounded_lines(copied):
+        if not any(marker in raw for marker in WORKFLOW_MARKERS):
+            continue
+        line_data = decode_sized_line(raw, size)
+        if line_data is not None:
+            for hook_input in workflow_hook_inputs(line_data, transcript_path):
+                workflow_event_hook.evaluate(hook_input)
+
+
+def replay_step(transcript_path: str, cold: bool = False) -> dict[str, Any]:
+    """
+    Run the Stop hook against the transcript as it is now.
+
+    Returns the invocation's telemetry record (see hook_telemetry), plus
+    the reason given with the decision. Checkpoints are kept unless cold.
+    """
+    hook_input = {"transcript_path": transcript_path}
+    telemetry = start_telemetry("stop_do_hook", enabled=True)
+    with telemetry.phase("decision"), pending_checkpoints() as checkpoints:
+        output, _ = stop_do_hook.evaluate_with_strategy(hook_input)
+    if not cold:
+        checkpoints.flush()
+    record = telemetry.record(hook_input, output)
+    record["reason"] = output.get("reason") if output else None
+    return record
+
+
+def replay(
+    transcript_path: str,
+    workdir: str,
+    cold: bool = False,
+    event_log: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """
+    Replay a transcript, yielding one record per Stop hook call.
+
+    Records are replay_step's, numbered by step, with the 1-based transcript
+    line and byte offset the prefix ends at. The prefix and all hook state
+    are written under workdir.
+    """
+    prefix_path = os.path.join(workdir, "transcript.jsonl")
+    with (
+        scratch_state_dir(os.path.join(workdir, "state")),
+        open(transcript_path, "rb") as transcript,
+        open(transcript_path, "rb") as source,
+        open(prefix_path, "wb") as prefix,
+        open(prefix_path, "rb") as copied,
+    ):
+        for step, point in enumerate(iter_stop_points(transcript), 1):
+            copy_bytes(source, prefix, point.offset - prefix.tell())
+            prefix.flush()
+            # Events land at the turn's end; replaying them in order there
+            # leaves the same flow, since every transition is idempotent
+            if event_log:
+                feed_workflow_events(copied, prefix_path)
+            record = replay_step(prefix_path, cold)
+            yield {"step": step, "line": point.line, "offset": point.offset, **record}
+
+
+def summarize_replay(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """Step count, latency percentiles, outcomes, strategies and loop steps."""
+    walls = sorted(float(r["wall_ms"]) for r in records)
+    outcomes: dict[str, int] = {}
+    strategies: dict[str, int] = {}
+    for record in records:
+        outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+        strategy = str(record.get("strategy"))
+        strategies[strategy] = strategies.get(strategy, 0) + 1
+    return {
+        "steps": len(records),
+        "wall_ms": {f"p{p}": percentile(walls, p) for p in REPORT_PERCENTILES}
+        | {"max": walls[-1] if walls else 0.0},
+        "lines_decoded": sum(r["lines_decoded"] for r in records),
+        "outcomes": outcomes,
+        "strategies": strategies,
+        # The Stop hook only answers "allow" when the loop detector fires
+        "loop_steps": [r["step"] for r in records if r["outcome"] == "allow"],
+    }
+
+
+def format_step(record: dict[str, Any]) -> str:
+    """One timeline row, under TIMELINE_HEADER."""
+    return (
+        f"{record['step']:>6} {record['line']:>8} {record['offset']:>12} "
+        f"{record['wall_ms']:>9.2f} {record['lines_decoded']:>8} "
+        f"{record.get('strategy') or '-':<12} {record['outcome']:<6} "
+        f"{record['reason'] or ''}"
+    )
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    """Human-readable replay summary."""
+    wall = summary["wall_ms"]
+    loops = ", ".join(str(step) for step in summary["loop_steps"]) or "never"
+    return "\n".join(
+        [
+            f"{summary['steps']} Stop hook calls, "
+            f"{summary['lines_decoded']} transcript lines decoded",
+            "wall " + " ".join(f"{name} {ms:.2f} ms" for name, ms in wall.items()),
+            "outcomes: "
+            + ", ".join(f"{k} {v}" for k, v in sorted(summary["outcomes"].items())),
+            "strategies: "
+            + ", ".join(f"{k} {v}" for k, v in sorted(summary["strategies"].items())),
+            f"loop detector fired at steps: {loops}",
+        ]
+    )
+
+
+def main() -> None:
+    """Replay a transcript and print the Stop hook's decision timeline."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Replay a transcript through the Stop hook, turn by turn."
+    )
+    parser.add_argument("transcript", help="Transcript JSONL to replay")
+    parser.add_argument(
+        "--cold", action="store_true", help="Discard scan checkpoints between steps"
+    )
+    parser.add_argument(
+        "--event-log",
+        action="store_true",
+        help="Record workflow events as workflow_event_hook.py would",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print one JSON record per step"
+    )
+    args = parser.parse_args()
+
+    records = []
+    with tempfile.TemporaryDirectory(prefix="manifest-dev-replay-") as workdir:
+        if not args.json:
+            print(TIMELINE_HEADER)
+        try:
+            for record in replay(args.transcript, workdir, args.cold, args.event_log):
+                records.append(record)
+                print(json.dumps(record) if args.json else format_step(record))
+        except OSError as e:
+            print(f"Cannot replay {args.transcript}: {e}", file=sys.stderr)
+            sys.exit(1)
+    if not args.json:
+        print()
+        print(format_summary(summarize_replay(records)))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
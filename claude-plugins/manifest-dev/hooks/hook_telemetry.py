@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Opt-in latency telemetry for the manifest-dev hooks.
+
+With MANIFEST_DEV_TELEMETRY=1, every hook invocation appends one JSON record
+to <state dir>/telemetry/hooks.jsonl: wall time, exclusive time per phase
+(stdin, transcript, decision), transcript size, transcript lines decoded vs
+skipped, the decision outcome and the strategy that answered. The log is
+rotated at TELEMETRY_MAX_BYTES, keeping TELEMETRY_BACKUPS old files.
+
+Usage: python3 hook_telemetry.py [--file PATH] [--hook NAME] [--json]
+
+Prints p50/p95/p99 and a latency histogram per hook from the log.
+
+When telemetry is off, start_telemetry() returns a recorder whose methods
+do nothing, so hooks can instrument unconditionally. Imports only os, sys
+and time; the transcript line count for skipped lines is taken after the
+wall time is recorded, so it doesn't skew the measurement.
+
+With MANIFEST_DEV_PROFILE set, hook entry points (see run_main) run under
+cProfile and/or tracemalloc and write <hook>-<time>-<pid>.pstats and
+.alloc.txt next to the telemetry log.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+# typing.TYPE_CHECKING without importing typing (and re through it), which
+# would cost hooks that exit early more than everything else they import;
+# type checkers treat any TYPE_CHECKING as true. Hooks import it from here.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any
+
+# Overrides where hooks keep persistent state (checkpoints, caches, logs)
+STATE_DIR_ENV = "MANIFEST_DEV_STATE_DIR"
+
+# Set to "1" to record hook telemetry
+TELEMETRY_ENV = "MANIFEST_DEV_TELEMETRY"
+
+# Bump when the telemetry record format changes
+TELEMETRY_VERSION = 1
+
+TELEMETRY_FILE = "hooks.jsonl"
+
+# Rotate the log once it reaches this size, keeping this many old logs
+TELEMETRY_MAX_BYTES = 5 * 1024 * 1024
+TELEMETRY_BACKUPS = 3
+
+# Slice size when counting transcript lines for lines_skipped
+_COUNT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Profile hook entry points: "1" or "all" for cProfile and tracemalloc,
+# "cpu" for cProfile only, "memory" for tracemalloc only (tracemalloc
+# slows everything down, so profile time on its own for accurate numbers)
+PROFILE_ENV = "MANIFEST_DEV_PROFILE"
+PROFILE_MODES = {
+    "1": ("cpu", "memory"),
+    "all": ("cpu", "memory"),
+    "cpu": ("cpu",),
+    "memory": ("memory",),
+}
+
+# Allocation sites listed in the .alloc.txt report
+PROFILE_TOP_ALLOCATIONS = 30
+
+# Frames kept per allocation traceback
+PROFILE_TRACEBACK_FRAMES = 8
+
+# Percentiles reported by the CLI
+REPORT_PERCENTILES = (50, 95, 99)
+
+
+def telemetry_enabled() -> bool:
+    """Whether $MANIFEST_DEV_TELEMETRY asks for telemetry."""
+    return os.environ.get(TELEMETRY_ENV) == "1"
+
+
+def state_dir() -> str:
+    """
+    Directory for persistent hook state.
+
+    Uses $MANIFEST_DEV_STATE_DIR when set, else $XDG_CACHE_HOME/manifest-dev
+    (defaulting to ~/.cache/manifest-dev). Not created here. Lives here, on
+    os alone, so the client and hooks that exit early can find it without
+    importing hook_utils (whose get_state_dir wraps it).
+    """
+    override = os.environ.get(STATE_DIR_ENV)
+    if override:
+        return override
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "manifest-dev")
+
+
+def get_telemetry_dir() -> str:
+    """Directory holding the telemetry log."""
+    return os.path.join(state_dir(), "telemetry")
+
+
+class _Phase:
+    """Context manager timing one phase of a HookTelemetry."""
+
+    def __init__(self, telemetry: HookTelemetry, name: str) -> None:
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.telemetry._enter(self.name)
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.telemetry._exit()
+
+
+class HookTelemetry:
+    """
+    Timings and counters for one hook invocation.
+
+    Phases nest: a phase's time excludes the phases inside it, so the phase
+    times add up to at most the wall time. Disabled instances record nothing.
+    """
+
+    def __init__(self, hook: str, enabled: bool) -> None:
+        self.hook = hook
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        # Set when the wall time stops (see stop)
+        self.end: float | None = None
+        # Exclusive seconds per phase name
+        self.phases: dict[str, float] = {}
+        # Open phases: [name, start, seconds spent in nested phases]
+        self._stack: list[list[Any]] = []
+        self.fields: dict[str, Any] = {}
+        self.lines_decoded = 0
+        # (path, start, end) byte ranges covered by transcript scans
+        self._scanned: list[tuple[str, int, int]] = []
+
+    def phase(self, name: str) -> _Phase:
+        """Time a block as phase name (use as a context manager)."""
+        return _Phase(self, name)
+
+    def _enter(self, name: str) -> None:
+        if self.enabled:
+            self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self) -> None:
+        if not self.enabled:
+            return
+        name, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def note(self, **fields: Any) -> None:
+        """Attach extra fields (e.g. strategy) to the record."""
+        if self.enabled:
+            self.fields.update(fields)
+
+    def add_scan(self, path: str, start: int, end: int, decoded: int) -> None:
+        """Count a transcript scan over bytes [start, end) that decoded lines."""
+        if self.enabled:
+            self.lines_decoded += decoded
+            self._scanned.append((path, start, end))
+
+    def stop(self) -> float:
+        """End the wall time, before any telemetry bookkeeping; returns it."""
+        if self.end is None:
+            self.end = time.perf_counter()
+        return self.end - self.start
+
+    def record(
+        self,
+        hook_input: dict[str, Any] | None,
+        output: dict[str, Any] | None,
+        **fields: Any,
+    ) -> dict[str, Any]:
+        """Build the telemetry record for this invocation, ending the wall time."""
+        wall = self.stop()
+        import contextlib
+
+        transcript_path = (hook_input or {}).get("transcript_path")
+        transcript_bytes = None
+        if isinstance(transcript_path, str) and transcript_path:
+            with contextlib.suppress(OSError):
+                transcript_bytes = os.stat(transcript_path).st_size
+        scanned_lines = sum(
+            _count_lines(path, start, end) for path, start, end in self._scanned
+        )
+        return {
+            "version": TELEMETRY_VERSION,
+            "hook": self.hook,
+            "time": round(time.time(), 3),
+            "wall_ms": round(wall * 1000, 3),
+            "phases_ms": {
+                name: round(seconds * 1000, 3) for name, seconds in self.phases.items()
+            },
+            "transcript_bytes": transcript_bytes,
+            "lines_decoded": self.lines_decoded,
+            "lines_skipped": max(0, scanned_lines - self.lines_decoded),
+            "outcome": outcome_of(output),
+            **self.fields,
+            **fields,
+        }
+
+    def finish(
+        self,
+        hook_input: dict[str, Any] | None,
+        output: dict[str, Any] | None,
+        **fields: Any,
+    ) -> None:
+        """Append this invocation's record to the telemetry log (if enabled)."""
+        if not self.enabled:
+            return
+        self.stop()
+        import json
+
+        line = json.dumps(self.record(hook_input, output, **fields)) + "\n"
+        append_record(line.encode("utf-8"))
+
+
+_DISABLED = HookTelemetry("", enabled=False)
+_current = _DISABLED
+
+
+def start_telemetry(hook: str, enabled: bool | None = None) -> HookTelemetry:
+    """
+    Begin timing a hook invocation; current_telemetry() returns it until the next.
+
+    Enabled per $MANIFEST_DEV_TELEMETRY unless enabled says otherwise.
+    """
+    global _current
+    _current = HookTelemetry(hook, telemetry_enabled() if enabled is None else enabled)
+    return _current
+
+
+def current_telemetry() -> HookTelemetry:
+    """The invocation being timed (a disabled recorder outside hooks)."""
+    return _current
+
+
+def outcome_of(output: dict[str, Any] | None) -> str:
+    """Summarize a hook output: its decision, "context", or "none"."""
+    if output is None:
+        return "none"
+    decision = output.get("decision")
+    if isinstance(decision, str):
+        return decision
+    if "hookSpecificOutput" in output:
+        return "context"
+    return "output"
+
+
+def _count_lines(path: str, start: int, end: int) -> int:
+    """Number of newlines in bytes [start, end) of path (0 if unreadable)."""
+    if end <= start:
+        return 0
+    import mmap
+
+    try:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+        ):
+            # Bounded slices, so large transcripts aren't copied whole
+            return sum(
+                buf[offset : min(offset + _COUNT_CHUNK_BYTES, end)].count(b"\n")
+                for offset in range(start, end, _COUNT_CHUNK_BYTES)
+            )
+    except (OSError, ValueError):
+        return 0
+
+
+def get_telemetry_path() -> str:
+    """Path of the current telemetry log."""
+    return os.path.join(get_telemetry_dir(), TELEMETRY_FILE)
+
+
+def _rotate(path: str) -> None:
+    """Shift path to path.1, path.1 to path.2, ... dropping the oldest."""
+    import contextlib
+
+    for index in range(TELEMETRY_BACKUPS - 1, 0, -1):
+        with contextlib.suppress(OSError):
+            os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    with contextlib.suppress(OSError):
+        os.replace(path, f"{path}.1")
+
+
+def append_record(line: bytes) -> None:
+    """Append one encoded record, rotating the log when it's full."""
+    path = get_telemetry_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.stat(path).st_size + len(line) > TELEMETRY_MAX_BYTES:
+                _rotate(path)
+        except FileNotFoundError:
+            pass
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            # One write per record keeps concurrent appends whole
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        # Telemetry never breaks a hook
+        pass
+
+
+def run_main(hook: str, main: Callable[[], None]) -> None:
+    """
+    Run a hook's main(), profiled if $MANIFEST_DEV_PROFILE asks for it.
+
+    The profile is written even when main() exits through sys.exit.
+    """
+    modes = PROFILE_MODES.get(os.environ.get(PROFILE_ENV, "").strip().lower())
+    if not modes:
+        main()
+        return
+
+    import cProfile
+    import tracemalloc
+
+    stem = os.path.join(
+        get_telemetry_dir(),
+        f"{hook}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}",
+    )
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    if "memory" in modes:
+        tracemalloc.start(PROFILE_TRACEBACK_FRAMES)
+    try:
+        if profiler is None:
+            main()
+        else:
+            profiler.runcall(main)
+    finally:
+        # Before writing anything, so the report only shows the hook's memory
+        allocations = _allocation_report() if tracemalloc.is_tracing() else None
+        tracemalloc.stop()
+        try:
+            os.makedirs(os.path.dirname(stem), exist_ok=True)
+            if profiler is not None:
+                profiler.dump_stats(f"{stem}.pstats")
+                print(f"Profile: {stem}.pstats", file=sys.stderr)
+            if allocations is not None:
+                with open(f"{stem}.alloc.txt", "w", encoding="utf-8") as f:
+                    f.write(allocations)
+                print(f"Allocations: {stem}.alloc.txt", file=sys.stderr)
+        except OSError as e:
+            print(f"Profile not written: {e}", file=sys.stderr)
+
+
+def _allocation_report() -> str:
+    """Peak traced memory and the top allocation sites still live."""
+    import cProfile
+    import tracemalloc
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+    )
+    lines = [
+        f"Peak traced memory: {peak / 1024:.1f} KiB",
+        f"Live at exit: {current / 1024:.1f} KiB",
+        "",
+        f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites live at exit:",
+    ]
+    stats = snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+    for index, stat in enumerate(stats, 1):
+        frame = stat.traceback[0]
+        lines.append(
+            f"#{index}: {frame.filename}:{frame.lineno} "
+            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks"
+        )
+    lines.append("")
+    lines.append("Tracebacks of the top 5:")
+    for stat in stats[:5]:
+        lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+def read_records(path: str) -> list[dict[str, Any]]:
+    """Records from a telemetry log and its rotated files, oldest first."""
+    import json
+
+    records: list[dict[str, Any]] = []
+    paths = [f"{path}.{index}" for index in range(TELEMETRY_BACKUPS, 0, -1)]
+    for log_path in [*paths, path]:
+        try:
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and "hook" in record:
+                        records.append(record)
+        except OSError:
+            continue
+    return records
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already-sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def histogram(values: list[float], width: int = 40) -> list[str]:
+    """Text histogram of millisecond values in power-of-two buckets."""
+    buckets: dict[int, int] = {}
+    for value in values:
+        bucket = 0
+        while (1 << bucket) < value:
+            bucket += 1
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    if not buckets:
+        return []
+    peak = max(buckets.values())
+    lines = []
+    for bucket in range(min(buckets), max(buckets) + 1):
+        count = buckets.get(bucket, 0)
+        bar = "#" * max(1 if count else 0, round(width * count / peak))
+        lines.append(f"  <= {1 << bucket:>6} ms {count:>7}  {bar}")
+    return lines
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Per-hook count, wall-time and phase percentiles, and outcomes."""
+    by_hook: dict[str, list[dict[str, Any]]] = {}
+    for record in records:
+        by_hook.setdefault(record["hook"], []).append(record)
+
+    summary: dict[str, dict[str, Any]] = {}
+    for hook, hook_records in sorted(by_hook.items()):
+        walls = sorted(float(r.get("wall_ms", 0.0)) for r in hook_records)
+        phases: dict[str, list[float]] = {}
+        outcomes: dict[str, int] = {}
+        for record in hook_records:
+            for name, ms in record.get("phases_ms", {}).items():
+                phases.setdefault(name, []).append(float(ms))
+            outcome = str(record.get("outcome"))
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        summary[hook] = {
+            "count": len(hook_records),
+            "wall_ms": {f"p{p}": percentile(walls, p) for p in REPORT_PERCENTILES},
+            "phases_ms": {
+                name: {f"p{p}": percentile(sorted(v), p) for p in REPORT_PERCENTILES}
+                for name, v in sorted(phases.items())
+            },
+            "outcomes": outcomes,
+        }
+    return summary
+
+
+def format_report(records: list[dict[str, Any]]) -> str:
+    """Human-readable latency report, one section per hook."""
+    if not records:
+        return "No telemetry records."
+    sections = []
+    summary = summarize(records)
+    for hook, stats in summary.items():
+        wall = stats["wall_ms"]
+        lines = [
+            f"{hook}: {stats['count']} calls, wall "
+            + " ".join(f"{name} {ms:.2f} ms" for name, ms in wall.items())
+        ]
+        for name, phase in stats["phases_ms"].items():
+            lines.append(
+                f"  {name:<12}"
+                + " ".join(f"{pct} {ms:.2f} ms" for pct, ms in phase.items())
+            )
+        outcomes = ", ".join(f"{k} {v}" for k, v in sorted(stats["outcomes"].items()))
+        lines.append(f"  outcomes: {outcomes}")
+        walls = [float(r.get("wall_ms", 0.0)) for r in records if r["hook"] == hook]
+        lines.extend(histogram(walls))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def main() -> None:
+    """Print a latency report from the telemetry log."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report hook latency telemetry.")
+    parser.add_argument(
+        "--file", default=get_telemetry_path(), help="Telemetry log to read"
+    )
+    parser.add_argument("--hook", help="Only report this hook")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    records = read_records(args.file)
+    if args.hook:
+        records = [r for r in records if r["hook"] == args.hook]
+    if args.json:
+        import json
+
+        print(json.dumps(summarize(records), indent=2))
+    else:
+        print(format_report(records))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
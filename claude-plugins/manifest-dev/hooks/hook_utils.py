@@ -7,10 +7,132 @@ Contains transcript parsing for skill invocation detection.
 
 from __future__ import annotations
 
+import contextlib
+import functools
+import hashlib
 import json
+import mmap
+import os
 import re
-from dataclasses import dataclass
-from typing import Any
+import sys
+import time
+from collections.abc import Callable, Collection, Iterator
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, BinaryIO, Protocol
+
+from hook_telemetry import current_telemetry, state_dir
+
+# Block size for reading transcripts backwards from EOF
+REVERSE_READ_BLOCK_SIZE = 64 * 1024
+
+# Lines longer than this (base64 images, huge file reads) are never held in
+# memory whole: readers keep only their head and classify the line from it
+# (see decode_line_head), so peak memory doesn't depend on the longest line
+MAX_LINE_BYTES = 1024 * 1024
+
+# Bytes kept from the start of an oversized line. Claude Code writes the
+# line's metadata, including "type" and "isMeta", before "message", and the
+# message's first content block follows; this covers all of them.
+LINE_HEAD_BYTES = 4096
+
+# Chunk size for skipping the rest of an oversized line
+SKIP_CHUNK_BYTES = 64 * 1024
+
+# Bytes before a checkpoint offset hashed to detect in-place rewrites
+CHECKPOINT_DIGEST_BYTES = 256
+
+# A transcript line can only affect a scan if it contains one of these byte
+# strings: assistant messages (API-error flag, short-output streak and Skill
+# tool calls all live on assistant lines), slash-command tags, and isMeta
+# skill expansions. Each marker costs one pass over the file, so keep it short.
+ASSISTANT_MARKER = b'"assistant"'
+SCAN_MARKERS = (ASSISTANT_MARKER, b"command-name", b"isMeta")
+
+# A /do with arguments resets the flow whatever came before it, so a scan
+# without a checkpoint can start at the last one. Such /do invocations are
+# slash commands or Skill tool calls; these byte strings find both.
+DO_RESET_MARKERS = (b"do</command-name>", b'"Skill"')
+
+# Lines that can invoke a workflow skill: slash commands, isMeta skill
+# expansions and Skill tool calls
+WORKFLOW_MARKERS = (b"command-name", b"isMeta", b'"Skill"')
+
+# Skills that drive the /do workflow state machine
+WORKFLOW_SKILLS = frozenset({"do", "verify", "done", "escalate"})
+
+_WORKFLOW_SKILL_ALTERNATION = "|".join(sorted(WORKFLOW_SKILLS))
+# isMeta expansion: skills/{skill-name} followed by /, whitespace or end
+_WORKFLOW_SKILL_PATH_PATTERN = re.compile(
+    rf"skills/({_WORKFLOW_SKILL_ALTERNATION})(?=/|\s|$)"
+)
+# Command-name tag: /<skill> or /manifest-dev:<skill> (only our plugin)
+_WORKFLOW_COMMAND_PATTERN = re.compile(
+    rf"<command-name>/(?:manifest-dev:)?({_WORKFLOW_SKILL_ALTERNATION})</command-name>"
+)
+
+# Forces a JSON backend for transcript decoding: msgspec, orjson or json
+JSON_BACKEND_ENV = "MANIFEST_DEV_JSON_BACKEND"
+# Preference order; optional backends are used only when importable
+JSON_BACKENDS = ("msgspec", "orjson", "json")
+
+# Bump when the workflow event log record format changes
+WORKFLOW_LOG_VERSION = 1
+
+# Bump when the compaction snapshot format changes
+COMPACT_SNAPSHOT_VERSION = 1
+
+# Compaction snapshots older than this (seconds) are ignored: the snapshot is
+# for the SessionStart hook right after the compaction it was taken for
+COMPACT_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Per-session state is deleted once untouched for this long (seconds), by
+# subdirectory of the state dir; a session left for a month rarely resumes,
+# and a stale snapshot is never read
+SESSION_STATE_MAX_AGE = {
+    "checkpoints": 30 * 24 * 60 * 60,
+    "workflow": 30 * 24 * 60 * 60,
+    "compact": COMPACT_SNAPSHOT_MAX_AGE,
+}
+
+# Seconds between sweeps of per-session state; writes in between only stat
+# the marker
+SESSION_STATE_SWEEP_INTERVAL = 24 * 60 * 60
+
+# Execution log the /do skill creates when not given one (do-log-*.md), as a
+# path in a transcript line; the skill's own "{timestamp}" placeholder doesn't
+# match. DO_LOG_MARKER finds candidate lines without decoding them.
+DO_LOG_MARKER = b"/do-log-"
+_DO_LOG_PATH_PATTERN = re.compile(rb"(?:/[\w.-]+)*/do-log-[\w.-]+\.md")
+
+# Seconds to wait for a git command
+GIT_TIMEOUT = 60.0
+
+# Latency budget per hook call in milliseconds; 0 disables it
+HOOK_BUDGET_ENV = "MANIFEST_DEV_HOOK_BUDGET_MS"
+DEFAULT_HOOK_BUDGET_MS = 2000
+
+# What a hook decides when workflow state is unknown within its budget:
+# "open" lets the action proceed, "closed" blocks or reminds anyway
+FAIL_MODE_ENV = "MANIFEST_DEV_HOOK_FAIL_MODE"
+FAIL_MODES = ("open", "closed")
+
+# Share of the budget held back for the bounded tail-window fallback
+DEGRADED_BUDGET_SHARE = 0.25
+
+# Bytes at the end of the transcript read by the tail-window fallback
+TAIL_WINDOW_BYTES = 8 * 1024 * 1024
+
+# Candidate lines decoded between deadline checks
+DEADLINE_CHECK_LINES = 64
+
+# Which strategy answered a workflow-state query
+STRATEGY_EVENT_LOG = "event-log"  # workflow event log (+ transcript tail)
+STRATEGY_SCAN = "scan"  # full or incremental transcript scan
+STRATEGY_TAIL_WINDOW = "tail-window"  # checkpoint + transcript tail, degraded
+STRATEGY_UNKNOWN = "unknown"  # nothing could answer in time; fail mode applies
+STRATEGY_SNAPSHOT = "snapshot"  # snapshot taken just before compaction
+DEGRADED_STRATEGIES = frozenset({STRATEGY_TAIL_WINDOW, STRATEGY_UNKNOWN})
 
 
 @dataclass
@@ -24,11 +146,481 @@ class DoFlowState:
     do_args: str | None  # raw arguments from /do invocation
 
 
+def get_state_dir() -> Path:
+    """Directory for persistent hook state (see hook_telemetry.state_dir)."""
+    return Path(state_dir())
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask where supported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def _git_stdout(
+    args: list[str], cwd: str, env: dict[str, str] | None, input: str | None = None
+) -> str | None:
+    """
+    A git command's stdout as is, or None if it failed or git is missing.
+
+    input is written to its stdin; without it stdin is closed.
+    """
+    import subprocess
+
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            env=env,
+            input=input or "",
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def git_output(
+    args: list[str],
+    cwd: str,
+    env: dict[str, str] | None = None,
+    input: str | None = None,
+) -> str | None:
+    """A git command's stripped stdout, or None if it failed or git is missing."""
+    stdout = _git_stdout(args, cwd, env, input)
+    return None if stdout is None else stdout.strip()
+
+
+def git_paths(args: list[str], cwd: str) -> list[str] | None:
+    """
+    The paths a git command lists with -z (args must include it).
+
+    Split on NUL and not stripped, so names starting or ending with spaces
+    survive. None if the command failed or git is missing.
+    """
+    stdout = _git_stdout(args, cwd, None)
+    return None if stdout is None else [path for path in stdout.split("\0") if path]
+
+
+def get_hook_budget() -> float | None:
+    """
+    Latency budget for one hook call, in seconds (None for no limit).
+
+    From $MANIFEST_DEV_HOOK_BUDGET_MS; invalid values use the default.
+    """
+    try:
+        budget_ms = float(os.environ.get(HOOK_BUDGET_ENV, DEFAULT_HOOK_BUDGET_MS))
+    except ValueError:
+        budget_ms = DEFAULT_HOOK_BUDGET_MS
+    return budget_ms / 1000 if budget_ms > 0 else None
+
+
+def get_fail_mode() -> str:
+    """Fail mode from $MANIFEST_DEV_HOOK_FAIL_MODE: "open" (default) or "closed"."""
+    mode = os.environ.get(FAIL_MODE_ENV, "").strip().lower()
+    return mode if mode in FAIL_MODES else "open"
+
+
+def report_strategy(hook_name: str, strategy: str) -> None:
+    """Note on stderr (shown in verbose mode) when a degraded strategy answered."""
+    if strategy in DEGRADED_STRATEGIES:
+        print(
+            f"manifest-dev {hook_name}: latency budget exceeded, "
+            f"answered from {strategy} (fail mode: {get_fail_mode()})",
+            file=sys.stderr,
+        )
+
+
 def build_system_reminder(content: str) -> str:
     """Wrap content in a system-reminder tag."""
     return f"<system-reminder>{content}</system-reminder>"
 
 
+LineDecoder = Callable[[bytes], Any]
+
+
+def _orjson_decoder() -> LineDecoder:
+    """orjson decoder; raises ImportError when orjson isn't installed."""
+    import orjson
+
+    decoder: LineDecoder = orjson.loads
+    return decoder
+
+
+def _msgspec_decoder() -> LineDecoder:
+    """
+    msgspec decoder typed to the transcript fields hooks read.
+
+    Decodes into structs holding only type, isMeta, isApiErrorMessage and
+    message.content blocks (type, text, name, input), so large tool-result
+    payloads are skipped rather than materialized. Lines whose fields have
+    unexpected types are decoded untyped instead. Raises ImportError when
+    msgspec isn't installed.
+    """
+    import msgspec
+
+    block_type = msgspec.defstruct(
+        "TranscriptBlock",
+        [("type", str, ""), ("text", str, ""), ("name", str, ""), ("input", dict, {})],
+    )
+    message_type = msgspec.defstruct(
+        "TranscriptMessage", [("content", str | list[block_type], [])]  # type: ignore[valid-type]
+    )
+    line_type = msgspec.defstruct(
+        "TranscriptLine",
+        [
+            ("type", str, ""),
+            ("isMeta", bool, False),
+            ("isApiErrorMessage", bool, False),
+            ("message", message_type | None, None),
+        ],
+    )
+    typed = msgspec.json.Decoder(line_type)
+    untyped = msgspec.json.Decoder()
+
+    def decode(raw: bytes) -> Any:
+        try:
+            line: Any = typed.decode(raw)
+        except msgspec.ValidationError:
+            try:
+                return untyped.decode(raw)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+        data: dict[str, Any] = {
+            "type": line.type,
+            "isMeta": line.isMeta,
+            "isApiErrorMessage": line.isApiErrorMessage,
+        }
+        if line.message is not None:
+            content = line.message.content
+            if not isinstance(content, str):
+                content = [
+                    {
+                        "type": block.type,
+                        "text": block.text,
+                        "name": block.name,
+                        "input": block.input,
+                    }
+                    for block in content
+                ]
+            data["message"] = {"content": content}
+        return data
+
+    return decode
+
+
+_JSON_BACKEND_FACTORIES: dict[str, Callable[[], LineDecoder]] = {
+    "msgspec": _msgspec_decoder,
+    "orjson": _orjson_decoder,
+    "json": lambda: json.loads,
+}
+
+
+@functools.cache
+def _select_json_backend() -> tuple[str, LineDecoder]:
+    """Pick the first importable backend, honoring MANIFEST_DEV_JSON_BACKEND."""
+    forced = os.environ.get(JSON_BACKEND_ENV, "")
+    candidates = (forced,) if forced in _JSON_BACKEND_FACTORIES else JSON_BACKENDS
+    for name in candidates:
+        try:
+            return name, _JSON_BACKEND_FACTORIES[name]()
+        except ImportError:
+            continue
+    return "json", json.loads
+
+
+def json_backend() -> str:
+    """Name of the JSON backend used by decode_line."""
+    return _select_json_backend()[0]
+
+
+def reload_json_backend() -> None:
+    """Choose the backend again on next use, after JSON_BACKEND_ENV changed."""
+    _select_json_backend.cache_clear()
+
+
+def decode_line(raw: bytes) -> dict[str, Any] | None:
+    """
+    Decode one raw transcript line straight from bytes.
+
+    Uses the fastest available backend (see JSON_BACKENDS). With msgspec the
+    dict only carries the fields hooks read. Returns None for blank lines,
+    malformed JSON, and non-object values.
+    """
+    if not raw or raw.isspace():
+        return None
+    try:
+        data = _select_json_backend()[1](raw)
+    except ValueError:  # malformed JSON or invalid UTF-8
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# Top-level message type of a line, from its head. Content block types are
+# never "user" or "assistant", so the first match is the line's own type.
+_HEAD_TYPE_PATTERN = re.compile(rb'"type"\s*:\s*"(user|assistant)"')
+# Claude Code writes "message" before "type", so a huge message can push the
+# type out of the head; the message's role says the same
+_HEAD_ROLE_PATTERN = re.compile(rb'"role"\s*:\s*"(user|assistant)"')
+# Line types that are neither prompts nor output (never content block types)
+_HEAD_OTHER_TYPE_PATTERN = re.compile(
+    rb'"type"\s*:\s*"(?:system|summary|progress|file-history-snapshot)"'
+)
+_HEAD_IS_META_PATTERN = re.compile(rb'"isMeta"\s*:\s*true')
+
+
+def decode_line_head(head: bytes) -> dict[str, Any] | None:
+    """
+    Stand-in for decoding an oversized line, from its first bytes only.
+
+    An oversized assistant line is substantial output that invokes no
+    workflow skill (a Skill call is never megabytes): it stands in as one
+    non-Skill tool call. An oversized user line is a tool result when its
+    first content block says so, else a prompt or isMeta expansion whose
+    text is ignored. The type comes from the head's top-level "type", else
+    its message "role". Lines of another known type return None, like
+    undecodable ones; a line that can't be classified stands in as
+    substantial output, so dropping it can't join two short-output streaks.
+    """
+    match = _HEAD_TYPE_PATTERN.search(head) or _HEAD_ROLE_PATTERN.search(head)
+    if match is None and _HEAD_OTHER_TYPE_PATTERN.search(head):
+        return None
+    if match is None or match.group(1) == b"assistant":
+        return {
+            "type": "assistant",
+            "message": {"content": [{"type": "tool_use", "name": ""}]},
+        }
+    if b'"tool_result"' in head:
+        return {"type": "user", "message": {"content": [{"type": "tool_result"}]}}
+    return {
+        "type": "user",
+        "isMeta": _HEAD_IS_META_PATTERN.search(head) is not None,
+        "message": {"content": ""},
+    }
+
+
+def decode_sized_line(raw: bytes, size: int) -> dict[str, Any] | None:
+    """
+    Decode a line from iter_bounded_lines or iter_bounded_lines_reversed.
+
+    raw is the whole line when it's no longer than size, else just its head
+    (see decode_line_head).
+    """
+    if len(raw) >= size:
+        return decode_line(raw)
+    return decode_line_head(raw)
+
+
+def _decode_span(buf: mmap.mmap | bytes, start: int, end: int) -> dict[str, Any] | None:
+    """Decode the line at buf[start:end], from its head if it's oversized."""
+    if end - start > MAX_LINE_BYTES:
+        return decode_line_head(buf[start : start + LINE_HEAD_BYTES])
+    return decode_line(buf[start:end])
+
+
+def may_affect_scan(raw: bytes) -> bool:
+    """
+    Cheap byte-level check for whether a raw line is worth decoding.
+
+    False means the line can't change a transcript scan (typically tool
+    results and file contents), so json decoding can be skipped.
+    """
+    return any(marker in raw for marker in SCAN_MARKERS)
+
+
+def iter_marker_lines(
+    buf: mmap.mmap | bytes, markers: tuple[bytes, ...], start: int = 0
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield (start, end) spans of lines in buf that contain any marker.
+
+    Spans are in file order; end includes the trailing newline if present.
+    buf must be positioned so that start is a line start. Each marker is
+    searched with find() and its next hit cached, so every byte is scanned
+    at most once per marker and lines without markers are never sliced.
+    """
+    size = len(buf)
+    next_hits = {marker: buf.find(marker, start) for marker in markers}
+    position = start
+
+    while True:
+        hits = [hit for hit in next_hits.values() if hit >= 0]
+        if not hits:
+            return
+        hit = min(hits)
+
+        newline_before = buf.rfind(b"\n", position, hit)
+        line_start = position if newline_before < 0 else newline_before + 1
+        newline_after = buf.find(b"\n", hit)
+        line_end = size if newline_after < 0 else newline_after + 1
+        yield line_start, line_end
+
+        position = line_end
+        for marker, marker_hit in next_hits.items():
+            if 0 <= marker_hit < position:
+                next_hits[marker] = buf.find(marker, position)
+
+
+def iter_marker_lines_reversed(
+    buf: mmap.mmap | bytes, markers: tuple[bytes, ...], end: int, start: int = 0
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield (start, end) spans of lines in buf[start:end] that contain any marker.
+
+    Like iter_marker_lines, but from last to first using rfind(), so callers
+    that stop early only search the tail. start and end must be line
+    boundaries.
+    """
+    previous_hits = {marker: buf.rfind(marker, start, end) for marker in markers}
+    position = end
+
+    while True:
+        hit = max(previous_hits.values())
+        if hit < 0:
+            return
+
+        newline_before = buf.rfind(b"\n", start, hit)
+        line_start = start if newline_before < 0 else newline_before + 1
+        newline_after = buf.find(b"\n", hit, position)
+        line_end = position if newline_after < 0 else newline_after + 1
+        yield line_start, line_end
+
+        position = line_start
+        for marker, marker_hit in previous_hits.items():
+            if marker_hit >= position:
+                previous_hits[marker] = buf.rfind(marker, start, position)
+
+
+def iter_lines_reversed(
+    transcript_path: str, block_size: int = REVERSE_READ_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """
+    Yield raw transcript lines from last to first.
+
+    Reads fixed-size blocks backwards from EOF, so callers that stop early
+    only pay for the tail they inspect. Lines longer than a block are
+    assembled from their pieces without re-copying the partial line per block.
+    Raises OSError if the file can't be opened.
+    """
+    with open(transcript_path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        # Pieces of the line being assembled, latest piece first
+        pending: list[bytes] = []
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            parts = f.read(read_size).split(b"\n")
+
+            if len(parts) == 1:
+                pending.append(parts[0])
+                continue
+
+            pending.append(parts[-1])
+            yield b"".join(reversed(pending))
+            yield from reversed(parts[1:-1])
+            pending = [parts[0]]
+
+        if pending:
+            yield b"".join(reversed(pending))
+
+
+def iter_bounded_lines(
+    f: BinaryIO, max_line_bytes: int = MAX_LINE_BYTES
+) -> Iterator[tuple[bytes, int]]:
+    """
+    Yield (raw, size) for each line of an open file, from its position on.
+
+    size counts the line's bytes, newline included. Lines up to
+    max_line_bytes come whole; longer ones as their first LINE_HEAD_BYTES,
+    plus the newline if they had one (so complete lines still end in one),
+    with the rest read in SKIP_CHUNK_BYTES chunks and dropped. Nothing
+    larger than max_line_bytes is ever buffered.
+    """
+    while True:
+        line = f.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) <= max_line_bytes or line.endswith(b"\n"):
+            yield line, len(line)
+            continue
+
+        size = len(line)
+        head = line[:LINE_HEAD_BYTES]
+        del line
+        while True:
+            rest = f.readline(SKIP_CHUNK_BYTES)
+            size += len(rest)
+            if not rest:
+                break
+            if rest.endswith(b"\n"):
+                head += b"\n"
+                break
+        yield head, size
+
+
+def iter_bounded_lines_reversed(
+    transcript_path: str,
+    max_line_bytes: int = MAX_LINE_BYTES,
+    block_size: int = REVERSE_READ_BLOCK_SIZE,
+) -> Iterator[tuple[bytes, int]]:
+    """
+    Yield (raw, size) for each transcript line, from last to first.
+
+    Like iter_lines_reversed (lines without their newline), except that
+    lines longer than max_line_bytes come as their first LINE_HEAD_BYTES
+    only: while such a line is assembled backwards, pieces past its head
+    are dropped, so nothing much larger than a block plus a head is ever
+    buffered. size is the line's full length. Raises OSError if the file
+    can't be opened.
+    """
+    with open(transcript_path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        # Pieces of the line being assembled, latest piece first, and its size
+        pending: list[bytes] = []
+        pending_size = 0
+
+        def assembled() -> tuple[bytes, int]:
+            line = b"".join(reversed(pending))
+            if pending_size > max_line_bytes:
+                return line[:LINE_HEAD_BYTES], pending_size
+            return line, pending_size
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            parts = f.read(read_size).split(b"\n")
+
+            pending.append(parts[-1])
+            pending_size += len(parts[-1])
+            if len(parts) == 1:
+                if pending_size > max_line_bytes:
+                    # Only the head matters: drop pieces past it
+                    while sum(len(p) for p in pending[1:]) >= LINE_HEAD_BYTES:
+                        pending.pop(0)
+                continue
+
+            yield assembled()
+            for part in reversed(parts[1:-1]):
+                if len(part) > max_line_bytes:
+                    yield part[:LINE_HEAD_BYTES], len(part)
+                else:
+                    yield part, len(part)
+            pending = [parts[0]]
+            pending_size = len(parts[0])
+
+        if pending:
+            yield assembled()
+
+
 def get_message_text(line_data: dict[str, Any]) -> str:
     """Extract text content from a message line."""
     message = line_data.get("message", {})
@@ -133,6 +725,12 @@ def _is_skill_tool_call(line_data: dict[str, Any], skill_name: str) -> bool:
     return False
 
 
+@functools.cache
+def _skill_path_pattern(skill_name: str) -> re.Pattern[str]:
+    """Compiled skills/{skill-name} matcher for isMeta expansions."""
+    return re.compile(rf"skills/{re.escape(skill_name)}(?:/|\s|$)")
+
+
 def _is_user_skill_invocation(line_data: dict[str, Any], skill_name: str) -> bool:
     """Check if user message represents a skill invocation."""
     text = get_message_text(line_data)
@@ -141,8 +739,7 @@ def _is_user_skill_invocation(line_data: dict[str, Any], skill_name: str) -> boo
     if line_data.get("isMeta"):
         if "Base directory for this skill:" in text:
             # Match skills/{skill-name} or skills/{skill-name}/
-            pattern = rf"skills/{re.escape(skill_name)}(?:/|\s|$)"
-            if re.search(pattern, text):
+            if _skill_path_pattern(skill_name).search(text):
                 return True
 
     # Pattern 3: command-name tags (various formats)
@@ -153,6 +750,47 @@ def _is_user_skill_invocation(line_data: dict[str, Any], skill_name: str) -> boo
     )
 
 
+def classify_skill_invocations(line_data: dict[str, Any]) -> frozenset[str]:
+    """
+    Return every workflow skill (see WORKFLOW_SKILLS) this line invokes.
+
+    Equivalent to calling was_skill_invoked for each workflow skill, but
+    walks the content blocks and builds the message text only once, then
+    matches all skill names with precompiled patterns.
+    """
+    msg_type = line_data.get("type")
+
+    # Pattern 1: Model Skill tool call
+    if msg_type == "assistant":
+        content = line_data.get("message", {}).get("content", [])
+        if isinstance(content, str):
+            return frozenset()
+
+        invoked: set[str] = set()
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") != "tool_use" or block.get("name") != "Skill":
+                continue
+            skill = block.get("input", {}).get("skill", "")
+            # Match "skill-name" or "plugin:skill-name"
+            if isinstance(skill, str):
+                name = skill.rsplit(":", 1)[-1]
+                if name in WORKFLOW_SKILLS:
+                    invoked.add(name)
+        return frozenset(invoked)
+
+    # Patterns 2 & 3: User invocations
+    if msg_type == "user":
+        text = get_message_text(line_data)
+        invoked = set(_WORKFLOW_COMMAND_PATTERN.findall(text))
+        if line_data.get("isMeta") and "Base directory for this skill:" in text:
+            invoked.update(_WORKFLOW_SKILL_PATH_PATTERN.findall(text))
+        return frozenset(invoked)
+
+    return frozenset()
+
+
 # Legacy aliases for backward compatibility
 def is_skill_invocation(line_data: dict[str, Any], skill_name: str) -> bool:
     """Check if this line contains a Skill tool call for the given skill."""
@@ -215,104 +853,712 @@ def extract_user_command_args(line_data: dict[str, Any], skill_name: str) -> str
     return None
 
 
-def has_recent_api_error(transcript_path: str) -> bool:
+@dataclass
+class TranscriptScan:
+    """Everything the Stop hook needs from a transcript, gathered in one pass."""
+
+    api_error: bool  # most recent assistant message was an API error
+    do_flow: DoFlowState  # state of the most recent /do workflow
+    consecutive_short: int  # short assistant outputs at the end of the transcript
+
+
+def is_short_output(line_data: dict[str, Any]) -> bool:
     """
-    Check if the most recent assistant message was an API error.
+    Classify an assistant message for loop detection.
 
-    API errors (like 529 Overloaded) are marked with isApiErrorMessage=true.
-    These are system failures, not voluntary stops, so hooks should allow them.
+    A "short output" is an assistant message with:
+    - Less than 100 characters of text
+    - No tool uses (or only Skill tool use which might be an /escalate attempt)
+    """
+    message = line_data.get("message", {})
+    content = message.get("content", [])
+
+    # Get text content length and check for meaningful tool uses
+    text_len = 0
+    has_meaningful_tool = False
+
+    if isinstance(content, str):
+        text_len = len(content.strip())
+    elif isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict):
+                if block.get("type") == "text":
+                    text_len += len(block.get("text", "").strip())
+                elif block.get("type") == "tool_use":
+                    tool_name = block.get("name", "")
+                    # Skill invocations don't count as "meaningful" for loop detection
+                    # because /escalate attempts would be Skill calls
+                    if tool_name != "Skill":
+                        has_meaningful_tool = True
+
+    return not (has_meaningful_tool or text_len >= 100)
+
+
+def advance_do_flow(
+    state: DoFlowState, invoked: Collection[str], do_args: str | None = None
+) -> None:
     """
-    last_assistant_is_error = False
+    Apply the workflow skills invoked by one event to a /do flow, in place.
+
+    Shared by transcript scanning and the workflow event log, so both read
+    transitions the same way. do_args is the /do argument string, if any.
+    """
+    # Check for /do (any invocation pattern)
+    if "do" in invoked:
+        # isMeta skill expansions follow command-name lines for the same /do
+        # Only reset state if this event has args OR we don't have /do yet
+        # This prevents the isMeta line from clearing args set by command-name line
+        is_new_do = not state.has_do or do_args is not None
+
+        if is_new_do:
+            state.has_do = True
+            state.has_verify = False
+            state.has_done = False
+            state.has_escalate = False
+            if do_args:
+                state.do_args = do_args
+
+    # Check for /verify, /done, /escalate after /do (any invocation pattern)
+    if state.has_do and "verify" in invoked:
+        state.has_verify = True
+
+    if state.has_do and "done" in invoked:
+        state.has_done = True
+
+    if state.has_do and "escalate" in invoked:
+        state.has_escalate = True
+
+
+def _out_of_time(deadline: float | None) -> bool:
+    """Check a time.monotonic() deadline (None never expires)."""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def remaining_budget(deadline: float | None) -> float | None:
+    """Seconds left until a time.monotonic() deadline (None for no limit)."""
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _do_invocation_args(line_data: dict[str, Any]) -> str | None:
+    """Arguments of the /do invoked on a line, from its command or Skill call."""
+    args = extract_user_command_args(line_data, "do")
+    if not args:
+        args = get_skill_call_args(line_data, "do")
+    return args
 
+
+def _find_last_do_reset(
+    buf: mmap.mmap, end: int, start: int = 0, deadline: float | None = None
+) -> tuple[int, int, dict[str, Any]] | None:
+    """
+    Find the last line in buf[start:end] with a /do that has arguments.
+
+    Such a /do resets the flow whatever came before it (see advance_do_flow),
+    so the flow at end depends only on the lines from there on. Returns the
+    line's (start, end) span and its decoded data, or None if there is none
+    or the deadline passes first.
+    """
+    spans = iter_marker_lines_reversed(buf, DO_RESET_MARKERS, end, start)
+    for line_start, line_end in spans:
+        if _out_of_time(deadline):
+            return None
+        data = _decode_span(buf, line_start, line_end)
+        if data is None or "do" not in classify_skill_invocations(data):
+            continue
+        if _do_invocation_args(data):
+            return line_start, line_end, data
+    return None
+
+
+def _assistant_tail_before(
+    buf: mmap.mmap, end: int, start: int = 0
+) -> tuple[bool, int]:
+    """
+    API-error flag and short-output streak as of buf[:end].
+
+    Reads assistant lines in buf[start:end] backwards, stopping at the first
+    substantial output (see has_recent_api_error and
+    count_consecutive_short_outputs, which do the same from EOF).
+    """
+    api_error: bool | None = None
+    consecutive_short = 0
+    spans = iter_marker_lines_reversed(buf, (ASSISTANT_MARKER,), end, start)
+    for line_start, line_end in spans:
+        data = _decode_span(buf, line_start, line_end)
+        if data is None or data.get("type") != "assistant":
+            continue
+        if api_error is None:
+            api_error = bool(data.get("isApiErrorMessage", False))
+        if not is_short_output(data):
+            break
+        consecutive_short += 1
+    return bool(api_error), consecutive_short
+
+
+class _TranscriptScanner:
+    """Accumulates API-error, /do flow and short-output state line by line."""
+
+    def __init__(self) -> None:
+        self.last_assistant_is_error = False
+        self.consecutive_short = 0
+        self.do_flow = DoFlowState(
+            has_do=False,
+            has_verify=False,
+            has_done=False,
+            has_escalate=False,
+            do_args=None,
+        )
+
+    @classmethod
+    def resume(cls, scan: TranscriptScan) -> _TranscriptScanner:
+        """Rebuild a scanner whose state matches a previous result."""
+        scanner = cls()
+        scanner.last_assistant_is_error = scan.api_error
+        scanner.consecutive_short = scan.consecutive_short
+        scanner.do_flow = replace(scan.do_flow)
+        return scanner
+
+    def feed(self, data: dict[str, Any]) -> frozenset[str]:
+        """Update state with one decoded transcript line; returns its skills."""
+        if data.get("type") == "assistant":
+            # Track if the last assistant message was an API error
+            self.last_assistant_is_error = bool(data.get("isApiErrorMessage", False))
+            # Consecutive short outputs from the end; substantial output resets
+            if is_short_output(data):
+                self.consecutive_short += 1
+            else:
+                self.consecutive_short = 0
+
+        invoked = classify_skill_invocations(data)
+        if not invoked:
+            return invoked
+
+        do_args = _do_invocation_args(data) if "do" in invoked else None
+        advance_do_flow(self.do_flow, invoked, do_args)
+        return invoked
+
+    def result(self) -> TranscriptScan:
+        """Snapshot the accumulated state."""
+        return TranscriptScan(
+            api_error=self.last_assistant_is_error,
+            do_flow=replace(self.do_flow),
+            consecutive_short=self.consecutive_short,
+        )
+
+
+@dataclass
+class ScanCheckpoint:
+    """Resume point for scanning an append-only transcript incrementally."""
+
+    offset: int  # byte offset just past the last complete line scanned
+    device: int  # st_dev of the transcript when scanned
+    inode: int  # st_ino of the transcript when scanned
+    size: int  # st_size of the transcript when scanned
+    mtime_ns: int  # st_mtime_ns of the transcript when scanned
+    digest: str  # hash of the bytes just before offset
+    scan: TranscriptScan  # scanner state at offset
+
+
+def _transcript_key(transcript_path: str) -> str:
+    """Stable file name stem for per-transcript state."""
+    key = hashlib.sha256(os.path.abspath(transcript_path).encode()).hexdigest()
+    return key[:32]
+
+
+def sweep_session_state() -> None:
+    """
+    Delete per-session files untouched for their SESSION_STATE_MAX_AGE.
+
+    Called after per-session writes; does the sweep at most once per
+    SESSION_STATE_SWEEP_INTERVAL, timed by a marker file. Failures are
+    ignored.
+    """
+    state_dir = get_state_dir()
+    marker = state_dir / ".swept"
+    now = time.time()
+    try:
+        if now - marker.stat().st_mtime < SESSION_STATE_SWEEP_INTERVAL:
+            return
+    except OSError:
+        pass
     try:
-        with open(transcript_path, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                # Track if the last assistant message was an API error
-                if data.get("type") == "assistant":
-                    last_assistant_is_error = data.get("isApiErrorMessage", False)
+        marker.touch()
+    except OSError:
+        return
+    for name, max_age in SESSION_STATE_MAX_AGE.items():
+        try:
+            entries = list(os.scandir(state_dir / name))
+        except OSError:
+            continue
+        for entry in entries:
+            with contextlib.suppress(OSError):
+                if now - entry.stat().st_mtime > max_age:
+                    os.unlink(entry.path)
 
-    except (FileNotFoundError, OSError):
-        return False
 
-    return last_assistant_is_error
+def _checkpoint_path(transcript_path: str) -> Path:
+    """Checkpoint file for a transcript, keyed by its absolute path."""
+    return get_state_dir() / "checkpoints" / f"{_transcript_key(transcript_path)}.json"
+
+
+def _digest_before(f: BinaryIO, offset: int) -> str:
+    """Hash the bytes just before offset in an open binary file."""
+    start = max(0, offset - CHECKPOINT_DIGEST_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def load_checkpoint(transcript_path: str) -> ScanCheckpoint | None:
+    """Load the stored checkpoint for a transcript, or None if absent/corrupt."""
+    try:
+        with open(_checkpoint_path(transcript_path), encoding="utf-8") as f:
+            data = json.load(f)
+        scan = data.pop("scan")
+        scan["do_flow"] = DoFlowState(**scan["do_flow"])
+        data["scan"] = TranscriptScan(**scan)
+        return ScanCheckpoint(**data)
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def save_checkpoint(transcript_path: str, checkpoint: ScanCheckpoint) -> None:
+    """Atomically store a transcript checkpoint. Failures are ignored."""
+    path = _checkpoint_path(transcript_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+        return
+    sweep_session_state()
+
+
+class CheckpointStore(Protocol):
+    """Where scan_transcript keeps checkpoints between runs."""
+
+    def load(self, transcript_path: str) -> ScanCheckpoint | None: ...
+
+    def save(self, transcript_path: str, checkpoint: ScanCheckpoint) -> None: ...
+
+
+class FileCheckpointStore:
+    """Checkpoints persisted under the hook state dir (the default)."""
+
+    def load(self, transcript_path: str) -> ScanCheckpoint | None:
+        return load_checkpoint(transcript_path)
+
+    def save(self, transcript_path: str, checkpoint: ScanCheckpoint) -> None:
+        save_checkpoint(transcript_path, checkpoint)
+
+
+_checkpoint_store: CheckpointStore = FileCheckpointStore()
 
 
-def count_consecutive_short_outputs(transcript_path: str) -> int:
+def set_checkpoint_store(store: CheckpointStore) -> CheckpointStore:
     """
-    Count consecutive short assistant outputs at the end of the transcript.
+    Route scan_transcript checkpoints through another store.
 
-    This detects the infinite loop pattern where the agent outputs minimal
-    content (like "." or "Done.") repeatedly because it's trying to stop
-    but getting blocked by hooks.
+    Used by long-lived processes (the hook daemon) to keep checkpoints in
+    memory. Returns the previous store so callers can restore it.
+    """
+    global _checkpoint_store
+    previous = _checkpoint_store
+    _checkpoint_store = store
+    return previous
 
-    A "short output" is an assistant message with:
-    - Less than 100 characters of text
-    - No tool uses (or only Skill tool use which might be an /escalate attempt)
 
-    Returns the count of consecutive short outputs from the end.
+class PendingCheckpointStore:
+    """
+    Checkpoint writes held back from another store until flush().
+
+    Loads see held-back checkpoints first, then the underlying store.
+    """
+
+    def __init__(self, base: CheckpointStore) -> None:
+        self.base = base
+        # transcript path -> checkpoint not yet saved to base
+        self.pending: dict[str, ScanCheckpoint] = {}
+
+    def load(self, transcript_path: str) -> ScanCheckpoint | None:
+        checkpoint = self.pending.get(transcript_path)
+        return checkpoint if checkpoint is not None else self.base.load(transcript_path)
+
+    def save(self, transcript_path: str, checkpoint: ScanCheckpoint) -> None:
+        self.pending[transcript_path] = checkpoint
+
+    def flush(self) -> None:
+        """Save the held-back checkpoints to the underlying store."""
+        for transcript_path, checkpoint in self.pending.items():
+            self.base.save(transcript_path, checkpoint)
+        self.pending.clear()
+
+
+@contextlib.contextmanager
+def pending_checkpoints() -> Iterator[PendingCheckpointStore]:
     """
-    # Collect all assistant output classifications
-    output_types: list[str] = []  # 'short' or 'substantial'
+    Hold back the checkpoint writes made inside the block.
 
+    On exit the previous store comes back and the held-back checkpoints are
+    dropped - unless the previous store is itself a PendingCheckpointStore,
+    which collects them. Hook evaluate() functions read transcripts inside
+    one, so calling them has no side effects; entry points wrap evaluate()
+    in another and flush() it to keep the checkpoints.
+    """
+    store = PendingCheckpointStore(_checkpoint_store)
+    previous = set_checkpoint_store(store)
     try:
-        with open(transcript_path, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                if data.get("type") != "assistant":
-                    continue
-
-                message = data.get("message", {})
-                content = message.get("content", [])
-
-                # Get text content length and check for meaningful tool uses
-                text_len = 0
-                has_meaningful_tool = False
-
-                if isinstance(content, str):
-                    text_len = len(content.strip())
-                elif isinstance(content, list):
-                    for block in content:
-                        if isinstance(block, dict):
-                            if block.get("type") == "text":
-                                text_len += len(block.get("text", "").strip())
-                            elif block.get("type") == "tool_use":
-                                tool_name = block.get("name", "")
-                                # Skill invocations don't count as "meaningful" for loop detection
-                                # because /escalate attempts would be Skill calls
-                                if tool_name != "Skill":
-                                    has_meaningful_tool = True
-
-                # Classify this output
-                if has_meaningful_tool or text_len >= 100:
-                    output_types.append("substantial")
+        yield store
+    finally:
+        set_checkpoint_store(previous)
+        if isinstance(previous, PendingCheckpointStore):
+            store.flush()
+
+
+class ScanDeadlineError(Exception):
+    """A transcript scan ran out of time before reaching the end."""
+
+    def __init__(self, checkpoint: ScanCheckpoint | None) -> None:
+        super().__init__("transcript scan deadline exceeded")
+        # Progress up to where the scan stopped, if any
+        self.checkpoint = checkpoint
+
+
+def _checkpoint_at(
+    f: BinaryIO, st: os.stat_result, offset: int, scan: TranscriptScan
+) -> ScanCheckpoint:
+    """Checkpoint for a scan of f (with stat st) that consumed offset bytes."""
+    return ScanCheckpoint(
+        offset=offset,
+        device=st.st_dev,
+        inode=st.st_ino,
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        digest=_digest_before(f, offset),
+        scan=scan,
+    )
+
+
+def resume_scan(
+    transcript_path: str,
+    checkpoint: ScanCheckpoint | None,
+    prefilter: bool = True,
+    anchor: bool = True,
+    deadline: float | None = None,
+) -> tuple[TranscriptScan, ScanCheckpoint]:
+    """
+    Scan a transcript, decoding only lines appended since the checkpoint.
+
+    Falls back to a full rescan when the checkpoint doesn't describe this
+    file: different inode/device, file shorter than the checkpoint offset
+    (truncation), or changed bytes just before the offset (rewrite).
+    A trailing line without a newline may still be in progress: it counts
+    toward the returned scan but the new checkpoint stops before it.
+    With prefilter, the file is memory-mapped and only lines containing a
+    SCAN_MARKERS byte string are sliced out and decoded (see
+    iter_marker_lines); other lines are never copied into Python objects.
+    With prefilter and anchor, a scan without a usable checkpoint first
+    searches backwards for the last /do that resets the flow and decodes
+    only from there, seeding the API-error flag and short-output streak
+    from the assistant lines just before it.
+
+    Returns the scan and a checkpoint to store. Raises OSError if the
+    transcript can't be read, and ScanDeadlineError, carrying a
+    checkpoint for the progress made, if time.monotonic() passes deadline.
+    The deadline is first checked after DEADLINE_CHECK_LINES lines, so
+    every call makes progress.
+    """
+    with open(transcript_path, "rb") as f:
+        st = os.fstat(f.fileno())
+
+        if checkpoint is not None and (
+            checkpoint.device != st.st_dev
+            or checkpoint.inode != st.st_ino
+            or checkpoint.offset > st.st_size
+        ):
+            checkpoint = None
+
+        # Unchanged since the last fully-consumed scan
+        if (
+            checkpoint is not None
+            and checkpoint.offset == checkpoint.size == st.st_size
+            and checkpoint.mtime_ns == st.st_mtime_ns
+        ):
+            return checkpoint.scan, checkpoint
+
+        if checkpoint is not None and checkpoint.digest != _digest_before(
+            f, checkpoint.offset
+        ):
+            checkpoint = None
+
+        if checkpoint is None:
+            scanner = _TranscriptScanner()
+            offset = 0
+        else:
+            scanner = _TranscriptScanner.resume(checkpoint.scan)
+            offset = checkpoint.offset
+
+        scan_from = offset
+        decoded = 0
+        resume_state: TranscriptScan | None = None
+        if not prefilter:
+            f.seek(offset)
+            lines = iter_bounded_lines(f, MAX_LINE_BYTES)
+            for count, (line, size) in enumerate(lines):
+                # At least one batch before the first check, so each call
+                # leaves progress in its checkpoint
+                if (
+                    count
+                    and count % DEADLINE_CHECK_LINES == 0
+                    and _out_of_time(deadline)
+                ):
+                    raise ScanDeadlineError(
+                        _checkpoint_at(f, st, offset, scanner.result())
+                    )
+                if not line.endswith(b"\n"):
+                    # Partial last line: include it in the result only
+                    resume_state = scanner.result()
                 else:
-                    output_types.append("short")
+                    offset += size
+                decoded += 1
+                data = decode_sized_line(line, size)
+                if data is not None:
+                    scanner.feed(data)
+        elif offset < st.st_size:
+            with mmap.mmap(f.fileno(), st.st_size, access=mmap.ACCESS_READ) as buf:
+                last_newline = buf.rfind(b"\n", offset)
+                complete_end = offset if last_newline < 0 else last_newline + 1
+                reset = None
+                if checkpoint is None and anchor:
+                    # Out of time: scan forward anyway; the first batch is
+                    # always fed, so progress is saved
+                    reset = _find_last_do_reset(buf, complete_end, deadline=deadline)
+                if reset is not None:
+                    reset_start, reset_end, reset_data = reset
+                    tail = _assistant_tail_before(buf, reset_start)
+                    scanner.last_assistant_is_error, scanner.consecutive_short = tail
+                    scanner.feed(reset_data)
+                    offset = reset_end
+                    decoded += 1
+                spans = iter_marker_lines(buf, SCAN_MARKERS, offset)
+                for count, (start, end) in enumerate(spans):
+                    # At least one batch before the first check, so a timed
+                    # out anchor search still leaves a checkpoint to resume
+                    if (
+                        count
+                        and count % DEADLINE_CHECK_LINES == 0
+                        and _out_of_time(deadline)
+                    ):
+                        raise ScanDeadlineError(
+                            _checkpoint_at(f, st, start, scanner.result())
+                        )
+                    if end > complete_end:
+                        # Partial last line: include it in the result only
+                        resume_state = scanner.result()
+                    decoded += 1
+                    data = _decode_span(buf, start, end)
+                    if data is not None:
+                        scanner.feed(data)
+                offset = complete_end
+
+        current_telemetry().add_scan(transcript_path, scan_from, offset, decoded)
+        result = scanner.result()
+        new_checkpoint = _checkpoint_at(
+            f, st, offset, result if resume_state is None else resume_state
+        )
+
+    return result, new_checkpoint
 
+
+def scan_transcript(
+    transcript_path: str,
+    use_checkpoint: bool = True,
+    prefilter: bool = True,
+    anchor: bool = True,
+    deadline: float | None = None,
+) -> TranscriptScan:
+    """
+    Collect all Stop hook inputs from the transcript, decoding each line once.
+
+    With use_checkpoint, resumes from the stored checkpoint so repeated hook
+    runs only decode newly appended lines, then stores the new checkpoint
+    (see set_checkpoint_store for where checkpoints live).
+    With prefilter, lines that can't matter are skipped without decoding;
+    with anchor too, a scan without a checkpoint starts at the last /do that
+    resets the flow (see resume_scan).
+
+    Missing or unreadable transcripts yield an empty scan (no /do, no error,
+    no short outputs) so callers fail open. Raises ScanDeadlineError if
+    time.monotonic() passes deadline; the progress made is checkpointed, so
+    the next scan continues from there.
+    """
+    store = _checkpoint_store
+    checkpoint = store.load(transcript_path) if use_checkpoint else None
+
+    try:
+        scan, new_checkpoint = resume_scan(
+            transcript_path, checkpoint, prefilter, anchor, deadline
+        )
+    except ScanDeadlineError as e:
+        if use_checkpoint and e.checkpoint is not None:
+            store.save(transcript_path, e.checkpoint)
+        raise
     except (FileNotFoundError, OSError):
-        return 0
+        return _TranscriptScanner().result()
+
+    if use_checkpoint and new_checkpoint != checkpoint:
+        store.save(transcript_path, new_checkpoint)
+
+    return scan
 
-    # Count consecutive short outputs from the end
+
+def scan_transcript_tail(
+    transcript_path: str, window_bytes: int = TAIL_WINDOW_BYTES
+) -> TranscriptScan | None:
+    """
+    Estimate a scan from the stored checkpoint and the transcript's tail.
+
+    The bounded fallback for when a full scan can't finish in time: decodes
+    lines from at most the last window_bytes, so latency doesn't grow with
+    the transcript. The result is exact when a /do that resets the flow is
+    inside the window, or when the checkpoint reaches into it (interrupted
+    scans checkpoint their progress, so repeated calls catch up). Otherwise
+    returns None: the /do flow is unknown, and is never guessed.
+    """
+    checkpoint = _checkpoint_store.load(transcript_path)
+    try:
+        with open(transcript_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:
+                return _TranscriptScanner().result()
+            if checkpoint is not None and (
+                (checkpoint.device, checkpoint.inode) != (st.st_dev, st.st_ino)
+                or checkpoint.offset > st.st_size
+            ):
+                checkpoint = None
+
+            with mmap.mmap(f.fileno(), st.st_size, access=mmap.ACCESS_READ) as buf:
+                window_start = 0
+                if st.st_size > window_bytes:
+                    newline = buf.find(b"\n", st.st_size - window_bytes)
+                    window_start = st.st_size if newline < 0 else newline + 1
+                last_newline = buf.rfind(b"\n", window_start)
+                complete_end = window_start if last_newline < 0 else last_newline + 1
+
+                scanner = _TranscriptScanner()
+                position = window_start
+                reset = _find_last_do_reset(buf, complete_end, window_start)
+                if reset is not None:
+                    reset_start, position, reset_data = reset
+                    tail = _assistant_tail_before(buf, reset_start, window_start)
+                    scanner.last_assistant_is_error, scanner.consecutive_short = tail
+                    scanner.feed(reset_data)
+                elif checkpoint is not None and checkpoint.offset >= window_start:
+                    scanner = _TranscriptScanner.resume(checkpoint.scan)
+                    position = checkpoint.offset
+                elif window_start > 0:
+                    return None
+
+                decoded = 0 if reset is None else 1
+                for start, end in iter_marker_lines(buf, SCAN_MARKERS, position):
+                    decoded += 1
+                    data = _decode_span(buf, start, end)
+                    if data is not None:
+                        scanner.feed(data)
+                current_telemetry().add_scan(
+                    transcript_path, window_start, st.st_size, decoded
+                )
+    except (FileNotFoundError, OSError):
+        return _TranscriptScanner().result()
+
+    return scanner.result()
+
+
+def read_transcript_signals(
+    transcript_path: str, budget: float | None = None
+) -> tuple[TranscriptScan | None, str]:
+    """
+    Scan the transcript within a latency budget (seconds; None for no limit).
+
+    Tries a full or incremental scan in the budget minus a reserve
+    (DEGRADED_BUDGET_SHARE). If that runs out, falls back to
+    scan_transcript_tail, whose cost is bounded by TAIL_WINDOW_BYTES.
+    Returns the scan - None if the state is unknown - and the strategy
+    that answered (STRATEGY_SCAN, STRATEGY_TAIL_WINDOW or STRATEGY_UNKNOWN).
+    """
+    deadline = None
+    if budget is not None:
+        deadline = time.monotonic() + budget * (1 - DEGRADED_BUDGET_SHARE)
+    try:
+        return scan_transcript(transcript_path, deadline=deadline), STRATEGY_SCAN
+    except ScanDeadlineError:
+        pass
+
+    scan = scan_transcript_tail(transcript_path, TAIL_WINDOW_BYTES)
+    return scan, STRATEGY_TAIL_WINDOW if scan is not None else STRATEGY_UNKNOWN
+
+
+def has_recent_api_error(transcript_path: str, deadline: float | None = None) -> bool:
+    """
+    Check if the most recent assistant message was an API error.
+
+    API errors (like 529 Overloaded) are marked with isApiErrorMessage=true.
+    These are system failures, not voluntary stops, so hooks should allow them.
+    Reads backwards from EOF and stops at the last assistant message.
+    Raises ScanDeadlineError (without a checkpoint) if time.monotonic()
+    passes deadline, checked every DEADLINE_CHECK_LINES lines.
+    """
+    try:
+        lines = iter_bounded_lines_reversed(transcript_path, MAX_LINE_BYTES)
+        for count, (line, size) in enumerate(lines):
+            if count % DEADLINE_CHECK_LINES == 0 and _out_of_time(deadline):
+                raise ScanDeadlineError(None)
+            if ASSISTANT_MARKER not in line:
+                continue
+            data = decode_sized_line(line, size)
+            if data is not None and data.get("type") == "assistant":
+                return bool(data.get("isApiErrorMessage", False))
+    except OSError:
+        return False
+
+    return False
+
+
+def count_consecutive_short_outputs(
+    transcript_path: str, deadline: float | None = None
+) -> int:
+    """
+    Count consecutive short assistant outputs at the end of the transcript.
+
+    This detects the infinite loop pattern where the agent outputs minimal
+    content (like "." or "Done.") repeatedly because it's trying to stop
+    but getting blocked by hooks. See is_short_output for the classification.
+
+    Reads backwards from EOF and stops at the first substantial output.
+    Returns the count of consecutive short outputs from the end. Raises
+    ScanDeadlineError (without a checkpoint) if time.monotonic() passes
+    deadline, checked every DEADLINE_CHECK_LINES lines.
+    """
     consecutive_short = 0
-    for output_type in reversed(output_types):
-        if output_type == "short":
+
+    try:
+        lines = iter_bounded_lines_reversed(transcript_path, MAX_LINE_BYTES)
+        for count, (line, size) in enumerate(lines):
+            if count % DEADLINE_CHECK_LINES == 0 and _out_of_time(deadline):
+                raise ScanDeadlineError(None)
+            if ASSISTANT_MARKER not in line:
+                continue
+            data = decode_sized_line(line, size)
+            if data is None or data.get("type") != "assistant":
+                continue
+            if not is_short_output(data):
+                break
             consecutive_short += 1
-        else:
-            break
+    except OSError:
+        return 0
 
     return consecutive_short
 
@@ -324,74 +1570,412 @@ def parse_do_flow(transcript_path: str) -> DoFlowState:
     Tracks the most recent /do invocation and what happened after it.
     Each new /do resets the flow state.
     """
-    has_do = False
-    has_verify = False
-    has_done = False
-    has_escalate = False
-    do_args: str | None = None
+    return scan_transcript(transcript_path).do_flow
+
+
+def is_tool_result(line_data: dict[str, Any]) -> bool:
+    """Check if a user line carries tool results (the assistant's turn goes on)."""
+    content = line_data.get("message", {}).get("content", [])
+    if isinstance(content, str):
+        return False
+    return any(
+        isinstance(block, dict) and block.get("type") == "tool_result"
+        for block in content
+    )
+
+
+@dataclass
+class StopPoint:
+    """A point where the assistant ended its turn, so the Stop hook ran."""
+
+    line: int  # 1-based number of the turn's last transcript line
+    offset: int  # transcript bytes up to the end of that line
+    scan: TranscriptScan  # Stop hook inputs at that point
+    invoked: dict[str, int]  # workflow skill invocations since the last point
+
+
+def iter_stop_points(transcript: BinaryIO) -> Iterator[StopPoint]:
+    """
+    Yield the Stop hook inputs at every point the assistant ended a turn.
+
+    A turn ends at its last line before the next user prompt, or at the end
+    of the transcript; tool results don't end it. Reads the open transcript
+    forward once, decoding each line at most once, so whole sessions can be
+    audited without rescanning per turn. Tool-result lines are recognized
+    from their bytes (see may_affect_scan) and never decoded; oversized
+    lines are never buffered whole (see iter_bounded_lines).
+    """
+    scanner = _TranscriptScanner()
+    invoked: dict[str, int] = {}
+    turn_open = False
+    line_number = 0
+    offset = 0
+
+    for raw, size in iter_bounded_lines(transcript, MAX_LINE_BYTES):
+        data = None
+        # Tool results are user lines, but only a user prompt ends the turn
+        skipped_result = not may_affect_scan(raw) and b'"tool_result"' in raw
+        if not skipped_result:
+            data = decode_sized_line(raw, size)
+        msg_type = data.get("type") if data is not None else None
+        if msg_type == "user" and data is not None and not is_tool_result(data):
+            if turn_open:
+                yield StopPoint(line_number, offset, scanner.result(), invoked)
+                invoked = {}
+
+        line_number += 1
+        offset += size
+        if data is not None:
+            for skill in scanner.feed(data):
+                invoked[skill] = invoked.get(skill, 0) + 1
+        if msg_type == "assistant":
+            turn_open = True
+        elif msg_type == "user" or skipped_result:
+            turn_open = False
+
+    if turn_open:
+        yield StopPoint(line_number, offset, scanner.result(), invoked)
+
+
+@dataclass
+class WorkflowEvent:
+    """One workflow transition in a session's event log."""
+
+    version: int  # WORKFLOW_LOG_VERSION when written
+    skill: str  # workflow skill invoked (see WORKFLOW_SKILLS)
+    args: str | None  # arguments it was invoked with
+    device: int  # st_dev of the transcript when recorded
+    inode: int  # st_ino of the transcript when recorded
+    offset: int  # transcript size when recorded
+    state: DoFlowState  # /do flow after this event
+
 
+def _workflow_log_path(transcript_path: str) -> Path:
+    """Append-only workflow event log for a transcript."""
+    return get_state_dir() / "workflow" / f"{_transcript_key(transcript_path)}.jsonl"
+
+
+def _last_workflow_event(transcript_path: str) -> WorkflowEvent | None:
+    """Read the newest event from the log's tail, or None if absent/corrupt."""
     try:
-        with open(transcript_path, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                # Check for /do (any invocation pattern)
-                if was_skill_invoked(data, "do"):
-                    # Extract args first before deciding if this is a new /do
-                    args = extract_user_command_args(data, "do")
-                    if not args:
-                        args = get_skill_call_args(data, "do")
-
-                    # isMeta skill expansions follow command-name lines for the same /do
-                    # Only reset state if this line has args OR we don't have /do yet
-                    # This prevents the isMeta line from clearing args set by command-name line
-                    is_new_do = not has_do or args is not None
-
-                    if is_new_do:
-                        has_do = True
-                        has_verify = False
-                        has_done = False
-                        has_escalate = False
-                        if args:
-                            do_args = args
-
-                # Check for /verify, /done, /escalate after /do (any invocation pattern)
-                if has_do and was_skill_invoked(data, "verify"):
-                    has_verify = True
-
-                if has_do and was_skill_invoked(data, "done"):
-                    has_done = True
-
-                if has_do and was_skill_invoked(data, "escalate"):
-                    has_escalate = True
-
-    except FileNotFoundError:
-        return DoFlowState(
-            has_do=False,
-            has_verify=False,
-            has_done=False,
-            has_escalate=False,
-            do_args=None,
-        )
+        for line in iter_lines_reversed(str(_workflow_log_path(transcript_path))):
+            if not line.strip():
+                continue
+            # Not decode_line: its fast backends only keep transcript fields
+            data = json.loads(line)
+            data["state"] = DoFlowState(**data["state"])
+            return WorkflowEvent(**data)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    return None
+
+
+def _advance_past_offset(
+    transcript_path: str,
+    state: DoFlowState,
+    offset: int,
+    deadline: float | None = None,
+) -> None:
+    """
+    Apply the workflow skills invoked after offset in the transcript to state.
+
+    Catches the event log up with invocations whose hook event was missed or
+    failed to record. Only lines holding a WORKFLOW_MARKERS byte string are
+    decoded. Raises ScanDeadlineError past the deadline and OSError if the
+    transcript can't be read.
+    """
+    with (
+        open(transcript_path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+    ):
+        spans = iter_marker_lines(buf, WORKFLOW_MARKERS, offset)
+        for count, (start, end) in enumerate(spans, 1):
+            if count % DEADLINE_CHECK_LINES == 0 and _out_of_time(deadline):
+                raise ScanDeadlineError(None)
+            data = _decode_span(buf, start, end)
+            if data is None:
+                continue
+            invoked = classify_skill_invocations(data)
+            if invoked:
+                do_args = _do_invocation_args(data) if "do" in invoked else None
+                advance_do_flow(state, invoked, do_args)
+
+
+def load_workflow_state(
+    transcript_path: str, deadline: float | None = None
+) -> DoFlowState | None:
+    """
+    /do flow recorded by the workflow event log, caught up with the transcript.
+
+    The transcript is only searched past the last event's offset, for
+    invocations the log missed (a hook that didn't run or failed to write).
+    Returns None when there is no log, or it's stale: written by another
+    format version, or for a transcript that has since been replaced
+    (different inode/device) or truncated below the last recorded size -
+    or when the catch-up can't finish by the deadline. Callers then fall
+    back to scanning the transcript.
+    """
+    event = _last_workflow_event(transcript_path)
+    if event is None or event.version != WORKFLOW_LOG_VERSION:
+        return None
+    try:
+        st = os.stat(transcript_path)
     except OSError:
-        return DoFlowState(
-            has_do=False,
-            has_verify=False,
-            has_done=False,
-            has_escalate=False,
-            do_args=None,
-        )
+        return None
+    if (st.st_dev, st.st_ino) != (event.device, event.inode):
+        return None
+    if st.st_size < event.offset:
+        return None
+    if st.st_size > event.offset:
+        try:
+            _advance_past_offset(transcript_path, event.state, event.offset, deadline)
+        except (OSError, ValueError, ScanDeadlineError):
+            return None
+    return event.state
+
+
+def record_workflow_event(
+    transcript_path: str,
+    skill: str,
+    args: str | None = None,
+    deadline: float | None = None,
+) -> DoFlowState | None:
+    """
+    Append a workflow skill invocation to the transcript's event log.
+
+    The first event of a session seeds the flow from the transcript, unless
+    it's a /do with arguments, which resets the flow anyway. Re-applying an
+    event the transcript already contains is harmless: every transition is
+    idempotent. Returns the new flow, or None if nothing could be recorded -
+    including when reading the transcript doesn't finish by the deadline,
+    which leaves readers to scan it themselves.
+    """
+    if skill not in WORKFLOW_SKILLS:
+        return None
+    try:
+        st = os.stat(transcript_path)
+    except OSError:
+        return None
 
-    return DoFlowState(
-        has_do=has_do,
-        has_verify=has_verify,
-        has_done=has_done,
-        has_escalate=has_escalate,
-        do_args=do_args,
+    state = load_workflow_state(transcript_path, deadline)
+    if state is None:
+        if skill == "do" and args:
+            state = DoFlowState(
+                has_do=False,
+                has_verify=False,
+                has_done=False,
+                has_escalate=False,
+                do_args=None,
+            )
+        else:
+            try:
+                state = scan_transcript(transcript_path, deadline=deadline).do_flow
+            except ScanDeadlineError:
+                return None
+    advance_do_flow(state, (skill,), args)
+
+    event = WorkflowEvent(
+        version=WORKFLOW_LOG_VERSION,
+        skill=skill,
+        args=args,
+        device=st.st_dev,
+        inode=st.st_ino,
+        offset=st.st_size,
+        state=state,
     )
+    path = _workflow_log_path(transcript_path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            # One write per record keeps concurrent appends whole
+            os.write(fd, (json.dumps(asdict(event)) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    sweep_session_state()
+    return state
+
+
+def current_do_flow(
+    transcript_path: str, budget: float | None = None
+) -> tuple[DoFlowState | None, str]:
+    """
+    /do flow from the workflow event log, else from the transcript.
+
+    The log answers without reading the transcript; the transcript is the
+    fallback when it's missing or stale (see load_workflow_state). Both
+    share the latency budget (see read_transcript_signals). Returns the
+    flow - None if unknown - and the strategy that answered.
+    """
+    deadline = None if budget is None else time.monotonic() + budget
+    state = load_workflow_state(transcript_path, deadline)
+    if state is not None:
+        return state, STRATEGY_EVENT_LOG
+    scan, strategy = read_transcript_signals(
+        transcript_path, remaining_budget(deadline)
+    )
+    return (None if scan is None else scan.do_flow), strategy
+
+
+def split_do_args(do_args: str | None) -> tuple[str | None, str | None]:
+    """
+    Manifest and execution log paths from /do arguments, as far as given.
+
+    /do takes "<manifest-file-path> [log-file-path]"; either may be None.
+    """
+    parts = do_args.split() if do_args else []
+    manifest_path = parts[0] if parts else None
+    log_path = parts[1] if len(parts) > 1 else None
+    return manifest_path, log_path
+
+
+def find_do_log_path(transcript_path: str, deadline: float | None = None) -> str | None:
+    """
+    Execution log the current /do writes to, from the transcript.
+
+    Searches backwards from EOF for the newest do-log-*.md path, stopping
+    at the last /do with arguments (an older log belongs to an older run).
+    Only lines holding DO_LOG_MARKER or a /do marker are looked at, and
+    only /do candidates are decoded. Returns None when there's no such path
+    or the deadline passes first.
+    """
+    try:
+        with open(transcript_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return None
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as buf:
+                markers = (DO_LOG_MARKER, *DO_RESET_MARKERS)
+                for start, end in iter_marker_lines_reversed(buf, markers, size):
+                    if _out_of_time(deadline):
+                        return None
+                    match = _DO_LOG_PATH_PATTERN.search(buf, start, end)
+                    if match:
+                        return match.group().decode("utf-8", "replace")
+                    data = _decode_span(buf, start, end)
+                    if (
+                        data is not None
+                        and "do" in classify_skill_invocations(data)
+                        and _do_invocation_args(data)
+                    ):
+                        return None
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+@dataclass
+class CompactSnapshot:
+    """/do flow and its files, captured just before a session is compacted."""
+
+    version: int  # COMPACT_SNAPSHOT_VERSION when taken
+    taken: float  # time.time() when taken
+    device: int  # st_dev of the transcript when taken
+    inode: int  # st_ino of the transcript when taken
+    offset: int  # transcript size when taken
+    workflow_log_bytes: int  # size of the workflow event log when taken (0: none)
+    state: DoFlowState  # /do flow when taken
+    manifest_path: str | None  # manifest the /do executes
+    log_path: str | None  # execution log the /do writes to
+
+
+def _compact_snapshot_path(transcript_path: str) -> Path:
+    """Compaction snapshot for a transcript, keyed by its absolute path."""
+    return get_state_dir() / "compact" / f"{_transcript_key(transcript_path)}.json"
+
+
+def _workflow_log_bytes(transcript_path: str) -> int:
+    """Size of the transcript's workflow event log, 0 when there is none."""
+    try:
+        return _workflow_log_path(transcript_path).stat().st_size
+    except OSError:
+        return 0
+
+
+def take_compact_snapshot(
+    transcript_path: str, budget: float | None = None
+) -> tuple[CompactSnapshot | None, str]:
+    """
+    Capture the /do flow, manifest path and execution log path.
+
+    The flow comes from current_do_flow. The manifest and log paths come
+    from the /do arguments; a log the /do created itself is found in the
+    transcript (see find_do_log_path) with what's left of the latency
+    budget. Returns None for the snapshot when the flow is unknown or the
+    transcript is gone, and the strategy that read the flow.
+    """
+    deadline = None if budget is None else time.monotonic() + budget
+    workflow_log_bytes = _workflow_log_bytes(transcript_path)
+    state, strategy = current_do_flow(transcript_path, budget)
+    if state is None:
+        return None, strategy
+    try:
+        st = os.stat(transcript_path)
+    except OSError:
+        return None, strategy
+
+    manifest_path, log_path = split_do_args(state.do_args)
+    active = state.has_do and not (state.has_done or state.has_escalate)
+    if active and log_path is None:
+        log_path = find_do_log_path(transcript_path, deadline)
+    snapshot = CompactSnapshot(
+        version=COMPACT_SNAPSHOT_VERSION,
+        taken=time.time(),
+        device=st.st_dev,
+        inode=st.st_ino,
+        offset=st.st_size,
+        workflow_log_bytes=workflow_log_bytes,
+        state=state,
+        manifest_path=manifest_path,
+        log_path=log_path,
+    )
+    return snapshot, strategy
+
+
+def save_compact_snapshot(transcript_path: str, snapshot: CompactSnapshot) -> None:
+    """Atomically store a compaction snapshot. Failures are ignored."""
+    path = _compact_snapshot_path(transcript_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(snapshot), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+        return
+    sweep_session_state()
+
+
+def load_compact_snapshot(transcript_path: str) -> CompactSnapshot | None:
+    """
+    Snapshot taken before the transcript's latest compaction, if still current.
+
+    Reads one small file, whatever the transcript's size. Returns None when
+    there's none, or it's stale: written by another format version, older
+    than COMPACT_SNAPSHOT_MAX_AGE, for a transcript that has since been
+    replaced or truncated, or followed by workflow events (the event log
+    grew). Callers then read the flow as usual (see current_do_flow).
+    """
+    try:
+        with open(_compact_snapshot_path(transcript_path), encoding="utf-8") as f:
+            data = json.load(f)
+        data["state"] = DoFlowState(**data["state"])
+        snapshot = CompactSnapshot(**data)
+        st = os.stat(transcript_path)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if snapshot.version != COMPACT_SNAPSHOT_VERSION:
+        return None
+    if not 0 <= time.time() - snapshot.taken <= COMPACT_SNAPSHOT_MAX_AGE:
+        return None
+    if (st.st_dev, st.st_ino) != (snapshot.device, snapshot.inode):
+        return None
+    if st.st_size < snapshot.offset:
+        return None
+    if _workflow_log_bytes(transcript_path) != snapshot.workflow_log_bytes:
+        return None
+    return snapshot
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Run a manifest's bash-method criteria locally, in parallel.
+
+Extracts every INV-G* and AC-* in force whose verify block is
+`method: bash` with a `command` (see hook_manifest), runs the commands
+concurrently and reports pass/fail per criterion: exit code, duration and
+the tail of stdout/stderr. A criterion passes when its command exits 0.
+
+Usage: python3 hook_verify.py MANIFEST [--jobs N] [--timeout SECONDS]
+                              [--cwd DIR] [--criteria ID,...] [--scope GLOB,...]
+                              [--json] [--no-cache]
+
+Commands run under bash (sh where bash is missing) in --cwd, each in its own
+process group, at most --jobs at a time (default: the CPUs this process may
+run on). A command that outlives its timeout - the verify block's
+`timeout` in seconds, else --timeout - is killed with its whole process
+group and reported as timed out. Exits 0 when every criterion passed, 1
+otherwise, so /verify and scripts can consume the report (--json) directly;
+--criteria IDs that aren't bash criteria in force, or a manifest that can't
+be read, exit 2.
+
+Passes are cached, so a fix-and-reverify loop re-runs only what a change
+can affect. A result is keyed by the criterion's verify block and the
+inputs it ran against: with --scope (as /verify's `--scope=files`), the
+paths and contents of the files its globs match; else a hash of the
+working tree: HEAD's tree plus the contents of changed and untracked files,
+ignored ones excluded. Entries expire after VERIFY_CACHE_MAX_AGE, and the
+oldest are evicted past VERIFY_CACHE_MAX_BYTES, checked at most once per
+VERIFY_CACHE_PRUNE_INTERVAL. Failures are never cached. --no-cache neither
+reads nor writes the cache.
+
+Files named in each command's output are recorded for hook_impact, which
+uses them to decide which criteria a change can affect.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from hook_impact import record_run
+from hook_manifest import Manifest, ManifestItem, load_manifest
+from hook_utils import available_cpus, get_state_dir, git_output, git_paths
+
+# Seconds a command may run when its verify block gives no timeout
+DEFAULT_TIMEOUT = 600.0
+
+# Characters kept from the end of each command's stdout and stderr
+OUTPUT_TAIL_CHARS = 4000
+
+# Seconds between SIGTERM and SIGKILL for a timed-out process group
+KILL_GRACE_SECONDS = 2.0
+
+# Outcome of one criterion
+STATUS_PASS = "pass"  # exited 0
+STATUS_FAIL = "fail"  # exited non-zero
+STATUS_TIMEOUT = "timeout"  # killed after its timeout
+STATUS_ERROR = "error"  # couldn't be started
+STATUSES = (STATUS_PASS, STATUS_FAIL, STATUS_TIMEOUT, STATUS_ERROR)
+
+# Bump when the cache key or the cached record format changes
+VERIFY_CACHE_VERSION = 1
+
+# Seconds a cached pass stays valid; bounds drift outside the hashed inputs
+# (installed tools, services a command talks to)
+VERIFY_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+# Total size of the result cache before the oldest entries are evicted
+VERIFY_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Seconds between cache prunes; runs in between skip the directory scan
+VERIFY_CACHE_PRUNE_INTERVAL = 60 * 60
+
+
+def bash_criteria(
+    manifest: Manifest, only: Iterable[str] | None = None
+) -> list[ManifestItem]:
+    """Criteria in force verified by a bash command, optionally only these IDs."""
+    wanted = None if only is None else set(only)
+    return [
+        item
+        for item in manifest.criteria()
+        if item.method == "bash"
+        and item.verify is not None
+        and isinstance(item.verify.get("command"), str)
+        and item.verify["command"].strip()
+        and (wanted is None or item.id in wanted)
+    ]
+
+
+def criterion_timeout(item: ManifestItem, default: float = DEFAULT_TIMEOUT) -> float:
+    """The verify block's timeout in seconds, else default."""
+    timeout = item.verify.get("timeout") if item.verify else None
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float, str)):
+        return default
+    # The YAML subset reads only integers; "2.5" arrives as a string
+    try:
+        seconds = float(timeout)
+    except ValueError:
+        return default
+    return seconds if seconds > 0 else default
+
+
+def _shell() -> str:
+    return shutil.which("bash") or "/bin/sh"
+
+
+def _tail(data: bytes) -> str:
+    text = data.decode("utf-8", "replace")
+    return text[-OUTPUT_TAIL_CHARS:]
+
+
+def _kill_group(process: subprocess.Popen[bytes]) -> None:
+    """Terminate a command's process group, then kill whatever is left of it."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    with contextlib.suppress(subprocess.TimeoutExpired):
+        process.wait(KILL_GRACE_SECONDS)
+    # Children that outlive the shell still hold its output pipes
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def run_command(command: str, cwd: str, timeout: float) -> dict[str, Any]:
+    """
+    Run one command, returning its status, exit code, duration and output.
+
+    The command gets its own process group, so a timeout also kills the
+    processes it started (test runners, servers) and can't hang on their
+    open pipes.
+    """
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(
+            [_shell(), "-c", command],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return {
+            "status": STATUS_ERROR,
+            "exit_code": None,
+            "duration_ms": 0.0,
+            "stdout": "",
+            "stderr": str(e),
+        }
+
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+        status = STATUS_PASS if process.returncode == 0 else STATUS_FAIL
+    except subprocess.TimeoutExpired:
+        _kill_group(process)
+        stdout, stderr = process.communicate()
+        status = STATUS_TIMEOUT
+    return {
+        "status": status,
+        "exit_code": process.returncode,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        "stdout": _tail(stdout),
+        "stderr": _tail(stderr),
+    }
+
+
+def run_criterion(
+    item: ManifestItem, cwd: str, default_timeout: float
+) -> dict[str, Any]:
+    """Run a bash criterion's command, returning its report record."""
+    command = item.verify["command"] if item.verify else ""
+    timeout = criterion_timeout(item, default_timeout)
+    return {
+        "id": item.id,
+        "line": item.line,
+        "description": item.description,
+        "command": command,
+        "timeout": timeout,
+        **run_command(command, cwd, timeout),
+    }
+
+
+def _quote_path(path: str) -> str:
+    """A path as git reads it from --stdin-paths: C-quoted if it must be."""
+    if "\n" not in path and not path.startswith('"'):
+        return path
+    escaped = path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def working_tree_hash(cwd: str) -> str | None:
+    """
+    Hash of the working tree at cwd, uncommitted changes included.
+
+    Combines HEAD's tree with the blob hashes of the files that differ from
+    it - staged, modified or untracked - so the index is left alone and
+    nothing is written to the object store. None outside a git repository.
+    """
+    toplevel = git_output(["rev-parse", "--show-toplevel"], cwd)
+    if toplevel is None:
+        return None
+    head = git_output(["rev-parse", "--verify", "-q", "HEAD^{tree}"], toplevel)
+    listings = [
+        ["ls-files", "-z", "-m", "-o", "--exclude-standard"],
+        # Staged changes; on an unborn branch every tracked file is one
+        (
+            ["diff", "--cached", "--name-only", "-z", head]
+            if head
+            else ["ls-files", "-z", "--cached"]
+        ),
+    ]
+    changed: set[str] = set()
+    for args in listings:
+        listing = git_paths(args, toplevel)
+        if listing is None:
+            return None
+        changed.update(listing)
+
+    # Deleted files and untracked nested repositories are keyed by name alone
+    files = [path for path in changed if os.path.isfile(os.path.join(toplevel, path))]
+    # Paths go on stdin, one per line, so no file count overflows the command line
+    paths = "".join(f"{_quote_path(path)}\n" for path in files)
+    blobs = (
+        git_output(["hash-object", "--stdin-paths"], toplevel, input=paths)
+        if files
+        else ""
+    )
+    if blobs is None:
+        return None
+    hashes = dict(zip(files, blobs.split(), strict=True))
+
+    digest = hashlib.sha256((head or "").encode())
+    for path in sorted(changed):
+        digest.update(f"\0{path}\0{hashes.get(path, '-')}".encode())
+    return digest.hexdigest()
+
+
+def scope_hash(patterns: list[str], cwd: str) -> str:
+    """Hash of the paths and contents of the files the globs match under cwd."""
+    import glob
+
+    digest = hashlib.sha256()
+    paths = {
+        path
+        for pattern in patterns
+        for path in glob.glob(pattern, root_dir=cwd, recursive=True)
+        if os.path.isfile(os.path.join(cwd, path))
+    }
+    for path in sorted(paths):
+        digest.update(path.encode() + b"\0")
+        content = hashlib.sha256()
+        try:
+            with open(os.path.join(cwd, path), "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    content.update(chunk)
+            digest.update(content.digest())
+        except OSError:
+            digest.update(b"unreadable")
+    return digest.hexdigest()
+
+
+def definition_hash(item: ManifestItem) -> str:
+    """Hash of a criterion's verify block; its ID and wording don't matter."""
+    definition = json.dumps(item.verify, sort_keys=True)
+    return hashlib.sha256(definition.encode()).hexdigest()
+
+
+def _cache_dir() -> Path:
+    return get_state_dir() / "verify"
+
+
+def _cache_path(definition: str, inputs: str, cwd: str) -> Path:
+    """Cache file for a criterion definition run against some inputs in cwd."""
+    key = f"{definition}:{inputs}:{os.path.abspath(cwd)}"
+    return _cache_dir() / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+
+
+def load_cached_result(path: Path) -> dict[str, Any] | None:
+    """A cached pass, or None if absent, corrupt, outdated or expired."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != VERIFY_CACHE_VERSION:
+        return None
+    if not 0 <= time.time() - entry.get("taken", 0) <= VERIFY_CACHE_MAX_AGE:
+        return None
+    record = entry.get("record")
+    if not isinstance(record, dict) or record.get("status") != STATUS_PASS:
+        return None
+    return record
+
+
+def save_cached_result(path: Path, record: dict[str, Any]) -> None:
+    """Atomically store a pass. Failures are ignored."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    entry = {"version": VERIFY_CACHE_VERSION, "taken": time.time(), "record": record}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+
+
+def prune_cache() -> None:
+    """Drop expired entries, then the oldest until the cache fits its size cap."""
+    try:
+        entries = [(path, path.stat()) for path in _cache_dir().glob("*.json")]
+    except OSError:
+        return
+    now = time.time()
+    entries.sort(key=lambda entry: entry[1].st_mtime, reverse=True)
+    total = 0
+    for path, st in entries:
+        total += st.st_size
+        if now - st.st_mtime > VERIFY_CACHE_MAX_AGE or total > VERIFY_CACHE_MAX_BYTES:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+def prune_due() -> bool:
+    """Whether a prune is due, marking it done if so. Cache dir must exist."""
+    marker = _cache_dir() / ".pruned"
+    try:
+        if time.time() - marker.stat().st_mtime < VERIFY_CACHE_PRUNE_INTERVAL:
+            return False
+    except OSError:
+        pass
+    try:
+        marker.touch()
+    except OSError:
+        return False
+    return True
+
+
+def run_criteria(
+    items: list[ManifestItem],
+    cwd: str,
+    jobs: int,
+    default_timeout: float = DEFAULT_TIMEOUT,
+    cache: bool = False,
+    scope: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Run criteria with at most jobs commands at a time.
+
+    Each command is its own process, so threads only wait on them. Records
+    come back in the order of items. With cache, criteria with a cached pass
+    for their current inputs aren't run (their record has "cached": true),
+    and new passes are stored. The inputs are the files the scope globs
+    match when given (/verify's --scope), else the working tree. They're
+    hashed before any command runs, so files a command writes can't change
+    its own key.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths: list[Path | None] = [None] * len(items)
+    records: list[dict[str, Any] | None] = [None] * len(items)
+    inputs = None
+    if cache:
+        if scope is None:
+            inputs = working_tree_hash(cwd)
+        else:
+            inputs = f"scope:{scope_hash(scope, cwd)}"
+    if inputs is not None:
+        for i, item in enumerate(items):
+            path = paths[i] = _cache_path(definition_hash(item), inputs, cwd)
+            cached = load_cached_result(path)
+            if cached is not None:
+                # The same check may have been moved, renumbered or reworded
+                current = {
+                    "id": item.id,
+                    "line": item.line,
+                    "description": item.description,
+                }
+                records[i] = {**cached, **current, "cached": True}
+
+    pending = [i for i, record in enumerate(records) if record is None]
+    if pending:
+        jobs = max(1, min(jobs, len(pending)))
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            ran = pool.map(
+                lambda i: run_criterion(items[i], cwd, default_timeout), pending
+            )
+            for i, record in zip(pending, ran, strict=True):
+                records[i] = {**record, "cached": False}
+                key_path = paths[i]
+                if key_path is not None and record["status"] == STATUS_PASS:
+                    save_cached_result(key_path, record)
+    if cache and pending and prune_due():
+        prune_cache()
+    return [record for record in records if record is not None]
+
+
+def build_report(
+    manifest: Manifest, records: list[dict[str, Any]], elapsed: float, jobs: int
+) -> dict[str, Any]:
+    """The JSON-ready report: per-criterion records and a summary."""
+    counts = dict.fromkeys(STATUSES, 0)
+    for record in records:
+        counts[record["status"]] += 1
+    ran = [record for record in records if not record.get("cached")]
+    return {
+        "manifest": manifest.path,
+        "passed": counts[STATUS_PASS] == len(records),
+        "summary": {
+            "criteria": len(records),
+            **counts,
+            "cached": len(records) - len(ran),
+            "wall_ms": round(elapsed * 1000, 1),
+            # Summed durations of the commands run: wall_ms if run serially
+            "commands_ms": round(sum(r["duration_ms"] for r in ran), 1),
+            "jobs": jobs,
+        },
+        "criteria": records,
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Human-readable report: one line per criterion, failure output, summary."""
+    lines = []
+    for record in report["criteria"]:
+        command, *more = record["command"].strip().splitlines() or [""]
+        duration = (
+            "cached"
+            if record.get("cached")
+            else f"{record['duration_ms'] / 1000:.2f} s"
+        )
+        lines.append(
+            f"{record['status'].upper():<8}{record['id']:<12}{duration:>10}  "
+            f"{command}" + (" ..." if more else "")
+        )
+        if record["status"] != STATUS_PASS:
+            if record["status"] == STATUS_TIMEOUT:
+                lines.append(f"    timed out after {record['timeout']:g} s")
+            for stream in ("stdout", "stderr"):
+                output = record[stream].rstrip()
+                if output:
+                    lines += [f"    {line}" for line in output.splitlines()[-20:]]
+    summary = report["summary"]
+    lines.append(
+        f"{summary['criteria']} bash criteria: {summary['pass']} passed"
+        + (f" ({summary['cached']} cached)" if summary["cached"] else "")
+        + ", "
+        f"{summary['fail']} failed, {summary['timeout']} timed out, "
+        f"{summary['error']} errors in {summary['wall_ms'] / 1000:.2f} s "
+        f"({summary['commands_ms'] / 1000:.2f} s of commands, "
+        f"{summary['jobs']} at a time)"
+    )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run a manifest's bash criteria and print the report."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Run a manifest's bash-method criteria in parallel."
+    )
+    parser.add_argument("manifest", help="Manifest file")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=available_cpus(),
+        help="Commands run at once (default: available CPUs)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Seconds per command without its own timeout (default: 600)",
+    )
+    parser.add_argument(
+        "--cwd", default=os.getcwd(), help="Directory to run commands in"
+    )
+    parser.add_argument(
+        "--criteria", help="Comma-separated criterion IDs to run (default: all)"
+    )
+    parser.add_argument(
+        "--scope",
+        help="Comma-separated files or globs the run covers, as /verify's "
+        "--scope; cached passes are keyed by their contents",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every criterion, ignoring and not storing cached passes",
+    )
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except OSError as e:
+        print(f"Cannot read {args.manifest}: {e}", file=sys.stderr)
+        sys.exit(2)
+    only = args.criteria.split(",") if args.criteria else None
+    items = bash_criteria(manifest, only)
+    if only is not None:
+        found = {item.id for item in items}
+        unknown = [item_id for item_id in only if item_id not in found]
+        if unknown:
+            print(
+                f"Not bash criteria in {args.manifest}: {', '.join(unknown)}",
+                file=sys.stderr,
+            )
+            sys.exit(2)
+
+    start = time.perf_counter()
+    scope = [glob for glob in args.scope.split(",") if glob] if args.scope else None
+    records = run_criteria(
+        items,
+        args.cwd,
+        args.jobs,
+        args.timeout,
+        cache=not args.no_cache,
+        scope=scope,
+    )
+    elapsed = time.perf_counter() - start
+    # Files named in the output widen what hook_impact knows each one reads
+    record_run(manifest.path, records, args.cwd)
+
+    jobs = max(1, min(args.jobs, len(items)))
+    report = build_report(manifest, records, elapsed, jobs)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
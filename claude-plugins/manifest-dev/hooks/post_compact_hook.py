@@ -7,16 +7,35 @@ may be lost from context. This hook detects active /do workflows and
 reminds Claude to re-read the manifest and log files.
 
 Registered as SessionStart hook with "compact" matcher.
+
+The state comes from the snapshot pre_compact_hook.py took just before
+compaction when there is a current one (see hook_utils.load_compact_snapshot),
+which also names the execution log the /do created; otherwise from the
+workflow event log or the transcript, as the other hooks read it.
+
+If the workflow state can't be determined within the latency budget
+($MANIFEST_DEV_HOOK_BUDGET_MS), $MANIFEST_DEV_HOOK_FAIL_MODE decides:
+"open" (default) adds nothing, "closed" adds the generic recovery reminder.
 """
 
 from __future__ import annotations
 
 import json
 import sys
+from typing import Any
 
+from hook_telemetry import current_telemetry, run_main, start_telemetry
 from hook_utils import (
+    STRATEGY_SNAPSHOT,
+    DoFlowState,
     build_system_reminder,
-    parse_do_flow,
+    current_do_flow,
+    get_fail_mode,
+    get_hook_budget,
+    load_compact_snapshot,
+    pending_checkpoints,
+    report_strategy,
+    split_do_args,
 )
 
 DO_WORKFLOW_RECOVERY_REMINDER = """This session was compacted during an active /do workflow. Context may have been lost.
@@ -31,6 +50,19 @@ The /do was invoked with: {do_args}
 Do not restart completed work. Resume from where you left off."""
 
 
+# When the execution log's path is known
+DO_WORKFLOW_RECOVERY_PATHS_REMINDER = """This session was compacted during an active /do workflow. Context may have been lost.
+
+CRITICAL: Before continuing, read the manifest and execution log in FULL.
+
+The /do was invoked with: {do_args}
+
+1. Read the manifest file - contains deliverables, acceptance criteria, and approach: {manifest_path}
+2. Read the execution log to recover progress: {log_path}
+
+Do not restart completed work. Resume from where you left off."""
+
+
 DO_WORKFLOW_RECOVERY_FALLBACK = """This session was compacted during an active /do workflow. Context may have been lost.
 
 CRITICAL: Before continuing, recover your workflow context:
@@ -41,48 +73,95 @@ CRITICAL: Before continuing, recover your workflow context:
 Do not restart completed work. Resume from where you left off."""
 
 
-def main() -> None:
-    """Main hook entry point."""
-    # Read hook input from stdin
-    try:
-        stdin_data = sys.stdin.read()
-        hook_input = json.loads(stdin_data)
-    except (json.JSONDecodeError, OSError):
-        hook_input = {}
+def evaluate_with_strategy(
+    hook_input: dict[str, Any],
+) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Build the recovery reminder, also naming the strategy that read the state.
 
+    The strategy is None when there was no transcript to read. Has no side
+    effects: checkpoint writes are held back (see pending_checkpoints).
+    """
     transcript_path = hook_input.get("transcript_path", "")
 
     # If no transcript, we can't detect /do workflow
     if not transcript_path:
-        sys.exit(0)
-
-    state = parse_do_flow(transcript_path)
-
-    # Not in /do workflow - nothing to do
-    if not state.has_do:
-        sys.exit(0)
-
-    # /do workflow completed - no need to recover
-    if state.has_done or state.has_escalate:
-        sys.exit(0)
-
-    # Active /do workflow - build recovery reminder
-    if state.do_args:
-        reminder = DO_WORKFLOW_RECOVERY_REMINDER.format(do_args=state.do_args)
+        return None, None
+
+    telemetry = current_telemetry()
+    state: DoFlowState | None
+    with telemetry.phase("snapshot"):
+        snapshot = load_compact_snapshot(transcript_path)
+    if snapshot is not None:
+        state, strategy = snapshot.state, STRATEGY_SNAPSHOT
+        manifest_path, log_path = snapshot.manifest_path, snapshot.log_path
     else:
+        with telemetry.phase("transcript"), pending_checkpoints():
+            state, strategy = current_do_flow(transcript_path, get_hook_budget())
+        manifest_path, log_path = split_do_args(state.do_args if state else None)
+    telemetry.note(strategy=strategy)
+
+    if state is None:
+        # Unknown within the latency budget - remind only when failing closed
+        if get_fail_mode() == "open":
+            return None, strategy
         reminder = DO_WORKFLOW_RECOVERY_FALLBACK
+    else:
+        # Not in /do workflow, or completed - nothing to recover
+        if not state.has_do or state.has_done or state.has_escalate:
+            return None, strategy
+
+        # Active /do workflow - build recovery reminder
+        if state.do_args and log_path:
+            reminder = DO_WORKFLOW_RECOVERY_PATHS_REMINDER.format(
+                do_args=state.do_args, manifest_path=manifest_path, log_path=log_path
+            )
+        elif state.do_args:
+            reminder = DO_WORKFLOW_RECOVERY_REMINDER.format(do_args=state.do_args)
+        else:
+            reminder = DO_WORKFLOW_RECOVERY_FALLBACK
 
     context = build_system_reminder(reminder)
 
-    output = {
+    output: dict[str, Any] = {
         "hookSpecificOutput": {
             "hookEventName": "SessionStart",
             "additionalContext": context,
         }
     }
-    print(json.dumps(output))
+    return output, strategy
+
+
+def evaluate(hook_input: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Build the recovery reminder for a compacted session, without side effects.
+
+    Returns the hook output to print, or None when there's nothing to restore.
+    """
+    return evaluate_with_strategy(hook_input)[0]
+
+
+def main() -> None:
+    """Main hook entry point."""
+    telemetry = start_telemetry("post_compact_hook")
+    # Read hook input from stdin
+    try:
+        with telemetry.phase("stdin"):
+            stdin_data = sys.stdin.read()
+            hook_input = json.loads(stdin_data)
+    except (json.JSONDecodeError, OSError):
+        hook_input = {}
+
+    with telemetry.phase("decision"), pending_checkpoints() as checkpoints:
+        output, strategy = evaluate_with_strategy(hook_input)
+    checkpoints.flush()
+    if strategy is not None:
+        report_strategy("post_compact_hook", strategy)
+    if output is not None:
+        print(json.dumps(output))
+    telemetry.finish(hook_input, output)
     sys.exit(0)
 
 
 if __name__ == "__main__":
-    main()
+    run_main("post_compact_hook", main)
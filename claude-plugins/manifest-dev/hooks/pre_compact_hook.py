@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pre-compact hook that snapshots /do workflow state before compaction.
+
+Captures the current /do flow, the manifest path and the execution log path
+into a per-session snapshot (see hook_utils.take_compact_snapshot), so the
+post-compact hook can restore context from one small file instead of
+reading the transcript, and name the exact files to re-read.
+
+Registered as PreCompact hook (manual and automatic compaction).
+
+Never produces output; a snapshot that can't be taken within the latency
+budget is skipped, and the post-compact hook reads the flow as usual.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any
+
+from hook_telemetry import current_telemetry, run_main, start_telemetry
+from hook_utils import (
+    get_hook_budget,
+    pending_checkpoints,
+    report_strategy,
+    save_compact_snapshot,
+    take_compact_snapshot,
+)
+
+
+def evaluate_with_strategy(hook_input: dict[str, Any]) -> tuple[None, str | None]:
+    """
+    Snapshot the workflow state, also naming the strategy that read it.
+
+    The strategy is None when there was no transcript to read. Writes the
+    snapshot (that's the hook's job), but holds back checkpoint writes
+    like the other hooks (see pending_checkpoints).
+    """
+    transcript_path = hook_input.get("transcript_path", "")
+    if not transcript_path:
+        return None, None
+
+    telemetry = current_telemetry()
+    with telemetry.phase("transcript"), pending_checkpoints():
+        snapshot, strategy = take_compact_snapshot(transcript_path, get_hook_budget())
+    telemetry.note(strategy=strategy)
+
+    if snapshot is not None:
+        with telemetry.phase("snapshot"):
+            save_compact_snapshot(transcript_path, snapshot)
+    return None, strategy
+
+
+def evaluate(hook_input: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Snapshot the workflow state of a session about to be compacted.
+
+    Always returns None: the hook only records. Like workflow_event_hook's,
+    this evaluate() writes, since recording is the point.
+    """
+    return evaluate_with_strategy(hook_input)[0]
+
+
+def main() -> None:
+    """Main hook entry point."""
+    telemetry = start_telemetry("pre_compact_hook")
+    try:
+        with telemetry.phase("stdin"):
+            stdin_data = sys.stdin.read()
+            hook_input = json.loads(stdin_data)
+    except (json.JSONDecodeError, OSError):
+        hook_input = {}
+
+    with telemetry.phase("decision"), pending_checkpoints() as checkpoints:
+        _, strategy = evaluate_with_strategy(hook_input)
+    checkpoints.flush()
+    if strategy is not None:
+        report_strategy("pre_compact_hook", strategy)
+    telemetry.finish(hook_input, None)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    run_main("pre_compact_hook", main)
@@ -7,15 +7,31 @@ the manifest and execution log are in full context for accurate verification.
 This is especially important after long sessions where manifest details may have
 drifted from memory.
 
+When the manifest named in the /verify arguments can be parsed (see
+hook_manifest.load_manifest), the reminder carries a precomputed plan
+instead: every INV-G* and AC-* in force, grouped by the agent that verifies
+it and its verify method, so all verifiers can be launched at once without
+re-deriving the list. Otherwise the generic reminder is used. With
+--scope=files, the plan also lists which criteria those files can affect
+(see hook_impact).
+
 Registered as PreToolUse hook with "Skill" matcher.
+
+This hook fires on every Skill call but only acts on /verify, so startup is
+kept minimal: json and hook_utils are imported only once the raw payload
+could be a /verify call.
 """
 
 from __future__ import annotations
 
-import json
 import sys
 
-from hook_utils import build_system_reminder
+from hook_telemetry import TYPE_CHECKING, run_main, start_telemetry
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from hook_manifest import Manifest, ManifestItem
 
 VERIFY_CONTEXT_REMINDER = """VERIFICATION CONTEXT CHECK: You are about to run /verify.
 
@@ -29,46 +45,206 @@ VERIFY_CONTEXT_REMINDER_MINIMAL = """VERIFICATION CONTEXT CHECK: You are about t
 BEFORE spawning verifiers, read the manifest and execution log in FULL if not recently loaded. You need ALL acceptance criteria (AC-*) and global invariants (INV-G*) in context to spawn the correct verifiers."""
 
 
-def main() -> None:
-    """Main hook entry point."""
-    # Read hook input from stdin
+VERIFY_PLAN_REMINDER = """VERIFICATION CONTEXT CHECK: You are about to run /verify.
+
+Arguments: {verify_args}
+
+Verification plan, precomputed from the manifest: {count} criteria, each with its line in the manifest.
+
+{plan}
+
+Launch ALL verifiers above in a SINGLE message - every criterion listed must be verified, none skipped. Hand each verifier its criterion's verify block (command, prompt, model) from the manifest line given. Read the execution log in FULL if not recently loaded."""
+
+
+# Plan headings for criteria /verify doesn't hand to an agent
+MANUAL_HEADING = "Manual - set aside for /escalate"
+UNSPECIFIED_HEADING = "No verify method - read the criterion to pick its verifier"
+
+# Longest criterion description shown in the plan
+PLAN_DESCRIPTION_CHARS = 100
+
+# Plan heading for the change impact of --scope files
+SCOPE_IMPACT_HEADING = "Change impact of the --scope files ({files}):"
+
+
+def manifest_path_from_args(args: str, cwd: str | None = None) -> str | None:
+    """Manifest path from /verify arguments: the first one that isn't a flag."""
+    import os
+
+    for arg in args.split():
+        if not arg.startswith("--"):
+            return os.path.join(cwd, arg) if cwd else arg
+    return None
+
+
+def scope_from_args(args: str) -> list[str] | None:
+    """Files from a --scope=a,b flag in /verify arguments, or None."""
+    for arg in args.split():
+        if arg.startswith("--scope="):
+            return [path for path in arg[len("--scope=") :].split(",") if path]
+    return None
+
+
+def format_verification_plan(
+    verify_args: str,
+    manifest: Manifest,
+    impact: list[dict[str, Any]] | None = None,
+) -> str | None:
+    """
+    The plan reminder for a parsed manifest, or None if it has no criteria.
+
+    Groups criteria by verifier and method, verifiers in the order /verify
+    lists its methods, criteria in manifest order. impact, from
+    hook_impact.impact for the --scope files, adds what they can affect.
+    """
+    from hook_manifest import VERIFY_METHODS
+
+    criteria = manifest.criteria()
+    if not criteria:
+        return None
+
+    order = {method: index for index, method in enumerate(VERIFY_METHODS)}
+    groups: dict[str, list[ManifestItem]] = {}
+    by_method = sorted(
+        criteria, key=lambda item: order.get(item.method or "", len(order))
+    )
+    for item in by_method:
+        if item.verifier is not None:
+            heading = f"{item.verifier} ({item.method})"
+        elif item.method == "manual":
+            heading = MANUAL_HEADING
+        else:
+            heading = UNSPECIFIED_HEADING
+        groups.setdefault(heading, []).append(item)
+
+    lines = []
+    for heading, items in groups.items():
+        lines.append(f"{heading}:")
+        for item in items:
+            description = item.description
+            if len(description) > PLAN_DESCRIPTION_CHARS:
+                description = description[: PLAN_DESCRIPTION_CHARS - 3] + "..."
+            lines.append(f"- {item.id} (line {item.line}): {description}")
+    if manifest.warnings:
+        lines.append("Manifest entries that couldn't be parsed - read them in full:")
+        lines += [f"- {warning}" for warning in manifest.warnings]
+    if impact is not None:
+        from hook_impact import format_impact
+
+        scope = scope_from_args(verify_args) or []
+        lines.append(SCOPE_IMPACT_HEADING.format(files=", ".join(scope)))
+        lines.append(format_impact(impact))
+
+    return VERIFY_PLAN_REMINDER.format(
+        verify_args=verify_args, count=len(criteria), plan="\n".join(lines)
+    )
+
+
+def verification_plan(verify_args: str, cwd: str | None = None) -> str | None:
+    """
+    The plan reminder for the manifest in the /verify arguments.
+
+    None when the manifest can't be read or has no criteria. Parse-cache
+    writes are held back (see hook_manifest.pending_manifest_cache).
+    """
+    from hook_manifest import load_manifest, pending_manifest_cache
+
+    manifest_path = manifest_path_from_args(verify_args, cwd)
+    if manifest_path is None:
+        return None
     try:
-        stdin_data = sys.stdin.read()
-        hook_input = json.loads(stdin_data)
-    except (json.JSONDecodeError, OSError):
-        sys.exit(0)
+        with pending_manifest_cache():
+            manifest = load_manifest(manifest_path)
+    except OSError:
+        return None
+
+    impact = None
+    scope = scope_from_args(verify_args)
+    if scope:
+        import os
+
+        from hook_impact import impact as change_impact
 
+        impact = change_impact(manifest, scope, cwd or os.getcwd())
+    return format_verification_plan(verify_args, manifest, impact)
+
+
+def evaluate(hook_input: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Build the verification reminder for a /verify Skill call.
+
+    Returns the hook output to print, or None for any other tool call. Has
+    no side effects: manifest parse-cache writes are held back.
+    """
     # Only apply to Skill tool calls
     tool_name = hook_input.get("tool_name", "")
     if tool_name != "Skill":
-        sys.exit(0)
+        return None
 
     tool_input = hook_input.get("tool_input", {})
     skill = tool_input.get("skill", "")
 
     # Only gate verify skill
     if skill != "verify" and not skill.endswith(":verify"):
-        sys.exit(0)
+        return None
+
+    from hook_utils import build_system_reminder
 
     # Get the raw arguments
     args = tool_input.get("args", "").strip()
 
     if args:
-        reminder = VERIFY_CONTEXT_REMINDER.format(verify_args=args)
+        reminder = verification_plan(
+            args, hook_input.get("cwd")
+        ) or VERIFY_CONTEXT_REMINDER.format(verify_args=args)
     else:
         reminder = VERIFY_CONTEXT_REMINDER_MINIMAL
 
     context = build_system_reminder(reminder)
 
-    output = {
+    return {
         "hookSpecificOutput": {
             "hookEventName": "PreToolUse",
             "additionalContext": context,
         }
     }
-    print(json.dumps(output))
+
+
+def main() -> None:
+    """Main hook entry point."""
+    telemetry = start_telemetry("pretool_verify_hook")
+    # Read hook input from stdin
+    try:
+        with telemetry.phase("stdin"):
+            stdin_data = sys.stdin.read()
+    except OSError:
+        telemetry.finish(None, None)
+        sys.exit(0)
+
+    # Fast path: a /verify Skill call always contains "verify" - skip decoding
+    if "verify" not in stdin_data:
+        telemetry.finish(None, None)
+        sys.exit(0)
+
+    import json
+
+    try:
+        with telemetry.phase("stdin"):
+            hook_input = json.loads(stdin_data)
+    except json.JSONDecodeError:
+        telemetry.finish(None, None)
+        sys.exit(0)
+
+    from hook_manifest import pending_manifest_cache
+
+    with telemetry.phase("decision"), pending_manifest_cache() as manifests:
+        output = evaluate(hook_input)
+    manifests.flush()
+    if output is not None:
+        print(json.dumps(output))
+    telemetry.finish(hook_input, output)
     sys.exit(0)
 
 
 if __name__ == "__main__":
-    main()
+    run_main("pretool_verify_hook", main)
@@ -12,58 +12,122 @@ Decision matrix:
 - /do + /escalate: ALLOW (properly escalated)
 - /do only: BLOCK (must verify first)
 - /do + /verify only: BLOCK (verify returned failures, keep working)
+
+Workflow state comes from the event log kept by workflow_event_hook.py when
+available, so only the transcript tail is read (and only when blocking is
+possible). Without a usable log, the whole transcript is scanned instead.
+Both reads run within the latency budget ($MANIFEST_DEV_HOOK_BUDGET_MS).
+When a scan runs out of budget, the checkpoint plus a bounded tail window
+answers; if even that can't tell (or the tail read itself runs out),
+$MANIFEST_DEV_HOOK_FAIL_MODE decides: "open" (default) allows the stop,
+"closed" blocks it.
 """
 
 from __future__ import annotations
 
 import json
 import sys
+import time
+from typing import Any
 
+from hook_telemetry import current_telemetry, run_main, start_telemetry
 from hook_utils import (
+    STRATEGY_EVENT_LOG,
+    STRATEGY_UNKNOWN,
+    ScanDeadlineError,
+    TranscriptScan,
     count_consecutive_short_outputs,
+    get_fail_mode,
+    get_hook_budget,
     has_recent_api_error,
-    parse_do_flow,
+    load_workflow_state,
+    pending_checkpoints,
+    read_transcript_signals,
+    remaining_budget,
+    report_strategy,
 )
 
 
-def main() -> None:
-    """Main hook entry point."""
-    try:
-        stdin_data = sys.stdin.read()
-        hook_input = json.loads(stdin_data)
-    except (json.JSONDecodeError, OSError):
-        # On any error, allow stop (fail open)
-        sys.exit(0)
+def read_stop_signals(
+    transcript_path: str, budget: float | None = None
+) -> tuple[TranscriptScan | None, str]:
+    """
+    Gather the Stop decision inputs, reading as little transcript as possible.
+
+    With a workflow event log, the /do flow comes from the log (caught up
+    with the transcript past its last event) and the API error flag and
+    short-output streak from the transcript tail - skipped
+    entirely when the flow alone allows the stop, and unknown if the tail
+    can't be read within the budget. Otherwise, one scan within the budget
+    (see read_transcript_signals). All reads share the budget. Returns the
+    inputs - None if unknown - and the strategy that answered.
+    """
+    deadline = None if budget is None else time.monotonic() + budget
+    do_flow = load_workflow_state(transcript_path, deadline)
+    if do_flow is None:
+        return read_transcript_signals(transcript_path, remaining_budget(deadline))
+
+    if not do_flow.has_do or do_flow.has_done or do_flow.has_escalate:
+        # Allowed whatever the tail says
+        scan = TranscriptScan(api_error=False, do_flow=do_flow, consecutive_short=0)
+        return scan, STRATEGY_EVENT_LOG
 
-    transcript_path = hook_input.get("transcript_path", "")
-    if not transcript_path:
-        sys.exit(0)
+    try:
+        scan = TranscriptScan(
+            api_error=has_recent_api_error(transcript_path, deadline),
+            do_flow=do_flow,
+            consecutive_short=count_consecutive_short_outputs(
+                transcript_path, deadline
+            ),
+        )
+    except ScanDeadlineError:
+        return None, STRATEGY_UNKNOWN
+    return scan, STRATEGY_EVENT_LOG
+
+
+def decide_stop(scan: TranscriptScan | None) -> dict[str, Any] | None:
+    """
+    Apply the decision matrix to the Stop inputs (None if unknown).
+
+    Returns the hook output to print, or None to allow the stop silently.
+    """
+    # Workflow state unknown within the latency budget - fail mode decides
+    if scan is None:
+        if get_fail_mode() == "open":
+            return None
+        return {
+            "decision": "block",
+            "reason": "Workflow state unknown",
+            "systemMessage": (
+                "Stop blocked: the /do workflow state could not be determined "
+                "within the hook latency budget (fail mode: closed). "
+                "If a /do is active, run /verify or /escalate; otherwise stop again."
+            ),
+        }
 
     # API errors are system failures, not voluntary stops - always allow
-    if has_recent_api_error(transcript_path):
-        sys.exit(0)
+    if scan.api_error:
+        return None
 
-    state = parse_do_flow(transcript_path)
+    state = scan.do_flow
 
     # Not in /do flow - allow stop
     if not state.has_do:
-        sys.exit(0)
+        return None
 
     # /done was called - verified complete, allow stop
     if state.has_done:
-        sys.exit(0)
+        return None
 
     # /escalate was called - properly escalated, allow stop
     if state.has_escalate:
-        sys.exit(0)
+        return None
 
     # /do was called but neither /done nor /escalate
     # Check for infinite loop pattern before blocking
-    consecutive_short = count_consecutive_short_outputs(transcript_path)
-
     # If we've had 3+ consecutive short outputs, we're in a loop - allow with warning
-    if consecutive_short >= 3:
-        output = {
+    if scan.consecutive_short >= 3:
+        return {
             "decision": "allow",
             "reason": "Loop detected - allowing stop to prevent infinite loop",
             "systemMessage": (
@@ -72,8 +136,6 @@ def main() -> None:
                 "Next time, call /escalate when blocked instead of minimal outputs."
             ),
         }
-        print(json.dumps(output))
-        sys.exit(0)
 
     # Provide guidance - same message regardless of attempt count
     # Clear directive: /verify or /escalate, nothing else
@@ -84,14 +146,64 @@ def main() -> None:
         "Short outputs will be blocked. Choose one."
     )
 
-    output = {
+    return {
         "decision": "block",
         "reason": "Execution not verified",
         "systemMessage": system_message,
     }
-    print(json.dumps(output))
+
+
+def evaluate_with_strategy(
+    hook_input: dict[str, Any],
+) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Decide a stop attempt, also naming the strategy that read the state.
+
+    The strategy is None when there was no transcript to read. Has no side
+    effects: checkpoint writes are held back (see pending_checkpoints).
+    """
+    transcript_path = hook_input.get("transcript_path", "")
+    if not transcript_path:
+        return None, None
+
+    telemetry = current_telemetry()
+    with telemetry.phase("transcript"), pending_checkpoints():
+        scan, strategy = read_stop_signals(transcript_path, get_hook_budget())
+    telemetry.note(strategy=strategy)
+    return decide_stop(scan), strategy
+
+
+def evaluate(hook_input: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Decide a stop attempt from the hook input, without side effects.
+
+    Returns the hook output to print, or None to allow the stop silently.
+    """
+    return evaluate_with_strategy(hook_input)[0]
+
+
+def main() -> None:
+    """Main hook entry point."""
+    telemetry = start_telemetry("stop_do_hook")
+    try:
+        with telemetry.phase("stdin"):
+            stdin_data = sys.stdin.read()
+            hook_input = json.loads(stdin_data)
+    except (json.JSONDecodeError, OSError):
+        # On any error, allow stop (fail open)
+        telemetry.finish(None, None)
+        sys.exit(0)
+
+    with telemetry.phase("decision"), pending_checkpoints() as checkpoints:
+        output, strategy = evaluate_with_strategy(hook_input)
+    checkpoints.flush()
+    if strategy is not None:
+        report_strategy("stop_do_hook", strategy)
+    if output is not None:
+        print(json.dumps(output))
+    telemetry.finish(hook_input, output)
     sys.exit(0)
 
 
 if __name__ == "__main__":
-    main()
+    run_main("stop_do_hook", main)
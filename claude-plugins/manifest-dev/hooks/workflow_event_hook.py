@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Hook that records /do workflow transitions as they happen.
+
+Appends every /do, /verify, /done and /escalate invocation to a per-session
+event log (see hook_utils.record_workflow_event), so the Stop and
+post-compact hooks can read the current workflow state without scanning the
+transcript.
+
+Registered as:
+- PostToolUse hook with "Skill" matcher: skills invoked by the model
+- UserPromptSubmit hook: slash commands typed by the user
+
+Never produces output; UserPromptSubmit output would be added to context.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any
+
+from hook_telemetry import current_telemetry, run_main, start_telemetry
+
+# hook_utils.WORKFLOW_SKILLS, without importing hook_utils on every prompt
+_WORKFLOW_SKILLS = ("do", "verify", "done", "escalate")
+
+
+def parse_workflow_event(hook_input: dict[str, Any]) -> tuple[str, str | None] | None:
+    """
+    Extract the workflow skill and its arguments from a hook input.
+
+    Handles Skill tool calls (PostToolUse) and slash-command prompts
+    (UserPromptSubmit). Returns None for anything else.
+    """
+    tool_input = hook_input.get("tool_input")
+    if hook_input.get("tool_name") == "Skill" and isinstance(tool_input, dict):
+        skill = tool_input.get("skill", "")
+        if not isinstance(skill, str):
+            return None
+        # Match "skill-name" or "plugin:skill-name"
+        name = skill.rsplit(":", 1)[-1]
+        args = tool_input.get("args", "")
+        return (
+            (name, args.strip() if args else None) if name in _WORKFLOW_SKILLS else None
+        )
+
+    prompt = hook_input.get("prompt")
+    if isinstance(prompt, str) and prompt.lstrip().startswith("/"):
+        command, *rest = prompt.strip().split(maxsplit=1)
+        # Match /<skill> or /manifest-dev:<skill> (only our plugin)
+        name = command[1:].removeprefix("manifest-dev:")
+        if name in _WORKFLOW_SKILLS:
+            return name, (rest[0].strip() or None) if rest else None
+
+    return None
+
+
+def evaluate(hook_input: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Record the workflow transition in this hook input, if any.
+
+    Always returns None: the hook only records, it never decides. Unlike the
+    other hooks' evaluate(), recording is the point, so this one writes.
+    """
+    transcript_path = hook_input.get("transcript_path", "")
+    event = parse_workflow_event(hook_input)
+    if not transcript_path or event is None:
+        return None
+
+    import time
+
+    from hook_utils import get_hook_budget, record_workflow_event
+
+    budget = get_hook_budget()
+    deadline = None if budget is None else time.monotonic() + budget
+    skill, args = event
+    with current_telemetry().phase("event-log"):
+        record_workflow_event(transcript_path, skill, args, deadline)
+    return None
+
+
+def main() -> None:
+    """Main hook entry point."""
+    telemetry = start_telemetry("workflow_event_hook")
+    try:
+        with telemetry.phase("stdin"):
+            stdin_data = sys.stdin.read()
+            hook_input = json.loads(stdin_data)
+    except (json.JSONDecodeError, OSError):
+        telemetry.finish(None, None)
+        sys.exit(0)
+
+    with telemetry.phase("decision"):
+        evaluate(hook_input)
+    telemetry.finish(hook_input, None)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    run_main("workflow_event_hook", main)
@@ -64,6 +64,10 @@ fi
 info "Installing dev dependencies..."
 uv pip install --python .venv/bin/python ruff black mypy pytest
 
+# Precompile hook bytecode so the first hook call doesn't pay for compilation
+info "Precompiling hooks..."
+python3 -m compileall -q claude-plugins/manifest-dev/hooks
+
 # Verify installations
 info "Verifying installations..."
 .venv/bin/ruff --version
@@ -0,0 +1,128 @@
+"""Shared fixtures and transcript-line helpers for manifest-dev hook tests."""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# The hooks import each other as top-level modules, as they do when run, so
+# tests import them the same way
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+# Set to run the tests marked timing: wall-clock and import-time budgets,
+# which depend on the machine and its load
+TIMING_TESTS_ENV = "MANIFEST_DEV_TIMING_TESTS"
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        f"timing: machine-dependent budget check, run with {TIMING_TESTS_ENV}=1",
+    )
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    if os.environ.get(TIMING_TESTS_ENV):
+        return
+    skip = pytest.mark.skip(reason=f"timing budgets run with {TIMING_TESTS_ENV}=1")
+    for item in items:
+        if "timing" in item.keywords:
+            item.add_marker(skip)
+
+
+def assistant(text: str = ".") -> dict[str, Any]:
+    """Assistant message with a text block (a short one by default)."""
+    return {
+        "type": "assistant",
+        "message": {"content": [{"type": "text", "text": text}]},
+    }
+
+
+def filler(count: int) -> list[dict[str, Any]]:
+    """Assistant lines with substantial output and no workflow events."""
+    return [assistant(f"working on step {i} " + "x" * 120) for i in range(count)]
+
+
+def do_command(args: str) -> dict[str, Any]:
+    """User /do slash command line."""
+    return {
+        "type": "user",
+        "message": {
+            "content": f"<command-name>/do</command-name><command-args>{args}</command-args>"
+        },
+    }
+
+
+def prompt(text: str = "next") -> dict[str, Any]:
+    """Plain user prompt."""
+    return {"type": "user", "message": {"content": text}}
+
+
+def skill_call(skill: str, args: str | None = None) -> dict[str, Any]:
+    """Assistant Skill tool call."""
+    tool_input: dict[str, Any] = {"skill": skill}
+    if args is not None:
+        tool_input["args"] = args
+    block = {"type": "tool_use", "name": "Skill", "input": tool_input}
+    return {"type": "assistant", "message": {"content": [block]}}
+
+
+def tool_result(text: str = "ok") -> dict[str, Any]:
+    """User line carrying a tool result."""
+    block = {"type": "tool_result", "tool_use_id": "t", "content": text}
+    return {"type": "user", "message": {"content": [block]}}
+
+
+@pytest.fixture(autouse=True)
+def isolated_state_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Keep hook state (checkpoints, caches) inside the test's tmp dir."""
+    state_dir = tmp_path / "manifest-dev-state"
+    monkeypatch.setenv("MANIFEST_DEV_STATE_DIR", str(state_dir))
+    return state_dir
+
+
+@pytest.fixture
+def manifest_file(request: pytest.FixtureRequest, tmp_path: Path) -> Path:
+    """The test module's MANIFEST on disk."""
+    path = tmp_path / "manifest.md"
+    path.write_text(request.module.MANIFEST, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    """A git repository with a committed app.py and README.md."""
+    path = tmp_path / "repo"
+    path.mkdir()
+    (path / "app.py").write_text("x = 1\n")
+    (path / "README.md").write_text("cache\n")
+    for args in (
+        ["init", "-q"],
+        ["add", "app.py", "README.md"],
+        ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(["git", *args], cwd=path, check=True)
+    return path
+
+
+@pytest.fixture
+def write_transcript(tmp_path: Path):
+    """Factory fixture for creating temporary transcript files."""
+
+    def _write(lines: list[dict[str, Any]], name: str = "transcript.jsonl") -> str:
+        transcript_file = tmp_path / name
+        with open(transcript_file, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+        return str(transcript_file)
+
+    return _write
@@ -5,6 +5,7 @@ Tests the stop hook that enforces verification-first workflow for /do.
 """
 from __future__ import annotations
 
+import importlib
 import json
 import subprocess
 import sys
@@ -122,17 +123,23 @@ def assistant_skill_escalate() -> dict[str, Any]:
 
 
 def run_hook(hook_path: Path, hook_input: dict[str, Any]) -> dict[str, Any] | None:
-    """Run the hook script and return parsed output, or None if no output."""
-    result = subprocess.run(
+    """Evaluate the hook in-process and return its output as main() prints it."""
+    module = importlib.import_module(hook_path.stem)
+    output = module.evaluate(hook_input)
+    if output is None:
+        return None
+    return json.loads(json.dumps(output))
+
+
+def run_hook_script(hook_path: Path, stdin_data: str) -> subprocess.CompletedProcess:
+    """Run the hook script as Claude Code would."""
+    return subprocess.run(
         [sys.executable, str(hook_path)],
-        input=json.dumps(hook_input),
+        input=stdin_data,
         capture_output=True,
         text=True,
         cwd=str(EXPERIMENTAL_HOOKS_DIR),
     )
-    if result.stdout.strip():
-        return json.loads(result.stdout)
-    return None
 
 
 class TestStopHookBlocking:
@@ -737,3 +744,40 @@ class TestStopHookEdgeCases:
 
         # Should allow (fail open) on parsing errors
         assert result is None
+
+    def test_entry_point_prints_decision(
+        self,
+        experimental_hook_path: Path,
+        temp_transcript,
+        user_do_command: dict[str, Any],
+    ):
+        """The script reads stdin and prints what evaluate() returns."""
+        hook_input = {"transcript_path": temp_transcript([user_do_command])}
+
+        result = run_hook_script(experimental_hook_path, json.dumps(hook_input))
+
+        assert result.returncode == 0
+        assert json.loads(result.stdout) == run_hook(experimental_hook_path, hook_input)
+
+    def test_entry_point_invalid_stdin(self, experimental_hook_path: Path):
+        """Unreadable input allows the stop (fail open)."""
+        result = run_hook_script(experimental_hook_path, "not json")
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == ""
+
+    def test_evaluate_has_no_side_effects(
+        self,
+        experimental_hook_path: Path,
+        temp_transcript,
+        user_do_command: dict[str, Any],
+        isolated_state_dir: Path,
+    ):
+        """evaluate() writes no checkpoints; the script keeps them."""
+        hook_input = {"transcript_path": temp_transcript([user_do_command])}
+
+        run_hook(experimental_hook_path, hook_input)
+        assert not isolated_state_dir.exists()
+
+        run_hook_script(experimental_hook_path, json.dumps(hook_input))
+        assert any(isolated_state_dir.rglob("*.json"))
@@ -0,0 +1,163 @@
+"""
+Tests for the manifest-dev fleet audit of archived transcripts.
+
+Tests per-session records, the aggregate report, the process pool and the
+CLI.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_audit  # noqa: E402
+
+from tests.hooks.conftest import assistant, do_command, prompt, skill_call  # noqa: E402
+
+WORK = assistant("x" * 150)
+
+# Sessions by how they last stopped
+SESSIONS: dict[str, list[dict[str, Any]]] = {
+    "no-do": [prompt(), WORK],
+    "done": [do_command("/tmp/m.md"), WORK, skill_call("verify"), skill_call("done")],
+    "escalated": [do_command("/tmp/m.md"), WORK, skill_call("escalate")],
+    "loop-detector": [
+        do_command("/tmp/m.md"),
+        WORK,
+        *[line for _ in range(3) for line in (assistant("."), prompt())],
+    ],
+    "blocked": [do_command("/tmp/m.md"), WORK, prompt(), WORK],
+    "api-error": [
+        do_command("/tmp/m.md"),
+        {**assistant("API Error: 529"), "isApiErrorMessage": True},
+    ],
+    "no-stop": [prompt()],
+}
+
+
+@pytest.fixture
+def fleet(tmp_path: Path) -> Path:
+    """Directory with one session per status, some nested."""
+    root = tmp_path / "projects"
+    for index, (status, lines) in enumerate(SESSIONS.items()):
+        directory = root / f"project-{index % 2}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{status}.jsonl").write_text(
+            "".join(json.dumps(line) + "\n" for line in lines)
+        )
+    (root / "notes.txt").write_text("not a transcript")
+    return root
+
+
+class TestAuditTranscript:
+    """Tests for auditing one session."""
+
+    @pytest.mark.parametrize("status", list(SESSIONS))
+    def test_status(self, fleet: Path, status: str):
+        """Sessions are classified by their last Stop hook call."""
+        (path,) = fleet.rglob(f"{status}.jsonl")
+
+        record = hook_audit.audit_transcript(str(path))
+
+        assert record["status"] == status
+        assert record["bytes"] == path.stat().st_size
+
+    def test_counts(self, fleet: Path):
+        """Stops, blocks, loop trips and invocations are counted."""
+        (path,) = fleet.rglob("loop-detector.jsonl")
+
+        record = hook_audit.audit_transcript(str(path))
+
+        assert record["stops"] == 3
+        assert record["blocks"] == 2
+        assert record["loop_trips"] == 1
+        assert record["invocations"]["do"] == 1
+        assert record["do_args"] == "/tmp/m.md"
+
+    def test_unreadable(self, tmp_path: Path):
+        """A missing transcript is an error record, not an exception."""
+        record = hook_audit.audit_transcript(str(tmp_path / "missing.jsonl"))
+
+        assert set(record) == {"path", "error"}
+
+
+class TestAuditFleet:
+    """Tests for auditing many sessions."""
+
+    def test_finds_transcripts(self, fleet: Path, tmp_path: Path):
+        """Directories are searched recursively; files are taken as given."""
+        extra = tmp_path / "extra.log"
+        extra.write_text("")
+
+        found = list(hook_audit.iter_transcripts([str(fleet), str(extra)]))
+
+        assert sorted(Path(p).stem for p in found[:-1]) == sorted(SESSIONS)
+        assert found[-1] == str(extra)
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_report(self, fleet: Path, jobs: int):
+        """In-process and pooled runs stream every record and agree."""
+        transcripts = list(hook_audit.iter_transcripts([str(fleet)]))
+        output = io.StringIO()
+
+        report = hook_audit.audit_fleet(transcripts, jobs, output)
+        summary = report.summary()
+
+        assert len(output.getvalue().splitlines()) == len(SESSIONS)
+        assert summary["sessions"] == len(SESSIONS)
+        assert summary["statuses"] == dict.fromkeys(hook_audit.STATUSES, 1)
+        assert summary["sessions_in_do"] == 5
+        assert summary["stopped_without_done"] == 4
+        assert summary["loop_trips"] == 1
+        assert summary["invocations"]["escalate"] == 1
+        assert summary["sessions_invoking"]["do"] == 5
+
+    def test_errors_counted(self, tmp_path: Path):
+        """Unreadable transcripts are counted apart from sessions."""
+        report = hook_audit.audit_fleet([str(tmp_path / "missing.jsonl")], 1)
+
+        assert report.summary()["errors"] == 1
+        assert report.summary()["sessions"] == 0
+
+
+class TestCli:
+    """Tests for the command line."""
+
+    def run_cli(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_audit.py"), *args],
+            capture_output=True,
+            text=True,
+        )
+
+    def test_report(self, fleet: Path, tmp_path: Path):
+        """The report is printed; records go to --output."""
+        output = tmp_path / "records.jsonl"
+
+        result = self.run_cli(str(fleet), "--jobs", "2", "--output", str(output))
+
+        assert result.returncode == 0
+        assert "7 transcripts" in result.stdout
+        assert "stopped without /done: 4" in result.stdout
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert len(records) == len(SESSIONS)
+
+    def test_records_on_stdout(self, fleet: Path):
+        """With --output -, stdout carries only records; the report moves."""
+        result = self.run_cli(str(fleet), "--output", "-", "--json")
+
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert len(records) == len(SESSIONS)
+        assert json.loads(result.stderr)["sessions"] == len(SESSIONS)
@@ -0,0 +1,332 @@
+"""
+Tests for manifest-dev hook latency budgets and degraded mode.
+
+Tests deadline-bounded transcript scans, the tail-window fallback, and how
+the Stop and post-compact hooks fail open or closed when the workflow state
+can't be determined in time.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import post_compact_hook  # noqa: E402
+import stop_do_hook  # noqa: E402
+import workflow_event_hook  # noqa: E402
+
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import assistant, do_command, filler  # noqa: E402
+
+
+@pytest.fixture
+def expire_after(monkeypatch: pytest.MonkeyPatch):
+    """Make deadlines pass after a given number of checks."""
+
+    def _expire(checks: int) -> None:
+        remaining = [checks]
+
+        def out_of_time(deadline: float | None) -> bool:
+            if deadline is None:
+                return False
+            remaining[0] -= 1
+            return remaining[0] < 0
+
+        monkeypatch.setattr(hook_utils, "_out_of_time", out_of_time)
+
+    return _expire
+
+
+class TestBudgetSettings:
+    """Tests for reading the budget and fail mode from the environment."""
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [(None, 2.0), ("500", 0.5), ("0", None), ("-1", None), ("soon", 2.0)],
+    )
+    def test_budget(self, monkeypatch: pytest.MonkeyPatch, value, expected):
+        """Milliseconds become seconds; zero or less disables the budget."""
+        if value is None:
+            monkeypatch.delenv(hook_utils.HOOK_BUDGET_ENV, raising=False)
+        else:
+            monkeypatch.setenv(hook_utils.HOOK_BUDGET_ENV, value)
+
+        assert hook_utils.get_hook_budget() == expected
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [(None, "open"), ("closed", "closed"), (" CLOSED ", "closed"), ("x", "open")],
+    )
+    def test_fail_mode(self, monkeypatch: pytest.MonkeyPatch, value, expected):
+        """Anything but "closed" fails open."""
+        if value is None:
+            monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+        else:
+            monkeypatch.setenv(hook_utils.FAIL_MODE_ENV, value)
+
+        assert hook_utils.get_fail_mode() == expected
+
+
+class TestScanDeadline:
+    """Tests for transcript scans that run out of time."""
+
+    @pytest.mark.parametrize("prefilter", [True, False])
+    def test_expired_deadline_raises(self, write_transcript, prefilter: bool):
+        """A deadline that has passed stops the scan after its first batch."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(200)])
+
+        with pytest.raises(hook_utils.ScanDeadlineError):
+            hook_utils.scan_transcript(path, prefilter=prefilter, deadline=0.0)
+
+    @pytest.mark.parametrize("prefilter", [True, False])
+    def test_progress_is_checkpointed(
+        self, write_transcript, expire_after, prefilter: bool
+    ):
+        """The next scan resumes where the interrupted one stopped."""
+        lines = [do_command("/tmp/m.md"), *filler(300), assistant(), assistant()]
+        path = write_transcript(lines)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False, anchor=False)
+
+        # Past the anchor search, then two batches of lines
+        expire_after(3)
+        with pytest.raises(hook_utils.ScanDeadlineError) as raised:
+            hook_utils.scan_transcript(path, prefilter=prefilter, deadline=1.0)
+
+        checkpoint = raised.value.checkpoint
+        assert checkpoint is not None
+        assert 0 < checkpoint.offset < Path(path).stat().st_size
+        assert hook_utils.load_checkpoint(path) == checkpoint
+        assert hook_utils.scan_transcript(path) == full
+
+    def test_anchor_timeout_saves_progress(self, write_transcript, expire_after):
+        """A cold scan whose anchor search times out still checkpoints a batch."""
+        # The last /do has no arguments, so the search needs a second check
+        lines = [do_command("/tmp/m.md"), *filler(300), do_command("")]
+        path = write_transcript(lines)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False, anchor=False)
+
+        expire_after(1)
+        with pytest.raises(hook_utils.ScanDeadlineError) as raised:
+            hook_utils.scan_transcript(path, deadline=1.0)
+
+        checkpoint = raised.value.checkpoint
+        assert checkpoint is not None and checkpoint.offset > 0
+        assert hook_utils.load_checkpoint(path) == checkpoint
+        assert hook_utils.scan_transcript(path) == full
+
+    def test_no_deadline(self, write_transcript, expire_after):
+        """Without a deadline, scans always finish."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(300)])
+        expire_after(0)
+
+        scan = hook_utils.scan_transcript(path)
+
+        assert scan.do_flow.do_args == "/tmp/m.md"
+
+
+class TestTailWindow:
+    """Tests for the bounded tail-window fallback."""
+
+    def test_do_inside_window_is_exact(self, write_transcript):
+        """A /do that resets the flow makes earlier lines irrelevant."""
+        path = write_transcript(
+            [
+                do_command("/tmp/old.md"),
+                *filler(100),
+                do_command("/tmp/new.md"),
+                assistant(),
+                assistant(),
+            ]
+        )
+
+        tail = hook_utils.scan_transcript_tail(path, window_bytes=1024)
+
+        assert tail == hook_utils.scan_transcript(path, use_checkpoint=False)
+        assert tail is not None and tail.do_flow.do_args == "/tmp/new.md"
+
+    def test_small_transcript_is_read_whole(self, write_transcript):
+        """A transcript smaller than the window is scanned completely."""
+        path = write_transcript([*filler(5), do_command("/tmp/m.md")])
+
+        tail = hook_utils.scan_transcript_tail(path)
+
+        assert tail == hook_utils.scan_transcript(path, use_checkpoint=False)
+
+    def test_unknown_without_checkpoint(self, write_transcript):
+        """No /do in the window and nothing cached: the flow is unknown."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(100)])
+
+        assert hook_utils.scan_transcript_tail(path, window_bytes=1024) is None
+
+    def test_builds_on_checkpoint(self, write_transcript):
+        """Without a /do in the window, a checkpoint inside it is extended."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(100)])
+        hook_utils.scan_transcript(path)
+        with open(path, "a", encoding="utf-8") as f:
+            for line in [assistant(), assistant()]:
+                f.write(json.dumps(line) + "\n")
+
+        tail = hook_utils.scan_transcript_tail(path, window_bytes=1024)
+
+        assert tail == hook_utils.scan_transcript(path, use_checkpoint=False)
+
+    def test_checkpoint_before_window_is_unknown(self, write_transcript):
+        """Lines between the checkpoint and the window are never skipped."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(100)])
+        hook_utils.scan_transcript(path)
+        with open(path, "a", encoding="utf-8") as f:
+            for line in filler(50):
+                f.write(json.dumps(line) + "\n")
+
+        assert hook_utils.scan_transcript_tail(path, window_bytes=1024) is None
+
+    def test_missing_transcript(self, tmp_path: Path):
+        """A missing transcript is an empty scan, as for scan_transcript."""
+        tail = hook_utils.scan_transcript_tail(str(tmp_path / "missing.jsonl"))
+
+        assert tail is not None and not tail.do_flow.has_do
+
+
+class TestReadTranscriptSignals:
+    """Tests for choosing between the full scan and the fallback."""
+
+    def test_scan_within_budget(self, write_transcript):
+        """A scan that finishes in time answers."""
+        path = write_transcript([do_command("/tmp/m.md")])
+
+        scan, strategy = hook_utils.read_transcript_signals(path, budget=10.0)
+
+        assert strategy == hook_utils.STRATEGY_SCAN
+        assert scan is not None and scan.do_flow.has_do
+
+    def test_falls_back_to_tail_window(self, write_transcript, expire_after):
+        """Running out of time answers from the tail window."""
+        path = write_transcript([*filler(100), do_command("/tmp/m.md"), assistant()])
+        expire_after(0)
+
+        scan, strategy = hook_utils.read_transcript_signals(path, budget=10.0)
+
+        assert strategy == hook_utils.STRATEGY_TAIL_WINDOW
+        assert scan == hook_utils.scan_transcript(path, use_checkpoint=False)
+
+    def test_unknown(self, write_transcript, expire_after, monkeypatch):
+        """Neither the scan nor the window can answer."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(100)])
+        monkeypatch.setattr(hook_utils, "TAIL_WINDOW_BYTES", 1024)
+        expire_after(0)
+
+        scan, strategy = hook_utils.read_transcript_signals(path, budget=10.0)
+
+        assert (scan, strategy) == (None, hook_utils.STRATEGY_UNKNOWN)
+
+
+class TestDegradedHooks:
+    """Tests for hook decisions under an exhausted latency budget."""
+
+    @pytest.fixture
+    def unknown_state(self, write_transcript, expire_after, monkeypatch) -> str:
+        """Active /do that only a full scan could find."""
+        path = write_transcript([do_command("/tmp/m.md"), *filler(100)])
+        monkeypatch.setattr(hook_utils, "TAIL_WINDOW_BYTES", 1024)
+        expire_after(0)
+        return path
+
+    def test_stop_fails_open(self, unknown_state: str, monkeypatch):
+        """By default an unknown state allows the stop."""
+        monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+
+        output, strategy = stop_do_hook.evaluate_with_strategy(
+            {"transcript_path": unknown_state}
+        )
+
+        assert output is None
+        assert strategy == hook_utils.STRATEGY_UNKNOWN
+
+    def test_stop_main_reports_strategy(self, unknown_state: str, monkeypatch, capsys):
+        """The entry point says on stderr which degraded strategy answered."""
+        monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+        payload = json.dumps({"transcript_path": unknown_state})
+        monkeypatch.setattr(sys, "stdin", io.StringIO(payload))
+
+        with pytest.raises(SystemExit):
+            stop_do_hook.main()
+
+        assert "answered from unknown" in capsys.readouterr().err
+
+    def test_stop_fails_closed(self, unknown_state: str, monkeypatch):
+        """Fail-closed blocks when the state is unknown."""
+        monkeypatch.setenv(hook_utils.FAIL_MODE_ENV, "closed")
+
+        output = stop_do_hook.evaluate({"transcript_path": unknown_state})
+
+        assert output is not None
+        assert output["decision"] == "block"
+        assert output["reason"] == "Workflow state unknown"
+
+    def test_stop_uses_tail_window(self, write_transcript, expire_after):
+        """A degraded answer still blocks an unverified /do."""
+        path = write_transcript([*filler(100), do_command("/tmp/m.md"), *filler(3)])
+        expire_after(0)
+
+        output, strategy = stop_do_hook.evaluate_with_strategy(
+            {"transcript_path": path}
+        )
+
+        assert output is not None and output["decision"] == "block"
+        assert strategy == hook_utils.STRATEGY_TAIL_WINDOW
+
+    def test_event_log_tail_within_budget(self, write_transcript, expire_after):
+        """With an event log, a tail read past the budget leaves the state unknown."""
+        path = write_transcript([do_command("/tmp/m.md"), *[assistant()] * 100])
+        workflow_event_hook.evaluate(
+            {"transcript_path": path, "prompt": "/manifest-dev:do /tmp/m.md"}
+        )
+
+        scan, strategy = stop_do_hook.read_stop_signals(path, budget=10.0)
+        assert strategy == hook_utils.STRATEGY_EVENT_LOG
+        assert scan is not None and scan.consecutive_short == 100
+
+        expire_after(0)
+        scan, strategy = stop_do_hook.read_stop_signals(path, budget=10.0)
+        assert (scan, strategy) == (None, hook_utils.STRATEGY_UNKNOWN)
+
+        scan, strategy = stop_do_hook.read_stop_signals(path, budget=None)
+        assert strategy == hook_utils.STRATEGY_EVENT_LOG
+
+    def test_post_compact_fails_open(self, unknown_state: str, monkeypatch):
+        """By default an unknown state adds no reminder."""
+        monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+
+        assert post_compact_hook.evaluate({"transcript_path": unknown_state}) is None
+
+    def test_post_compact_fails_closed(self, unknown_state: str, monkeypatch):
+        """Fail-closed adds the generic recovery reminder."""
+        monkeypatch.setenv(hook_utils.FAIL_MODE_ENV, "closed")
+
+        output = post_compact_hook.evaluate({"transcript_path": unknown_state})
+
+        assert output is not None
+        context = output["hookSpecificOutput"]["additionalContext"]
+        assert "do-log-*.md" in context
+
+    def test_in_budget_reports_nothing(self, write_transcript, monkeypatch, capsys):
+        """Normal answers stay quiet on stderr."""
+        path = write_transcript([do_command("/tmp/m.md")])
+        monkeypatch.setattr(
+            sys, "stdin", io.StringIO(json.dumps({"transcript_path": path}))
+        )
+
+        with pytest.raises(SystemExit):
+            stop_do_hook.main()
+
+        assert capsys.readouterr().err == ""
@@ -0,0 +1,348 @@
+"""
+Tests for the manifest-dev hook daemon and its client.
+
+Tests forwarding hook payloads over a Unix socket, in-process fallback,
+and per-session checkpoint eviction.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Add manifest-dev hooks directory to path
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_daemon  # noqa: E402
+import stop_do_hook  # noqa: E402
+
+import hook_client  # noqa: E402
+import hook_utils  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets required"
+)
+
+DO_COMMAND = {
+    "type": "user",
+    "message": {
+        "content": "<command-name>/do</command-name><command-args>/tmp/m.md</command-args>"
+    },
+}
+
+MANIFEST = """\
+# Definition: Daemon
+
+## 6. Deliverables (The Work)
+
+### Deliverable 1: Cache
+**Acceptance Criteria:**
+- [AC-1.1] Description: Parses are cached | Verify: bash
+"""
+
+
+def make_checkpoint(offset: int) -> hook_utils.ScanCheckpoint:
+    """Checkpoint with a recognizable offset."""
+    return hook_utils.ScanCheckpoint(
+        offset=offset,
+        device=1,
+        inode=1,
+        size=offset,
+        mtime_ns=0,
+        digest="",
+        scan=hook_utils._TranscriptScanner().result(),
+    )
+
+
+def run_client(
+    hook_name: str,
+    hook_input: dict[str, Any],
+    env: dict[str, str] | None = None,
+    cwd: Path | None = None,
+) -> subprocess.CompletedProcess:
+    """Run hook_client.py as the plugin would."""
+    return subprocess.run(
+        [sys.executable, str(HOOKS_DIR / "hook_client.py"), hook_name],
+        input=json.dumps(hook_input),
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        cwd=cwd,
+    )
+
+
+@pytest.fixture
+def transcript(tmp_path: Path) -> str:
+    """Transcript with an unfinished /do."""
+    transcript_file = tmp_path / "transcript.jsonl"
+    transcript_file.write_text(json.dumps(DO_COMMAND) + "\n", encoding="utf-8")
+    return str(transcript_file)
+
+
+@pytest.fixture
+def socket_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Short socket path (Unix socket paths are length-limited)."""
+    path = tmp_path / "hookd.sock"
+    monkeypatch.setenv(hook_client.SOCKET_ENV, str(path))
+    return str(path)
+
+
+def start_daemon_thread(socket_path: str, idle_timeout: float) -> threading.Thread:
+    """Run the daemon in a background thread; return once it accepts."""
+    thread = threading.Thread(
+        target=hook_daemon.serve, args=(socket_path, idle_timeout), daemon=True
+    )
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not hook_daemon.is_daemon_running(socket_path):
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.01)
+    return thread
+
+
+@pytest.fixture
+def daemon(socket_path: str) -> Iterator[threading.Thread]:
+    """Run the daemon in a background thread until it idles out."""
+    thread = start_daemon_thread(socket_path, 0.5)
+    yield thread
+    thread.join(timeout=5)
+
+
+class TestHookClient:
+    """Tests for the forwarding client."""
+
+    def test_falls_back_in_process_without_daemon(self, transcript: str, socket_path):
+        """Without a daemon the client prints what the hook itself prints."""
+        hook_input = {"transcript_path": transcript}
+
+        via_client = run_client("stop_do_hook", hook_input)
+        direct = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "stop_do_hook.py")],
+            input=json.dumps(hook_input),
+            capture_output=True,
+            text=True,
+        )
+
+        assert via_client.returncode == 0
+        assert via_client.stdout == direct.stdout
+        assert json.loads(via_client.stdout)["decision"] == "block"
+
+    def test_unknown_hook_is_noop(self):
+        """Unknown hook names allow (no output, exit 0)."""
+        result = run_client("not_a_hook", {})
+
+        assert result.returncode == 0
+        assert result.stdout == ""
+
+    def test_socket_path_follows_state_dir(self, monkeypatch, tmp_path: Path):
+        """Client and hook_utils agree on the state dir without shared imports."""
+        monkeypatch.delenv(hook_client.SOCKET_ENV, raising=False)
+        monkeypatch.setenv("MANIFEST_DEV_STATE_DIR", str(tmp_path / "state"))
+
+        assert Path(hook_client.get_socket_path()).parent == hook_utils.get_state_dir()
+
+    def test_socket_path_per_install(self, monkeypatch):
+        """Each hooks directory gets its own socket, so updates don't collide."""
+        monkeypatch.delenv(hook_client.SOCKET_ENV, raising=False)
+        current = hook_client.get_socket_path()
+        monkeypatch.setattr(hook_client, "HOOKS_DIR", "/some/other/plugin/hooks")
+
+        assert hook_client.get_socket_path() != current
+
+
+class TestHookDaemon:
+    """Tests for serving hooks over the Unix socket."""
+
+    def test_forwards_to_daemon(self, daemon, transcript: str):
+        """The daemon answers with the hook's exact output."""
+        payload = json.dumps({"transcript_path": transcript}).encode()
+
+        response = hook_client.forward("stop_do_hook", payload)
+
+        assert response is not None
+        stdout, stderr = response
+        assert json.loads(stdout)["decision"] == "block"
+        assert stdout.endswith("\n")
+        assert stderr == ""
+
+    def test_client_output_matches_in_process(
+        self, daemon, transcript: str, tmp_path: Path
+    ):
+        """Client output through the daemon equals the fallback output."""
+        hook_input = {"transcript_path": transcript}
+
+        via_daemon = run_client("stop_do_hook", hook_input)
+        in_process = run_client(
+            "stop_do_hook",
+            hook_input,
+            env={hook_client.SOCKET_ENV: str(tmp_path / "absent.sock")},
+        )
+
+        assert via_daemon.returncode == 0
+        assert via_daemon.stdout == in_process.stdout
+        assert json.loads(via_daemon.stdout)["decision"] == "block"
+
+    def test_invalid_payload_prints_nothing(self, daemon):
+        """Unreadable hook input produces no output, like the hooks."""
+        assert hook_client.forward("pretool_verify_hook", b"not json") == ("", "")
+
+    def test_forwards_strategy_note(self, daemon, transcript: str, monkeypatch):
+        """A degraded answer's stderr note reaches the client, as in-process."""
+        monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+        monkeypatch.setattr(
+            stop_do_hook,
+            "evaluate_with_strategy",
+            lambda hook_input: (None, hook_utils.STRATEGY_UNKNOWN),
+        )
+        payload = json.dumps({"transcript_path": transcript}).encode()
+
+        response = hook_client.forward("stop_do_hook", payload)
+
+        assert response is not None
+        stdout, stderr = response
+        assert stdout == ""
+        assert "latency budget exceeded, answered from unknown" in stderr
+
+    def test_keeps_manifest_cache_writes(
+        self, daemon, tmp_path: Path, isolated_state_dir: Path
+    ):
+        """Manifest parses held back by evaluate() are written, as under main()."""
+        manifest = tmp_path / "manifest.md"
+        manifest.write_text(MANIFEST, encoding="utf-8")
+        payload = json.dumps(
+            {
+                "tool_name": "Skill",
+                "tool_input": {
+                    "skill": "manifest-dev:verify",
+                    "args": f"{manifest} /tmp/log.md",
+                },
+            }
+        ).encode()
+
+        response = hook_client.forward("pretool_verify_hook", payload)
+
+        assert response is not None
+        assert "AC-1.1" in response[0]
+        assert any(isolated_state_dir.rglob("*.json"))
+
+    def test_uses_client_cwd(self, daemon, tmp_path: Path):
+        """Relative paths resolve against the client's directory."""
+        workdir = tmp_path / "work"
+        workdir.mkdir()
+        (workdir / "manifest.md").write_text(MANIFEST, encoding="utf-8")
+        hook_input = {
+            "tool_name": "Skill",
+            "tool_input": {
+                "skill": "manifest-dev:verify",
+                "args": "manifest.md /tmp/log.md",
+            },
+        }
+
+        result = run_client("pretool_verify_hook", hook_input, cwd=workdir)
+
+        assert "AC-1.1" in result.stdout
+        assert os.getcwd() != str(workdir)
+
+    def test_uses_client_settings(self, daemon, transcript: str, monkeypatch):
+        """Hook settings come from the client's environment, not the daemon's."""
+        monkeypatch.delenv(hook_utils.FAIL_MODE_ENV, raising=False)
+        monkeypatch.setattr(
+            stop_do_hook,
+            "evaluate_with_strategy",
+            lambda hook_input: (None, hook_utils.STRATEGY_UNKNOWN),
+        )
+        hook_input = {"transcript_path": transcript}
+
+        result = run_client(
+            "stop_do_hook", hook_input, env={hook_utils.FAIL_MODE_ENV: "closed"}
+        )
+
+        assert "(fail mode: closed)" in result.stderr
+        assert hook_utils.FAIL_MODE_ENV not in os.environ
+
+    def test_rejects_other_hooks_dir(self, daemon, socket_path: str, monkeypatch):
+        """Clients from a different install fall back instead of being served."""
+        monkeypatch.setattr(hook_client, "HOOKS_DIR", "/some/other/plugin/hooks")
+
+        assert hook_client.forward("stop_do_hook", b"{}") is None
+
+    def test_other_install_retires_daemon(self, socket_path: str, monkeypatch):
+        """A mismatched client frees the socket so its own daemon can start."""
+        thread = start_daemon_thread(socket_path, 60)
+        monkeypatch.setattr(hook_client, "HOOKS_DIR", "/some/other/plugin/hooks")
+
+        assert hook_client.forward("stop_do_hook", b"{}") is None
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+
+    def test_second_daemon_refuses_to_start(self, daemon, socket_path: str):
+        """Only one daemon serves a socket."""
+        assert hook_daemon.serve(socket_path, idle_timeout=0.1) is False
+
+    def test_exits_when_idle(self, socket_path: str):
+        """The daemon stops and removes its socket after the idle timeout."""
+        started = time.monotonic()
+
+        assert hook_daemon.serve(socket_path, idle_timeout=0.1) is True
+
+        assert time.monotonic() - started < 5
+        assert not os.path.exists(socket_path)
+
+
+class TestSessionCheckpointStore:
+    """Tests for in-memory per-session checkpoint eviction."""
+
+    def test_evicts_idle_sessions_to_disk(self):
+        """Sessions unused past the TTL are dropped from memory but kept on disk."""
+        now = [0.0]
+        store = hook_daemon.SessionCheckpointStore(session_ttl=10, clock=lambda: now[0])
+        store.save("/t/a.jsonl", make_checkpoint(1))
+        now[0] = 5
+        store.save("/t/b.jsonl", make_checkpoint(2))
+
+        now[0] = 12
+        store.evict()
+
+        assert len(store) == 1
+        persisted = hook_utils.load_checkpoint("/t/a.jsonl")
+        assert persisted is not None and persisted.offset == 1
+        loaded = store.load("/t/b.jsonl")
+        assert loaded is not None and loaded.offset == 2
+
+    def test_caps_session_count(self):
+        """The least recently used sessions are evicted beyond the cap."""
+        store = hook_daemon.SessionCheckpointStore(max_sessions=2)
+        store.save("/t/a.jsonl", make_checkpoint(1))
+        store.save("/t/b.jsonl", make_checkpoint(2))
+        store.load("/t/a.jsonl")
+        store.save("/t/c.jsonl", make_checkpoint(3))
+
+        assert len(store) == 2
+        # b was least recently used; it now comes back from disk
+        loaded = store.load("/t/b.jsonl")
+        assert loaded is not None and loaded.offset == 2
+
+    def test_flush_persists_all(self):
+        """Flushing writes every in-memory checkpoint to disk."""
+        store = hook_daemon.SessionCheckpointStore()
+        store.save("/t/a.jsonl", make_checkpoint(7))
+
+        store.flush()
+
+        persisted = hook_utils.load_checkpoint("/t/a.jsonl")
+        assert persisted is not None and persisted.offset == 7
@@ -0,0 +1,295 @@
+"""
+Tests for the manifest-dev change-impact index.
+
+Tests finding what each criterion reads, learning from past runs, and
+picking the criteria a set of changed files can affect.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_impact  # noqa: E402
+import hook_manifest  # noqa: E402
+
+MANIFEST = """\
+# Definition: Impact
+
+## 3. Global Invariants (The Constitution)
+
+- [INV-G1] Description: Tests pass
+  ```yaml
+  verify:
+    method: bash
+    command: "pytest -q"
+  ```
+- [INV-G2] Description: Lint clean
+  ```yaml
+  verify:
+    method: bash
+    command: "ruff check src/ && black --check src/"
+  ```
+
+## 6. Deliverables (The Work)
+
+### Deliverable 1: Docs
+**Acceptance Criteria:**
+- [AC-1.1] Description: README mentions the cache
+  ```yaml
+  verify:
+    method: bash
+    command: "grep -q cache README.md"
+  ```
+- [AC-1.2] Description: Handlers documented
+  ```yaml
+  verify:
+    method: codebase
+    scope: ["src/handlers/**/*.py", docs]
+  ```
+- [AC-1.3] Description: Reviewed | Verify: subagent
+"""
+
+
+def affected(manifest_file: Path, changed: list[str], cwd: Path) -> list[str]:
+    """IDs of the criteria the changed files can affect."""
+    manifest = hook_manifest.load_manifest(str(manifest_file))
+    records = hook_impact.impact(manifest, changed, str(cwd))
+    return [record["id"] for record in records if record["affected"]]
+
+
+class TestCommandPaths:
+    """Tests for reading inputs from bash commands."""
+
+    @pytest.mark.parametrize(
+        "command,expected",
+        [
+            ("grep -q cache README.md", ["README.md"]),
+            (
+                "ruff check src/ && black --check src/",
+                ["src", "src", "**/pyproject.toml", "**/ruff.toml", "**/.ruff.toml"],
+            ),
+            ("ls . | wc -l", [""]),
+            ("cat --file=conf/app.toml > out.txt", ["conf/app.toml"]),
+            ("FOO=1 ! grep -rq TODO lib", ["lib"]),
+        ],
+    )
+    def test_bounded(self, tmp_path: Path, command: str, expected: list[str]):
+        """Commands of argument readers are bounded by their path arguments."""
+        (tmp_path / "lib").mkdir()
+
+        assert hook_impact.command_paths(command, str(tmp_path)) == expected
+
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "pytest -q tests/",  # a test run imports more than it's given
+            "cd src && grep -q x a.py",  # paths relative to another directory
+            "grep -q TODO",  # reads stdin only
+            "ruff check",  # lints the whole tree
+            "find . -name '*.py' -exec cat {} +",  # runs other programs
+            "awk -f lint.awk src/a.py",  # awk and sed scripts can read files
+            "sed -n p src/a.py",
+            "echo 'unterminated",
+        ],
+    )
+    def test_unbounded(self, tmp_path: Path, command: str):
+        """Anything else can read files that can't be determined."""
+        assert hook_impact.command_paths(command, str(tmp_path)) is None
+
+
+class TestGlobs:
+    """Tests for matching changed files against inputs."""
+
+    @pytest.mark.parametrize(
+        "pattern,path,matches",
+        [
+            ("src", "src/app/main.py", True),
+            ("src/*.py", "src/app/main.py", False),
+            ("src/**/*.py", "src/app/main.py", True),
+            ("src/**/*.py", "src/main.py", True),
+            ("*.md", "README.md", True),
+            ("*.md", "docs/a.md", False),
+            ("file[0-9].txt", "file3.txt", True),
+            ("file[!0-9].txt", "file3.txt", False),
+            ("", "anything/at/all", True),
+            ("src/app.py", "src/app.pyc", False),
+        ],
+    )
+    def test_glob(self, pattern: str, path: str, matches: bool):
+        """** spans directories; a directory covers its contents."""
+        inputs = hook_impact.CriterionInputs("AC-1.1", [pattern], [], True)
+
+        assert bool(inputs.matching([path])) is matches
+
+
+class TestImpact:
+    """Tests for picking the criteria to re-verify."""
+
+    def test_minimal_set(self, manifest_file: Path, tmp_path: Path):
+        """Bounded criteria only when their inputs changed; unbounded always."""
+        assert affected(manifest_file, ["README.md"], tmp_path) == [
+            "INV-G1",
+            "AC-1.1",
+            "AC-1.3",
+        ]
+        assert affected(manifest_file, ["src/handlers/v1/users.py"], tmp_path) == [
+            "INV-G1",
+            "INV-G2",
+            "AC-1.2",
+            "AC-1.3",
+        ]
+        assert affected(manifest_file, [], tmp_path) == ["INV-G1", "AC-1.3"]
+
+    def test_linter_config(self, manifest_file: Path, tmp_path: Path):
+        """Editing a linter's config affects the criteria that run it."""
+        assert "INV-G2" in affected(manifest_file, ["pyproject.toml"], tmp_path)
+        assert "INV-G2" in affected(manifest_file, ["sub/ruff.toml"], tmp_path)
+
+    def test_absolute_changed_paths(self, manifest_file: Path, tmp_path: Path):
+        """Changed files may be given as absolute paths."""
+        changed = [str(tmp_path / "docs" / "index.md")]
+
+        assert "AC-1.2" in affected(manifest_file, changed, tmp_path)
+
+    def test_records(self, manifest_file: Path, tmp_path: Path):
+        """Records say which changed files matched and whether inputs are known."""
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        records = hook_impact.impact(manifest, ["README.md"], str(tmp_path))
+
+        by_id = {record["id"]: record for record in records}
+        assert by_id["AC-1.1"]["files"] == ["README.md"]
+        assert by_id["INV-G1"]["bounded"] is False
+        text = hook_impact.format_impact(records)
+        assert text.startswith("3 of 5 criteria to re-verify:")
+        assert "Unaffected: INV-G2 AC-1.2" in text
+
+
+class TestLearnedPaths:
+    """Tests for learning inputs from past runs."""
+
+    def test_output_paths(self, tmp_path: Path):
+        """Existing files under cwd named in output, relative and in order."""
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "app.py").write_text("")
+        (tmp_path / "setup.cfg").write_text("")
+        output = (
+            f"{tmp_path}/src/app.py:12:3: E501 line too long\n"
+            "./setup.cfg: warning\n"
+            "src/app.py again, src/missing.py, http://example.com/x.html\n"
+        )
+
+        assert hook_impact.output_paths(output, str(tmp_path)) == [
+            "src/app.py",
+            "setup.cfg",
+        ]
+
+    def test_record_run_widens_inputs(self, manifest_file: Path, tmp_path: Path):
+        """A file a past run named makes its criterion affected by it."""
+        (tmp_path / "NOTES.md").write_text("")
+        record = {
+            "id": "AC-1.1",
+            "stdout": "see NOTES.md",
+            "stderr": "",
+            "cached": False,
+        }
+
+        assert "AC-1.1" not in affected(manifest_file, ["NOTES.md"], tmp_path)
+        hook_impact.record_run(str(manifest_file), [record], str(tmp_path))
+        assert "AC-1.1" in affected(manifest_file, ["NOTES.md"], tmp_path)
+
+    def test_cached_records_skipped(
+        self, manifest_file: Path, tmp_path: Path, isolated_state_dir: Path
+    ):
+        """Cached records didn't run, so teach nothing; nothing new, no write."""
+        (tmp_path / "NOTES.md").write_text("")
+        record = {"id": "AC-1.1", "stdout": "NOTES.md", "stderr": "", "cached": True}
+
+        hook_impact.record_run(str(manifest_file), [record], str(tmp_path))
+
+        assert not isolated_state_dir.exists()
+
+
+class TestChangedFiles:
+    """Tests for listing changed files with git."""
+
+    def test_modified_and_untracked(self, repo: Path):
+        """Edits since HEAD and new files, not unchanged ones."""
+        (repo / "README.md").write_text("more cache\n")
+        (repo / "new.txt").write_text("")
+
+        assert sorted(hook_impact.changed_files(str(repo))) == [
+            "README.md",
+            "new.txt",
+        ]
+
+    def test_names_with_edge_spaces(self, repo: Path):
+        """Leading and trailing spaces are part of the names."""
+        (repo / " first.txt").write_text("")
+        (repo / "last.txt ").write_text("")
+
+        assert sorted(hook_impact.changed_files(str(repo))) == [
+            " first.txt",
+            "last.txt ",
+        ]
+
+    def test_not_a_repository(self, tmp_path: Path):
+        """Outside git there's no diff."""
+        outside = tmp_path / "plain"
+        outside.mkdir()
+
+        assert hook_impact.changed_files(str(outside)) is None
+
+
+class TestCli:
+    """Tests for the command line."""
+
+    def run_cli(self, *args: str, cwd: Path) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_impact.py"), *args],
+            capture_output=True,
+            text=True,
+            cwd=str(cwd),
+        )
+
+    def test_ids_from_git_diff(self, manifest_file: Path, repo: Path):
+        """--ids lists what the working tree's changes can affect."""
+        (repo / "README.md").write_text("more cache\n")
+
+        result = self.run_cli(str(manifest_file), "--ids", cwd=repo)
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == "INV-G1,AC-1.1,AC-1.3"
+
+    def test_json_with_files(self, manifest_file: Path, tmp_path: Path):
+        """Listed files are used instead of git; --json prints every record."""
+        result = self.run_cli(str(manifest_file), "docs/a.md", "--json", cwd=tmp_path)
+
+        report = json.loads(result.stdout)
+        assert report["changed"] == ["docs/a.md"]
+        assert [r["id"] for r in report["criteria"] if r["affected"]] == [
+            "INV-G1",
+            "AC-1.2",
+            "AC-1.3",
+        ]
+
+    def test_not_a_repository(self, manifest_file: Path, tmp_path: Path):
+        """Without files or git there's nothing to compare."""
+        outside = tmp_path / "plain"
+        outside.mkdir()
+
+        result = self.run_cli(str(manifest_file), cwd=outside)
+
+        assert result.returncode == 2
+        assert "Cannot diff" in result.stderr
@@ -0,0 +1,381 @@
+"""
+Tests for manifest-dev manifest parsing.
+
+Tests parsing manifests into typed records, the verify: YAML subset,
+amendments, and the on-disk parse cache.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_manifest  # noqa: E402
+
+MANIFEST = """\
+# Definition: Add caching
+
+## 1. Intent & Context
+- **Goal:** Faster responses
+
+## 2. Approach (Complex Tasks Only)
+- **Risk Areas:**
+  - [R-1] Stale cache | Detect: tests
+- **Trade-offs:**
+  - [T-1] Speed vs memory → Prefer speed because latency
+
+## 3. Global Invariants (The Constitution)
+
+- [INV-G1] Description: Tests pass | Verify: bash
+  ```yaml
+  verify:
+    method: bash
+    command: "pytest -q"
+    timeout: 300
+  ```
+- [INV-G2] Description: No bugs | Verify: subagent
+  ```yaml
+  verify:
+    method: subagent
+    agent: code-bugs-reviewer
+    prompt: |
+      Review the diff.
+      # keep this line
+
+      Report issues.
+  ```
+
+## 4. Process Guidance (Non-Verifiable)
+- [PG-1] Description: Small commits
+
+## 5. Known Assumptions
+- [ASM-1] Linux only | Default: linux | Impact if wrong: port
+
+## 6. Deliverables (The Work)
+
+### Deliverable 1: Cache
+**Acceptance Criteria:**
+- [AC-1.1] Description: Cache hit
+  returns fast | Verify: codebase
+  ```yaml
+  verify:
+    method: codebase
+    scope: [src/cache.py, src/app.py]
+  ```
+
+### Deliverable 2: Docs
+**Acceptance Criteria:**
+- [AC-2.1] Description: README explains the cache | Verify: manual
+
+## Amendments
+- [AC-1.1.1] amends AC-1.1: Cache hit under 1 ms
+  ```yaml
+  verify:
+    method: bash
+    command: python bench.py
+  ```
+"""
+
+
+class TestParseManifest:
+    """Tests for parsing manifest text."""
+
+    def test_items(self):
+        """Every ID'd entry is found with its kind, in file order."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+
+        assert [(item.id, item.kind) for item in manifest.items] == [
+            ("R-1", "risk"),
+            ("T-1", "tradeoff"),
+            ("INV-G1", "invariant"),
+            ("INV-G2", "invariant"),
+            ("PG-1", "guidance"),
+            ("ASM-1", "assumption"),
+            ("AC-1.1", "acceptance"),
+            ("AC-2.1", "acceptance"),
+            ("AC-1.1.1", "acceptance"),
+        ]
+        assert manifest.title == "Add caching"
+        assert manifest.deliverables == {1: "Cache", 2: "Docs"}
+        assert manifest.warnings == []
+
+    def test_entry_fields(self):
+        """Text continues over indented lines; ACs know their deliverable."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+        item = manifest.get("AC-1.1")
+
+        assert item is not None
+        assert item.description == "Cache hit returns fast"
+        assert item.deliverable == 1
+        assert item.section == "Deliverable 1: Cache"
+        assert (
+            item.line
+            == MANIFEST.splitlines().index("- [AC-1.1] Description: Cache hit") + 1
+        )
+
+    def test_verify_blocks(self):
+        """verify: blocks are parsed into mappings."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+
+        assert manifest.get("INV-G1").verify == {
+            "method": "bash",
+            "command": "pytest -q",
+            "timeout": 300,
+        }
+        assert manifest.get("INV-G2").verify["prompt"] == (
+            "Review the diff.\n# keep this line\n\nReport issues.\n"
+        )
+        assert manifest.get("AC-1.1").verify["scope"] == [
+            "src/cache.py",
+            "src/app.py",
+        ]
+
+    def test_method(self):
+        """The method comes from the verify: block, else the inline Verify:."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+
+        assert manifest.get("INV-G2").method == "subagent"
+        assert manifest.get("AC-2.1").method == "manual"
+        assert manifest.get("PG-1").method is None
+
+    def test_amendments(self):
+        """Amendments replace the criteria they amend."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+
+        assert manifest.get("AC-1.1.1").amends == "AC-1.1"
+        assert [item.id for item in manifest.criteria()] == [
+            "INV-G1",
+            "INV-G2",
+            "AC-2.1",
+            "AC-1.1.1",
+        ]
+
+    def test_amendment_by_id_shape(self):
+        """An amendment ID without "amends" still names what it amends."""
+        text = "- [INV-G1] Old\n\n## Amendments\n- [INV-G1.1] New rule\n"
+
+        manifest = hook_manifest.parse_manifest(text)
+
+        assert [item.id for item in manifest.criteria()] == ["INV-G1.1"]
+
+    def test_by_method(self):
+        """Criteria in force are grouped by verify method."""
+        manifest = hook_manifest.parse_manifest(MANIFEST)
+
+        grouped = {
+            method: [item.id for item in items]
+            for method, items in manifest.by_method().items()
+        }
+        assert grouped == {
+            "bash": ["INV-G1", "AC-1.1.1"],
+            "subagent": ["INV-G2"],
+            "manual": ["AC-2.1"],
+        }
+
+    def test_summary_counts(self):
+        """The summary counts items in force by kind."""
+        summary = hook_manifest.parse_manifest(MANIFEST).summary()
+
+        assert summary["counts"] == {
+            "invariant": 2,
+            "acceptance": 2,
+            "guidance": 1,
+            "risk": 1,
+            "tradeoff": 1,
+            "assumption": 1,
+        }
+        assert summary["amendments"] == 1
+
+    def test_unreadable_block(self):
+        """A verify: block outside the subset is a warning, not an error."""
+        text = "- [INV-G1] Tests\n  ```yaml\n  verify: &anchor\n    method: {a: b}\n  ```\n"
+
+        manifest = hook_manifest.parse_manifest(text)
+
+        assert manifest.get("INV-G1").verify is None
+        assert len(manifest.warnings) == 1
+        assert "INV-G1" in manifest.warnings[0]
+
+    def test_other_code_blocks(self):
+        """Code blocks without verify: don't end up in items."""
+        text = "- [AC-1.1] Output\n  ```bash\n  - [AC-9.9] not an entry\n  ```\n"
+
+        manifest = hook_manifest.parse_manifest(text)
+
+        assert [item.id for item in manifest.items] == ["AC-1.1"]
+        assert manifest.items[0].verify is None
+
+
+class TestParseYamlBlock:
+    """Tests for the verify: YAML subset."""
+
+    def test_scalars(self):
+        """Quoted, plain, numeric, boolean and null scalars."""
+        block = [
+            "verify:",
+            "  a: 'it''s'",
+            '  b: "tab\\there"',
+            "  c: 42",
+            "  d: true",
+            "  e: ~",
+            "  f: plain text # comment",
+        ]
+
+        assert hook_manifest.parse_yaml_block(block)["verify"] == {
+            "a": "it's",
+            "b": "tab\there",
+            "c": 42,
+            "d": True,
+            "e": None,
+            "f": "plain text",
+        }
+
+    def test_block_list_and_folded(self):
+        """Block lists (also at the key's indentation) and folded scalars."""
+        block = [
+            "verify:",
+            "  files:",
+            "  - a.py",
+            "  - b.py",
+            "  prompt: >-",
+            "    one",
+            "    two",
+        ]
+
+        assert hook_manifest.parse_yaml_block(block)["verify"] == {
+            "files": ["a.py", "b.py"],
+            "prompt": "one two",
+        }
+
+    def test_bad_indentation(self):
+        """Over-indented keys are rejected."""
+        with pytest.raises(hook_manifest.ManifestYamlError):
+            hook_manifest.parse_yaml_block(["verify:", "  a: 1", "    b: 2"])
+
+
+class TestLoadManifest:
+    """Tests for the on-disk parse cache."""
+
+    def test_cached_parse(self, manifest_file: Path, monkeypatch):
+        """An unchanged manifest is answered from the cache without parsing."""
+        first = hook_manifest.load_manifest(str(manifest_file))
+
+        def fail(*args: object) -> None:
+            raise AssertionError("parsed again")
+
+        monkeypatch.setattr(hook_manifest, "parse_manifest", fail)
+        second = hook_manifest.load_manifest(str(manifest_file))
+
+        assert second == first
+        assert second.path == str(manifest_file)
+
+    def test_touched_but_identical(self, manifest_file: Path, monkeypatch):
+        """A new mtime with the same content is matched by its hash."""
+        hook_manifest.load_manifest(str(manifest_file))
+        st = manifest_file.stat()
+        os.utime(manifest_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        def fail(*args: object) -> None:
+            raise AssertionError("parsed again")
+
+        monkeypatch.setattr(hook_manifest, "parse_manifest", fail)
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        assert len(manifest.criteria()) == 4
+
+    def test_changed_content(self, manifest_file: Path):
+        """An edited manifest is parsed again."""
+        hook_manifest.load_manifest(str(manifest_file))
+        manifest_file.write_text(MANIFEST + "- [AC-2.2] More docs\n", encoding="utf-8")
+
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        assert manifest.get("AC-2.2") is not None
+
+    def test_no_cache(self, manifest_file: Path, isolated_state_dir: Path):
+        """cache=False neither reads nor writes the cache."""
+        manifest = hook_manifest.load_manifest(str(manifest_file), cache=False)
+
+        assert len(manifest.items) == 9
+        assert not isolated_state_dir.exists()
+
+    def test_corrupt_cache(self, manifest_file: Path, isolated_state_dir: Path):
+        """A corrupt cache entry is ignored."""
+        hook_manifest.load_manifest(str(manifest_file))
+        (entry,) = (isolated_state_dir / "manifests").iterdir()
+        entry.write_text("{not json")
+
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        assert len(manifest.items) == 9
+
+    def test_missing_manifest(self, tmp_path: Path):
+        """A missing manifest raises OSError."""
+        with pytest.raises(OSError):
+            hook_manifest.load_manifest(str(tmp_path / "missing.md"))
+
+
+class TestCli:
+    """Tests for the command line."""
+
+    def run_cli(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_manifest.py"), *args],
+            capture_output=True,
+            text=True,
+        )
+
+    def test_summary(self, manifest_file: Path):
+        """The default output counts items and lists criteria by method."""
+        result = self.run_cli(str(manifest_file))
+
+        assert result.returncode == 0
+        assert result.stdout.startswith("Add caching: 2 deliverables")
+        assert "bash        INV-G1 AC-1.1.1" in result.stdout
+
+    def test_json(self, manifest_file: Path):
+        """--json prints every record."""
+        result = self.run_cli(str(manifest_file), "--json")
+
+        assert len(json.loads(result.stdout)["items"]) == 9
+
+    def test_missing_manifest(self, tmp_path: Path):
+        """An unreadable manifest is an error."""
+        result = self.run_cli(str(tmp_path / "missing.md"))
+
+        assert result.returncode == 1
+        assert "Cannot read" in result.stderr
+
+
+class TestPendingManifestCache:
+    """Tests for holding back parse-cache writes."""
+
+    def test_held_back_until_flush(self, manifest_file: Path, isolated_state_dir: Path):
+        """Writes inside the block wait for flush()."""
+        with hook_manifest.pending_manifest_cache() as pending:
+            hook_manifest.load_manifest(str(manifest_file))
+
+        assert not isolated_state_dir.exists()
+        pending.flush()
+        assert len(list((isolated_state_dir / "manifests").iterdir())) == 1
+
+    def test_nested_blocks_collect(self, manifest_file: Path):
+        """An enclosing block collects the writes of the blocks inside it."""
+        with (
+            hook_manifest.pending_manifest_cache() as outer,
+            hook_manifest.pending_manifest_cache(),
+        ):
+            hook_manifest.load_manifest(str(manifest_file))
+
+        assert len(outer.pending) == 1
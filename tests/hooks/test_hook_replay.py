@@ -0,0 +1,227 @@
+"""
+Tests for the manifest-dev transcript replay simulator.
+
+Tests where replays call the Stop hook, the decisions and records they
+report, the event-log and cold modes, and the CLI.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_replay  # noqa: E402
+
+import hook_telemetry  # noqa: E402
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import (  # noqa: E402
+    assistant,
+    do_command,
+    prompt,
+    tool_result,
+)
+
+# DEL noqa: E402
+
+
+def tool_use(name: str, tool_input: dict[str, Any]) -> dict[str, Any]:
+    """Assistant tool call."""
+    block = {"type": "tool_use", "name": name, "input": tool_input}
+    return {"type": "assistant", "message": {"content": [block]}}
+
+
+def long_text() -> dict[str, Any]:
+    """Assistant output too long to count as short."""
+    return assistant("x" * 150)
+
+
+def run_replay(path: str, tmp_path: Path, **options: Any) -> list[dict[str, Any]]:
+    """Replay a transcript into a scratch directory under tmp_path."""
+    workdir = tmp_path / "replay"
+    workdir.mkdir(parents=True, exist_ok=True)
+    return list(hook_replay.replay(path, str(workdir), **options))
+
+
+# A session: unrelated turn, /do with tool use, stalls, then /verify and /done
+SESSION = [
+    prompt("hello"),
+    long_text(),
+    do_command("/tmp/m.md"),
+    tool_use("Bash", {"command": "ls"}),
+    tool_result(),
+    long_text(),
+    prompt("keep going"),
+    assistant("."),
+    prompt("continue"),
+    assistant("."),
+    prompt("continue"),
+    assistant("."),
+    prompt("finish"),
+    tool_use("Skill", {"skill": "manifest-dev:verify", "args": "/tmp/m.md"}),
+    tool_result(),
+    tool_use("Skill", {"skill": "manifest-dev:done"}),
+    tool_result(),
+    long_text(),
+]
+
+
+class TestReplay:
+    """Tests for the decision timeline."""
+
+    def test_steps_at_turn_ends(self, write_transcript, tmp_path: Path):
+        """The hook runs before each user prompt and at the end, not mid-turn."""
+        path = write_transcript(SESSION)
+
+        records = run_replay(path, tmp_path)
+
+        assert [r["line"] for r in records] == [2, 6, 8, 10, 12, 18]
+        sizes = [len(json.dumps(line)) + 1 for line in SESSION]
+        assert [r["offset"] for r in records] == [
+            sum(sizes[: r["line"]]) for r in records
+        ]
+        assert [r["step"] for r in records] == [1, 2, 3, 4, 5, 6]
+
+    def test_oversized_lines(self, write_transcript, tmp_path: Path, monkeypatch):
+        """Lines past the read bound are still copied whole into the prefix."""
+        monkeypatch.setattr(hook_utils, "MAX_LINE_BYTES", 1000)
+        lines = [prompt("hello"), assistant("x" * 5000), prompt("again"), long_text()]
+        path = write_transcript(lines)
+
+        records = run_replay(path, tmp_path)
+
+        assert [r["line"] for r in records] == [2, 4]
+        prefix = tmp_path / "replay" / "transcript.jsonl"
+        assert prefix.read_bytes() == Path(path).read_bytes()
+
+    def test_decision_timeline(self, write_transcript, tmp_path: Path):
+        """Each step has the decision the hook would have made then."""
+        path = write_transcript(SESSION)
+
+        records = run_replay(path, tmp_path)
+
+        assert [r["outcome"] for r in records] == [
+            "none",
+            "block",
+            "block",
+            "block",
+            "allow",
+            "none",
+        ]
+        assert records[1]["reason"] == "Execution not verified"
+        assert records[4]["reason"].startswith("Loop detected")
+        assert hook_replay.summarize_replay(records)["loop_steps"] == [5]
+
+    def test_records_latency(self, write_transcript, tmp_path: Path):
+        """Steps carry telemetry: wall time, strategy, lines decoded."""
+        path = write_transcript(SESSION)
+
+        records = run_replay(path, tmp_path)
+
+        assert all(r["wall_ms"] > 0 for r in records)
+        assert {r["strategy"] for r in records} == {hook_utils.STRATEGY_SCAN}
+        assert records[0]["lines_decoded"] > 0
+
+    def test_checkpoints_carry_over(self, write_transcript, tmp_path: Path):
+        """Warm steps decode only new lines; cold steps rescan."""
+        lines = [do_command("/tmp/m.md")]
+        for _ in range(10):
+            lines += [*[long_text()] * 5, prompt("continue")]
+        path = write_transcript(lines)
+
+        warm = run_replay(path, tmp_path / "warm")
+        cold = run_replay(path, tmp_path / "cold", cold=True)
+
+        assert [r["outcome"] for r in warm] == [r["outcome"] for r in cold]
+        assert warm[-1]["lines_decoded"] < cold[-1]["lines_decoded"]
+
+    def test_event_log(self, write_transcript, tmp_path: Path):
+        """Workflow events are recorded, so the hook reads the event log."""
+        path = write_transcript(SESSION)
+
+        records = run_replay(path, tmp_path, event_log=True)
+
+        assert [r["outcome"] for r in records] == [
+            r["outcome"] for r in run_replay(path, tmp_path / "scan")
+        ]
+        assert records[1]["strategy"] == hook_utils.STRATEGY_EVENT_LOG
+
+    def test_leaves_no_state(
+        self, write_transcript, tmp_path: Path, isolated_state_dir: Path
+    ):
+        """Hook state goes to the scratch directory, not the real one."""
+        path = write_transcript(SESSION)
+
+        run_replay(path, tmp_path, event_log=True)
+
+        assert not isolated_state_dir.exists()
+        assert os.environ[hook_telemetry.STATE_DIR_ENV] == str(isolated_state_dir)
+
+
+class TestWorkflowHookInputs:
+    """Tests for deriving workflow_event_hook inputs from transcript lines."""
+
+    def test_slash_command(self):
+        """Typed commands become prompts."""
+        inputs = hook_replay.workflow_hook_inputs(do_command(" /tmp/m.md "), "t")
+
+        assert inputs == [{"transcript_path": "t", "prompt": "/do /tmp/m.md"}]
+
+    def test_skill_call(self):
+        """Skill tool calls become PostToolUse inputs."""
+        line = tool_use("Skill", {"skill": "verify"})
+
+        (hook_input,) = hook_replay.workflow_hook_inputs(line, "t")
+
+        assert hook_input["tool_name"] == "Skill"
+        assert hook_input["tool_input"] == {"skill": "verify"}
+
+    def test_other_lines(self):
+        """Plain prompts, skill expansions and other tools give nothing."""
+        meta = {**do_command("/tmp/m.md"), "isMeta": True}
+
+        for line in [prompt("hi"), meta, tool_use("Bash", {}), long_text()]:
+            assert hook_replay.workflow_hook_inputs(line, "t") == []
+
+
+class TestCli:
+    """Tests for the command line."""
+
+    def run_cli(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_replay.py"), *args],
+            capture_output=True,
+            text=True,
+        )
+
+    def test_timeline_and_summary(self, write_transcript):
+        """The default output is a table and a summary."""
+        result = self.run_cli(write_transcript(SESSION))
+
+        assert result.returncode == 0
+        assert result.stdout.startswith(hook_replay.TIMELINE_HEADER)
+        assert "6 Stop hook calls" in result.stdout
+        assert "loop detector fired at steps: 5" in result.stdout
+
+    def test_json(self, write_transcript):
+        """--json prints one record per step."""
+        result = self.run_cli(write_transcript(SESSION), "--json")
+
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [r["step"] for r in records] == [1, 2, 3, 4, 5, 6]
+
+    def test_missing_transcript(self, tmp_path: Path):
+        """An unreadable transcript is an error."""
+        result = self.run_cli(str(tmp_path / "missing.jsonl"))
+
+        assert result.returncode == 1
+        assert "Cannot replay" in result.stderr
@@ -0,0 +1,222 @@
+"""
+Startup budget tests for the manifest-dev hooks.
+
+Hooks run as a fresh interpreter on every call, so import cost is paid each
+time. These tests guard the cheap paths with `python -X importtime`: which
+modules get imported beyond a bare interpreter, and how long that takes.
+Budgets are generous and catch an eager heavy import, not small drifts;
+still, timings depend on the machine, so those checks are marked timing and
+run only with MANIFEST_DEV_TIMING_TESTS=1. Which modules load is checked
+always.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+
+# Skill call the PreToolUse hook sees for every non-verify skill
+NOOP_SKILL_INPUT = {
+    "tool_name": "Skill",
+    "tool_input": {"skill": "manifest-dev:do", "args": "/tmp/manifest.md"},
+}
+
+# Modules the no-op path must not import
+HEAVY_MODULES = ("hook_utils", "json", "re", "typing", "socket", "dataclasses")
+
+# Import time (ms) allowed on top of a bare interpreter
+NOOP_IMPORT_BUDGET_MS = 20.0
+PROMPT_IMPORT_BUDGET_MS = 40.0
+STOP_IMPORT_BUDGET_MS = 150.0
+
+# Wall time (ms) allowed on top of a bare interpreter, best of RUNS
+NOOP_WALL_BUDGET_MS = 50.0
+STOP_WALL_BUDGET_MS = 250.0
+RUNS = 3
+
+
+def import_times(args: list[str], stdin: str = "") -> dict[str, int]:
+    """Run python -X importtime and return {module: self time in us}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        cwd=HOOKS_DIR,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = int(self_us)
+    return times
+
+
+def extra_imports(args: list[str], stdin: str = "") -> dict[str, int]:
+    """Modules imported by a hook run that a bare interpreter doesn't import."""
+    baseline = import_times(["-c", "pass"])
+    return {
+        name: us
+        for name, us in import_times(args, stdin).items()
+        if name not in baseline
+    }
+
+
+def best_wall_ms(args: list[str], stdin: str = "") -> float:
+    """Best-of-RUNS wall time of a Python invocation, in milliseconds."""
+    best = float("inf")
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            input=stdin,
+            capture_output=True,
+            text=True,
+            cwd=HOOKS_DIR,
+        )
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def client_args(hook_name: str) -> list[str]:
+    return [str(HOOKS_DIR / "hook_client.py"), hook_name]
+
+
+@pytest.fixture
+def stop_input(tmp_path: Path) -> dict[str, Any]:
+    """Stop hook input for a small transcript with an unfinished /do."""
+    transcript = tmp_path / "transcript.jsonl"
+    lines = [
+        {
+            "type": "user",
+            "message": {
+                "content": "<command-name>/do</command-name>"
+                "<command-args>/tmp/manifest.md</command-args>"
+            },
+        },
+        *(
+            {"type": "assistant", "message": {"content": [{"type": "text", "text": t}]}}
+            for t in ("Working on it.", "Done with the first criterion.")
+        ),
+    ]
+    transcript.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return {"transcript_path": str(transcript)}
+
+
+@pytest.fixture(autouse=True)
+def no_daemon(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Measure the in-process path, never a running daemon."""
+    monkeypatch.setenv("MANIFEST_DEV_HOOK_SOCKET", str(tmp_path / "absent.sock"))
+    monkeypatch.delenv("MANIFEST_DEV_HOOK_DAEMON", raising=False)
+
+
+class TestNoopStartup:
+    """A non-verify Skill call must exit before loading any hook machinery."""
+
+    def test_skips_heavy_imports(self):
+        """Only the hook module itself is imported beyond the interpreter."""
+        extra = extra_imports(
+            client_args("pretool_verify_hook"), json.dumps(NOOP_SKILL_INPUT)
+        )
+
+        assert "pretool_verify_hook" in extra
+        assert not set(HEAVY_MODULES) & extra.keys()
+
+    @pytest.mark.timing
+    def test_import_budget(self):
+        """Imports on the no-op path stay within budget."""
+        extra = extra_imports(
+            client_args("pretool_verify_hook"), json.dumps(NOOP_SKILL_INPUT)
+        )
+
+        assert sum(extra.values()) / 1000 < NOOP_IMPORT_BUDGET_MS, extra
+
+    @pytest.mark.timing
+    def test_wall_budget(self):
+        """The no-op call costs little more than starting Python."""
+        baseline = best_wall_ms(["-c", "pass"])
+        noop = best_wall_ms(
+            client_args("pretool_verify_hook"), json.dumps(NOOP_SKILL_INPUT)
+        )
+
+        assert noop - baseline < NOOP_WALL_BUDGET_MS
+
+    def test_verify_call_still_handled(self):
+        """The fast path doesn't swallow real /verify calls."""
+        hook_input = {
+            "tool_name": "Skill",
+            "tool_input": {"skill": "manifest-dev:verify", "args": "/tmp/m.md"},
+        }
+        result = subprocess.run(
+            [sys.executable, *client_args("pretool_verify_hook")],
+            input=json.dumps(hook_input),
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert "additionalContext" in result.stdout
+
+
+class TestPromptStartup:
+    """Ordinary prompts pass through the workflow event hook cheaply."""
+
+    def test_skips_hook_utils(self, tmp_path: Path):
+        """A prompt that isn't a workflow command never loads hook_utils."""
+        hook_input = {
+            "transcript_path": str(tmp_path / "transcript.jsonl"),
+            "prompt": "fix the failing test",
+        }
+
+        extra = extra_imports(
+            client_args("workflow_event_hook"), json.dumps(hook_input)
+        )
+
+        assert "workflow_event_hook" in extra
+        assert "hook_utils" not in extra
+
+    @pytest.mark.timing
+    def test_import_budget(self, tmp_path: Path):
+        """Imports for an ordinary prompt stay within budget."""
+        hook_input = {
+            "transcript_path": str(tmp_path / "transcript.jsonl"),
+            "prompt": "fix the failing test",
+        }
+
+        extra = extra_imports(
+            client_args("workflow_event_hook"), json.dumps(hook_input)
+        )
+
+        assert sum(extra.values()) / 1000 < PROMPT_IMPORT_BUDGET_MS, extra
+
+
+class TestStopStartup:
+    """The Stop hook on a small transcript stays within budget."""
+
+    @pytest.mark.timing
+    def test_import_budget(self, stop_input: dict[str, Any]):
+        """Imports for a full Stop evaluation stay within budget."""
+        extra = extra_imports(client_args("stop_do_hook"), json.dumps(stop_input))
+
+        assert "hook_utils" in extra
+        assert sum(extra.values()) / 1000 < STOP_IMPORT_BUDGET_MS, extra
+
+    @pytest.mark.timing
+    def test_wall_budget(self, stop_input: dict[str, Any]):
+        """A full Stop evaluation costs little more than starting Python."""
+        baseline = best_wall_ms(["-c", "pass"])
+        stop = best_wall_ms(client_args("stop_do_hook"), json.dumps(stop_input))
+
+        assert stop - baseline < STOP_WALL_BUDGET_MS
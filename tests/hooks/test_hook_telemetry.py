@@ -0,0 +1,304 @@
+"""
+Tests for manifest-dev hook latency telemetry.
+
+Tests the opt-in per-invocation records, log rotation, the percentile
+report CLI, and profiling hook entry points.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_daemon  # noqa: E402
+
+import hook_telemetry  # noqa: E402
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import do_command, filler  # noqa: E402
+
+
+def run_hook(
+    hook_name: str, hook_input: dict[str, Any], telemetry: bool = True
+) -> subprocess.CompletedProcess:
+    """Run a hook script as Claude Code would, optionally with telemetry."""
+    env = {**os.environ, hook_telemetry.TELEMETRY_ENV: "1" if telemetry else "0"}
+    return subprocess.run(
+        [sys.executable, str(HOOKS_DIR / f"{hook_name}.py")],
+        input=json.dumps(hook_input),
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+
+def read_log() -> list[dict[str, Any]]:
+    """Records in the current telemetry log."""
+    return hook_telemetry.read_records(hook_telemetry.get_telemetry_path())
+
+
+@pytest.fixture
+def transcript(tmp_path: Path) -> str:
+    """Transcript with an old /do, lots of work, then an active /do."""
+    path = tmp_path / "transcript.jsonl"
+    lines = [do_command("/tmp/old.md"), *filler(50), do_command("/tmp/m.md")]
+    lines += filler(3)
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return str(path)
+
+
+class TestHookTelemetry:
+    """Tests for recording one hook invocation."""
+
+    def test_disabled_records_nothing(self, monkeypatch, isolated_state_dir: Path):
+        """Without the env var, finish() writes no log."""
+        monkeypatch.delenv(hook_telemetry.TELEMETRY_ENV, raising=False)
+        telemetry = hook_telemetry.start_telemetry("stop_do_hook")
+
+        with telemetry.phase("stdin"):
+            pass
+        telemetry.finish({}, None)
+
+        assert not telemetry.enabled
+        assert not (isolated_state_dir / "telemetry").exists()
+
+    def test_nested_phases_are_exclusive(self):
+        """An enclosing phase doesn't count the time of phases inside it."""
+        telemetry = hook_telemetry.HookTelemetry("hook", enabled=True)
+
+        with telemetry.phase("decision"), telemetry.phase("transcript"):
+            time.sleep(0.02)
+
+        assert telemetry.phases["transcript"] >= 0.02
+        assert telemetry.phases["decision"] < 0.01
+
+    @pytest.mark.parametrize(
+        "output,expected",
+        [
+            (None, "none"),
+            ({"decision": "block"}, "block"),
+            ({"hookSpecificOutput": {}}, "context"),
+        ],
+    )
+    def test_outcome(self, output, expected):
+        """Outputs are summarized by decision or kind."""
+        assert hook_telemetry.outcome_of(output) == expected
+
+    def test_scan_counts_decoded_and_skipped(self, transcript: str, monkeypatch):
+        """A cold anchored scan skips the lines before the last /do."""
+        monkeypatch.setenv(hook_telemetry.TELEMETRY_ENV, "1")
+        telemetry = hook_telemetry.start_telemetry("stop_do_hook")
+
+        hook_utils.scan_transcript(transcript)
+        record = telemetry.record({"transcript_path": transcript}, None)
+
+        assert record["lines_decoded"] == 4
+        assert record["lines_skipped"] == 51
+        assert record["transcript_bytes"] == Path(transcript).stat().st_size
+
+
+class TestStateDir:
+    """Tests for locating hook state."""
+
+    def test_xdg_cache_home(self, monkeypatch, tmp_path: Path):
+        """Without an override, state lives under $XDG_CACHE_HOME for every hook."""
+        monkeypatch.delenv(hook_telemetry.STATE_DIR_ENV)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+        expected = tmp_path / "cache" / "manifest-dev"
+        assert hook_utils.get_state_dir() == expected
+        assert Path(hook_telemetry.get_telemetry_dir()).parent == expected
+
+    def test_override(self, isolated_state_dir: Path):
+        """$MANIFEST_DEV_STATE_DIR wins."""
+        assert hook_telemetry.state_dir() == str(isolated_state_dir)
+        assert hook_utils.get_state_dir() == isolated_state_dir
+
+
+class TestHookRecords:
+    """Tests for the records hooks append."""
+
+    def test_stop_hook_record(self, transcript: str):
+        """The Stop hook records timings, sizes and its decision."""
+        result = run_hook("stop_do_hook", {"transcript_path": transcript})
+
+        assert json.loads(result.stdout)["decision"] == "block"
+        (record,) = read_log()
+        assert record["hook"] == "stop_do_hook"
+        assert record["outcome"] == "block"
+        assert record["strategy"] == hook_utils.STRATEGY_SCAN
+        assert set(record["phases_ms"]) == {"stdin", "transcript", "decision"}
+        assert sum(record["phases_ms"].values()) <= record["wall_ms"]
+        assert record["transcript_bytes"] == Path(transcript).stat().st_size
+        assert record["lines_decoded"] > 0
+
+    def test_noop_verify_hook_record(self):
+        """Calls that exit early are recorded too."""
+        run_hook("pretool_verify_hook", {"tool_name": "Skill", "tool_input": {}})
+
+        (record,) = read_log()
+        assert record["hook"] == "pretool_verify_hook"
+        assert record["outcome"] == "none"
+        assert record["transcript_bytes"] is None
+
+    def test_off_by_default(self, transcript: str):
+        """Hooks write no telemetry unless asked to."""
+        run_hook("stop_do_hook", {"transcript_path": transcript}, telemetry=False)
+
+        assert read_log() == []
+
+    def test_daemon_records(self, transcript: str, monkeypatch):
+        """Hooks evaluated by the daemon are recorded as such."""
+        monkeypatch.setenv(hook_telemetry.TELEMETRY_ENV, "1")
+        payload = json.dumps({"transcript_path": transcript}).encode()
+
+        hook_daemon.evaluate_hook("post_compact_hook", payload)
+
+        (record,) = read_log()
+        assert record["daemon"] is True
+        assert record["outcome"] == "context"
+
+
+class TestRotation:
+    """Tests for bounding the telemetry log's size."""
+
+    def test_rotates_and_keeps_backups(self, monkeypatch):
+        """Full logs move to .1, .2, ... and the oldest is dropped."""
+        monkeypatch.setattr(hook_telemetry, "TELEMETRY_MAX_BYTES", 200)
+        line = json.dumps({"hook": "h", "wall_ms": 1.0}).encode() + b"\n"
+
+        for _ in range(100):
+            hook_telemetry.append_record(line)
+
+        path = Path(hook_telemetry.get_telemetry_path())
+        backups = sorted(p.name for p in path.parent.iterdir())
+        assert backups == [
+            "hooks.jsonl",
+            *[
+                f"hooks.jsonl.{i}"
+                for i in range(1, hook_telemetry.TELEMETRY_BACKUPS + 1)
+            ],
+        ]
+        assert all(p.stat().st_size <= 200 for p in path.parent.iterdir())
+        assert 0 < len(read_log()) < 100
+
+
+class TestReport:
+    """Tests for the percentile report."""
+
+    def test_percentiles(self):
+        """Nearest-rank percentiles over sorted values."""
+        values = [float(v) for v in range(1, 101)]
+
+        assert hook_telemetry.percentile(values, 50) == 50.0
+        assert hook_telemetry.percentile(values, 99) == 99.0
+        assert hook_telemetry.percentile([], 50) == 0.0
+
+    def test_summary_per_hook(self):
+        """Records are grouped by hook with wall and phase percentiles."""
+        records = [
+            {"hook": "a", "wall_ms": ms, "phases_ms": {"stdin": 0.1}, "outcome": "none"}
+            for ms in (1.0, 2.0, 30.0)
+        ] + [{"hook": "b", "wall_ms": 5.0, "phases_ms": {}, "outcome": "block"}]
+
+        summary = hook_telemetry.summarize(records)
+
+        assert summary["a"]["count"] == 3
+        assert summary["a"]["wall_ms"] == {"p50": 2.0, "p95": 30.0, "p99": 30.0}
+        assert summary["a"]["phases_ms"]["stdin"]["p50"] == 0.1
+        assert summary["b"]["outcomes"] == {"block": 1}
+
+    def test_cli(self, transcript: str):
+        """The CLI prints a section with percentiles per hook."""
+        run_hook("stop_do_hook", {"transcript_path": transcript})
+        run_hook("pretool_verify_hook", {"tool_name": "Skill", "tool_input": {}})
+
+        result = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_telemetry.py")],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert "stop_do_hook: 1 calls" in result.stdout
+        assert "pretool_verify_hook: 1 calls" in result.stdout
+        assert "p95" in result.stdout
+
+    def test_cli_without_log(self):
+        """An empty log is reported, not an error."""
+        result = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_telemetry.py")],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.stdout.strip() == "No telemetry records."
+
+
+class TestProfiling:
+    """Tests for profiling hook entry points."""
+
+    def run_profiled(self, transcript: str, mode: str) -> subprocess.CompletedProcess:
+        """Run the Stop hook through the client with profiling on."""
+        env = {**os.environ, hook_telemetry.PROFILE_ENV: mode}
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_client.py"), "stop_do_hook"],
+            input=json.dumps({"transcript_path": transcript}),
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+
+    def test_writes_profile_and_allocations(
+        self, transcript: str, isolated_state_dir: Path
+    ):
+        """Both reports land next to the telemetry log; output is unchanged."""
+        result = self.run_profiled(transcript, "1")
+
+        assert json.loads(result.stdout)["decision"] == "block"
+        telemetry_dir = isolated_state_dir / "telemetry"
+        (pstats_file,) = telemetry_dir.glob("stop_do_hook-*.pstats")
+        (alloc_file,) = telemetry_dir.glob("stop_do_hook-*.alloc.txt")
+        stats = pstats.Stats(str(pstats_file))
+        functions = {name for _, _, name in stats.stats}
+        assert {"evaluate_with_strategy", "scan_transcript"} <= functions
+        assert alloc_file.read_text().startswith("Peak traced memory:")
+        assert str(pstats_file) in result.stderr
+
+    def test_cpu_only(self, transcript: str, isolated_state_dir: Path):
+        """The cpu mode skips tracemalloc."""
+        self.run_profiled(transcript, "cpu")
+
+        names = [p.suffix for p in (isolated_state_dir / "telemetry").iterdir()]
+        assert names == [".pstats"]
+
+    def test_off_by_default(self, monkeypatch):
+        """Without the env var, main() just runs."""
+        monkeypatch.delenv(hook_telemetry.PROFILE_ENV, raising=False)
+        calls: list[str] = []
+
+        hook_telemetry.run_main("stop_do_hook", lambda: calls.append("main"))
+
+        assert calls == ["main"]
+
+    def test_written_on_exit(self, monkeypatch, isolated_state_dir: Path):
+        """A main() that calls sys.exit still leaves its profile."""
+        monkeypatch.setenv(hook_telemetry.PROFILE_ENV, "memory")
+
+        with pytest.raises(SystemExit):
+            hook_telemetry.run_main("hook", lambda: sys.exit(0))
+
+        assert len(list((isolated_state_dir / "telemetry").glob("*.alloc.txt"))) == 1
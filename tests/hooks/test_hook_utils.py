@@ -0,0 +1,1071 @@
+"""
+Tests for manifest-dev hook_utils.
+
+Tests transcript scanning helpers shared by the hooks.
+"""
+
+from __future__ import annotations
+
+import builtins
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Add manifest-dev hooks directory to path
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import (  # noqa: E402
+    assistant,
+    prompt,
+    skill_call,
+    tool_result,
+)
+
+# DEL noqa: E402
+
+
+def user_command(skill: str, args: str) -> dict[str, Any]:
+    """User slash command line."""
+    return {
+        "type": "user",
+        "message": {
+            "content": f"<command-name>/{skill}</command-name><command-args>{args}</command-args>"
+        },
+    }
+
+
+class TestScanTranscript:
+    """Tests for the single-pass transcript scanner."""
+
+    def test_collects_all_signals(self, write_transcript):
+        """One scan reports /do flow, API error flag and short-output streak."""
+        path = write_transcript(
+            [
+                user_command("do", "/tmp/m.md"),
+                skill_call("manifest-dev:verify", "/tmp/m.md"),
+                assistant(),
+                assistant("Done."),
+            ]
+        )
+
+        scan = hook_utils.scan_transcript(path)
+
+        assert scan.api_error is False
+        # Skill-only calls count as short outputs too
+        assert scan.consecutive_short == 3
+        assert scan.do_flow.has_do
+        assert scan.do_flow.has_verify
+        assert not scan.do_flow.has_done
+        assert scan.do_flow.do_args == "/tmp/m.md"
+
+    def test_views_match_scan(self, write_transcript):
+        """Legacy helpers return the same answers as the combined scan."""
+        path = write_transcript(
+            [
+                user_command("do", "/tmp/m.md"),
+                assistant(),
+                {
+                    "type": "assistant",
+                    "isApiErrorMessage": True,
+                    "message": {"content": [{"type": "text", "text": "API Error"}]},
+                },
+            ]
+        )
+
+        scan = hook_utils.scan_transcript(path)
+
+        assert hook_utils.has_recent_api_error(path) is scan.api_error is True
+        assert (
+            hook_utils.count_consecutive_short_outputs(path) == scan.consecutive_short
+        )
+        assert hook_utils.parse_do_flow(path) == scan.do_flow
+
+    def test_opens_transcript_once(self, write_transcript, monkeypatch):
+        """The scan reads the transcript a single time."""
+        path = write_transcript([user_command("do", "/tmp/m.md"), assistant()])
+        opened: list[str] = []
+        real_open = builtins.open
+
+        def counting_open(file: Any, *args: Any, **kwargs: Any) -> Any:
+            if str(file) == path:
+                opened.append(path)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "open", counting_open)
+
+        hook_utils.scan_transcript(path)
+
+        assert len(opened) == 1
+
+    def test_missing_transcript(self):
+        """Missing transcripts produce an empty scan."""
+        scan = hook_utils.scan_transcript("/nonexistent/path.jsonl")
+
+        assert scan.api_error is False
+        assert scan.consecutive_short == 0
+        assert not scan.do_flow.has_do
+
+
+class TestIterLinesReversed:
+    """Tests for the reverse block-based line reader."""
+
+    @pytest.mark.parametrize("block_size", [1, 3, 7, 64, 65536])
+    def test_matches_forward_lines(self, tmp_path: Path, block_size: int):
+        """Reverse reading yields the forward lines in reverse for any block size."""
+        transcript_file = tmp_path / "transcript.jsonl"
+        content = b'{"a": 1}\n\n' + b"x" * 100 + b'\n{"b": 2}\n'
+        transcript_file.write_bytes(content)
+
+        lines = list(hook_utils.iter_lines_reversed(str(transcript_file), block_size))
+
+        assert lines == list(reversed(content.split(b"\n")))
+
+    def test_stops_reading_early(self, tmp_path: Path):
+        """Consumers that stop early never read the head of the file."""
+        transcript_file = tmp_path / "transcript.jsonl"
+        transcript_file.write_bytes(b"head\n" * 10_000 + b"tail\n")
+
+        lines = hook_utils.iter_lines_reversed(str(transcript_file), block_size=16)
+        assert next(lines) == b""
+        assert next(lines) == b"tail"
+
+    def test_missing_file_raises(self):
+        """Missing files surface as OSError for callers to handle."""
+        with pytest.raises(OSError):
+            next(hook_utils.iter_lines_reversed("/nonexistent/path.jsonl"))
+
+
+class TestTailQueries:
+    """Tests for end-of-transcript questions answered from the tail."""
+
+    def test_short_streak_stops_at_substantial(self, write_transcript):
+        """Only short outputs after the last substantial one are counted."""
+        path = write_transcript(
+            [
+                assistant(),
+                assistant("x" * 150),
+                assistant(),
+                {"type": "user", "message": {"content": "keep going"}},
+                assistant(),
+            ]
+        )
+
+        assert hook_utils.count_consecutive_short_outputs(path) == 2
+
+    def test_api_error_uses_last_assistant(self, write_transcript):
+        """Later non-assistant lines don't hide the last assistant's error flag."""
+        path = write_transcript(
+            [
+                assistant("x" * 150),
+                {
+                    "type": "assistant",
+                    "isApiErrorMessage": True,
+                    "message": {"content": [{"type": "text", "text": "API Error"}]},
+                },
+                {"type": "user", "message": {"content": "retry"}},
+            ]
+        )
+
+        assert hook_utils.has_recent_api_error(path) is True
+
+    def test_ignores_malformed_and_partial_lines(self, tmp_path: Path):
+        """Malformed lines, including a partially written last line, are skipped."""
+        transcript_file = tmp_path / "transcript.jsonl"
+        transcript_file.write_text(
+            json.dumps(assistant()) + "\nnot json\n" + '{"type": "assistant", "mess',
+            encoding="utf-8",
+        )
+
+        assert hook_utils.count_consecutive_short_outputs(str(transcript_file)) == 1
+        assert hook_utils.has_recent_api_error(str(transcript_file)) is False
+
+    def test_missing_transcript(self):
+        """Missing transcripts answer as empty."""
+        assert hook_utils.count_consecutive_short_outputs("/nonexistent") == 0
+        assert hook_utils.has_recent_api_error("/nonexistent") is False
+
+
+class TestScanCheckpoint:
+    """Tests for the incremental transcript checkpoint."""
+
+    def append(self, path: str, lines: list[dict[str, Any]]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+
+    def test_checkpoint_written_at_end(self, write_transcript):
+        """A scan stores a checkpoint at the end of the transcript."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+
+        hook_utils.scan_transcript(path)
+        checkpoint = hook_utils.load_checkpoint(path)
+
+        assert checkpoint is not None
+        assert checkpoint.offset == Path(path).stat().st_size
+        assert checkpoint.scan.do_flow.do_args == "/tmp/m.md"
+
+    def test_incremental_matches_full_scan(self, write_transcript):
+        """Resuming from a checkpoint gives the same answer as a full rescan."""
+        path = write_transcript([user_command("do", "/tmp/m.md"), assistant()])
+        hook_utils.scan_transcript(path)
+
+        self.append(path, [assistant(), skill_call("manifest-dev:verify"), assistant()])
+
+        incremental = hook_utils.scan_transcript(path)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False)
+        assert incremental == full
+        assert incremental.consecutive_short == 4
+        assert incremental.do_flow.has_verify
+
+    def test_only_appended_lines_decoded(self, write_transcript, monkeypatch):
+        """Lines before the checkpoint offset are not decoded again."""
+        path = write_transcript(
+            [user_command("do", "/tmp/m.md"), assistant(), assistant()]
+        )
+        hook_utils.scan_transcript(path)
+        self.append(path, [assistant()])
+
+        decoded: list[bytes] = []
+        real_decode = hook_utils.decode_line
+
+        def counting_decode(raw: bytes) -> dict[str, Any] | None:
+            decoded.append(raw)
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", counting_decode)
+
+        scan = hook_utils.scan_transcript(path)
+
+        assert len(decoded) == 1
+        assert scan.consecutive_short == 3
+
+    def test_partial_last_line_not_checkpointed(self, write_transcript):
+        """A trailing line without newline is re-read once it's completed."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(assistant()))
+
+        assert hook_utils.scan_transcript(path).consecutive_short == 1
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n")
+
+        assert hook_utils.scan_transcript(path).consecutive_short == 1
+
+    def test_truncation_triggers_rescan(self, write_transcript):
+        """A transcript shorter than the checkpoint offset is rescanned."""
+        path = write_transcript(
+            [user_command("do", "/tmp/m.md"), assistant(), assistant()]
+        )
+        hook_utils.scan_transcript(path)
+
+        write_transcript([assistant()])
+
+        scan = hook_utils.scan_transcript(path)
+        assert not scan.do_flow.has_do
+        assert scan.consecutive_short == 1
+
+    def test_rewrite_triggers_rescan(self, write_transcript):
+        """Rewritten content before the checkpoint offset is detected."""
+        path = write_transcript([user_command("do", "/tmp/first.md")])
+        hook_utils.scan_transcript(path)
+
+        # Same inode, longer file, different prefix
+        write_transcript([user_command("do", "/tmp/other.md"), assistant()])
+
+        scan = hook_utils.scan_transcript(path)
+        assert scan.do_flow.do_args == "/tmp/other.md"
+        assert scan.consecutive_short == 1
+
+    def test_inode_change_triggers_rescan(self, write_transcript, tmp_path: Path):
+        """A replaced file (new inode) is rescanned even if it's longer."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+        hook_utils.scan_transcript(path)
+        checkpoint = hook_utils.load_checkpoint(path)
+        assert checkpoint is not None
+
+        replacement = write_transcript(
+            [user_command("do", "/tmp/m.md"), skill_call("done")], name="new.jsonl"
+        )
+        Path(path).unlink()
+        Path(replacement).rename(path)
+        # Forge an offset that would otherwise resume past the /done line
+        checkpoint.offset = Path(path).stat().st_size
+        hook_utils.save_checkpoint(path, checkpoint)
+
+        assert hook_utils.parse_do_flow(path).has_done
+
+    def test_corrupt_checkpoint_ignored(self, write_transcript, isolated_state_dir):
+        """An unreadable checkpoint falls back to a full scan."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+        hook_utils.scan_transcript(path)
+        for checkpoint_file in (isolated_state_dir / "checkpoints").iterdir():
+            checkpoint_file.write_text("{not json", encoding="utf-8")
+
+        assert hook_utils.parse_do_flow(path).do_args == "/tmp/m.md"
+
+
+class TestSessionStateSweep:
+    """Tests for deleting per-session state of abandoned sessions."""
+
+    def age(self, path: Path, seconds: float) -> None:
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def stale_files(self, state_dir: Path) -> list[Path]:
+        """One file per per-session directory, each past its maximum age."""
+        files = []
+        for name, max_age in hook_utils.SESSION_STATE_MAX_AGE.items():
+            (state_dir / name).mkdir(parents=True, exist_ok=True)
+            stale = state_dir / name / "stale.json"
+            stale.write_text("{}")
+            self.age(stale, max_age + 60)
+            files.append(stale)
+        return files
+
+    def test_write_sweeps_stale_state(self, write_transcript, isolated_state_dir):
+        """A write deletes abandoned sessions' files and keeps live ones."""
+        stale = self.stale_files(isolated_state_dir)
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+
+        hook_utils.scan_transcript(path)
+
+        assert not any(file.exists() for file in stale)
+        assert hook_utils.load_checkpoint(path) is not None
+
+    def test_recent_state_kept(self, write_transcript, isolated_state_dir):
+        """Files younger than their maximum age survive a sweep."""
+        recent = isolated_state_dir / "workflow" / "recent.jsonl"
+        recent.parent.mkdir(parents=True)
+        recent.write_text("")
+        self.age(recent, hook_utils.SESSION_STATE_MAX_AGE["compact"] + 60)
+
+        hook_utils.scan_transcript(write_transcript([assistant()]))
+
+        assert recent.exists()
+
+    def test_sweeps_at_most_once_per_interval(
+        self, write_transcript, isolated_state_dir
+    ):
+        """Writes between sweeps leave stale files for the next sweep."""
+        path = write_transcript([assistant()])
+        hook_utils.scan_transcript(path)
+        stale = self.stale_files(isolated_state_dir)
+
+        hook_utils.record_workflow_event(path, "do", "/tmp/m.md")
+        assert all(file.exists() for file in stale)
+
+        self.age(isolated_state_dir / ".swept", hook_utils.SESSION_STATE_SWEEP_INTERVAL)
+        hook_utils.record_workflow_event(path, "verify")
+        assert not any(file.exists() for file in stale)
+
+
+# Line shapes seen in real transcripts, relevant and irrelevant to a scan
+LINE_POOL: list[dict[str, Any]] = [
+    user_command("do", "/tmp/a.md"),
+    user_command("manifest-dev:do", "/tmp/b.md /tmp/do-log.md"),
+    user_command("other-plugin:do", "/tmp/c.md"),
+    user_command("verify", "/tmp/a.md"),
+    {"type": "user", "message": {"content": "<command-name>/do</command-name>"}},
+    {
+        "type": "user",
+        "isMeta": True,
+        "message": {
+            "content": [
+                {
+                    "type": "text",
+                    "text": "Base directory for this skill: /p/skills/do\n# /do",
+                }
+            ]
+        },
+    },
+    {
+        "type": "user",
+        "isMeta": True,
+        "message": {"content": "Base directory for this skill: /p/skills/escalate"},
+    },
+    skill_call("manifest-dev:do", "/tmp/d.md"),
+    skill_call("do"),
+    skill_call("manifest-dev:verify", "/tmp/a.md"),
+    skill_call("done"),
+    skill_call("manifest-dev:escalate", "blocked"),
+    skill_call("some-other-skill"),
+    assistant(),
+    assistant("x" * 150),
+    {
+        "type": "assistant",
+        "isApiErrorMessage": True,
+        "message": {"content": [{"type": "text", "text": "API Error: 529"}]},
+    },
+    {
+        "type": "assistant",
+        "message": {
+            "content": [{"type": "tool_use", "name": "Read", "input": {"path": "/x"}}]
+        },
+    },
+    {
+        "type": "user",
+        "message": {
+            "content": [
+                {"type": "tool_result", "tool_use_id": "t1", "content": "y" * 500}
+            ]
+        },
+    },
+    {"type": "user", "message": {"content": "please continue"}},
+    {"type": "system", "content": "Conversation compacted"},
+]
+
+
+class TestPrefilter:
+    """Tests for the raw-byte prefilter in front of json decoding."""
+
+    def test_skips_irrelevant_lines(self, write_transcript, monkeypatch):
+        """Tool results and plain user prompts are never decoded."""
+        path = write_transcript([LINE_POOL[-3], LINE_POOL[-2], LINE_POOL[-3]])
+        decoded: list[bytes] = []
+        real_decode = hook_utils.decode_line
+
+        def counting_decode(raw: bytes) -> dict[str, Any] | None:
+            decoded.append(raw)
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", counting_decode)
+
+        hook_utils.scan_transcript(path, use_checkpoint=False)
+
+        assert decoded == []
+
+    @pytest.mark.parametrize("line", LINE_POOL)
+    def test_relevant_lines_pass(self, line: dict[str, Any]):
+        """Every line that changes a scan passes the prefilter."""
+        scanner = hook_utils._TranscriptScanner()
+        scanner.feed(line)
+        if scanner.result() != hook_utils._TranscriptScanner().result():
+            assert hook_utils.may_affect_scan(json.dumps(line).encode())
+
+    @pytest.mark.parametrize("seed", range(25))
+    def test_equivalent_to_full_decode(self, tmp_path: Path, seed: int):
+        """Prefiltered and full-decode scans agree on mixed transcripts."""
+        rng = random.Random(seed)
+        lines = [rng.choice(LINE_POOL) for _ in range(rng.randint(1, 60))]
+        # Claude Code writes compact JSON; json.dumps defaults add spaces
+        separators = (",", ":") if seed % 2 else None
+        transcript_file = tmp_path / "transcript.jsonl"
+        transcript_file.write_text(
+            "".join(json.dumps(line, separators=separators) + "\n" for line in lines),
+            encoding="utf-8",
+        )
+        path = str(transcript_file)
+
+        filtered = hook_utils.scan_transcript(path, use_checkpoint=False)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False, prefilter=False)
+
+        assert filtered == full
+
+
+class TestClassifySkillInvocations:
+    """Tests for matching all workflow skills in one pass."""
+
+    @pytest.mark.parametrize("line", LINE_POOL)
+    def test_matches_was_skill_invoked(self, line: dict[str, Any]):
+        """Classification agrees with per-skill was_skill_invoked checks."""
+        expected = {
+            skill
+            for skill in hook_utils.WORKFLOW_SKILLS
+            if hook_utils.was_skill_invoked(line, skill)
+        }
+
+        assert hook_utils.classify_skill_invocations(line) == expected
+
+    def test_multiple_skills_in_one_line(self):
+        """A line invoking several workflow skills reports all of them."""
+        line = {
+            "type": "assistant",
+            "message": {
+                "content": [
+                    {"type": "tool_use", "name": "Skill", "input": {"skill": "verify"}},
+                    {
+                        "type": "tool_use",
+                        "name": "Skill",
+                        "input": {"skill": "manifest-dev:done"},
+                    },
+                ]
+            },
+        }
+
+        assert hook_utils.classify_skill_invocations(line) == {"verify", "done"}
+
+    def test_ismeta_path_requires_boundary(self):
+        """skills/done is not mistaken for skills/do."""
+        line = {
+            "type": "user",
+            "isMeta": True,
+            "message": {"content": "Base directory for this skill: /p/skills/done"},
+        }
+
+        assert hook_utils.classify_skill_invocations(line) == {"done"}
+
+    def test_non_workflow_skill_ignored(self):
+        """Skills outside the workflow set are not reported."""
+        assert hook_utils.classify_skill_invocations(skill_call("define")) == set()
+
+
+@pytest.fixture
+def json_backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch):
+    """Force a JSON backend for decode_line, skipping when not installed."""
+    name: str = request.param
+    if name != "json":
+        pytest.importorskip(name)
+    monkeypatch.setenv(hook_utils.JSON_BACKEND_ENV, name)
+    hook_utils._select_json_backend.cache_clear()
+    yield name
+    hook_utils._select_json_backend.cache_clear()
+
+
+class TestJsonBackends:
+    """Tests for the pluggable transcript JSON decoder."""
+
+    @pytest.mark.parametrize("json_backend", hook_utils.JSON_BACKENDS, indirect=True)
+    def test_backend_selected(self, json_backend: str):
+        """A forced, installed backend is the one used."""
+        assert hook_utils.json_backend() == json_backend
+
+    @pytest.mark.parametrize("json_backend", hook_utils.JSON_BACKENDS, indirect=True)
+    @pytest.mark.parametrize("seed", range(5))
+    def test_scans_match_stdlib(self, json_backend: str, write_transcript, seed: int):
+        """Every backend produces the same scan as stdlib json."""
+        rng = random.Random(seed)
+        path = write_transcript([rng.choice(LINE_POOL) for _ in range(40)])
+
+        scan = hook_utils.scan_transcript(path, use_checkpoint=False, prefilter=False)
+
+        expected = hook_utils._TranscriptScanner()
+        with open(path, "rb") as f:
+            for line in f:
+                expected.feed(json.loads(line))
+        assert scan == expected.result()
+
+    @pytest.mark.parametrize("json_backend", hook_utils.JSON_BACKENDS, indirect=True)
+    def test_rejects_malformed_lines(self, json_backend: str):
+        """Malformed, blank and non-object lines decode to None."""
+        for raw in (b"not json\n", b"\n", b"   ", b"[1, 2]\n", b'{"a": 1', b"\xff\n"):
+            assert hook_utils.decode_line(raw) is None
+
+    @pytest.mark.parametrize("json_backend", ["msgspec"], indirect=True)
+    def test_msgspec_falls_back_on_unexpected_types(self, json_backend: str):
+        """Lines that don't fit the typed schema are still decoded."""
+        data = hook_utils.decode_line(b'{"type": "user", "isMeta": "yes"}\n')
+
+        assert data == {"type": "user", "isMeta": "yes"}
+
+    def test_missing_backend_falls_back_to_stdlib(self, monkeypatch):
+        """An uninstalled backend degrades to stdlib json."""
+
+        def missing() -> Any:
+            raise ImportError("not installed")
+
+        monkeypatch.setitem(hook_utils._JSON_BACKEND_FACTORIES, "orjson", missing)
+        monkeypatch.setenv(hook_utils.JSON_BACKEND_ENV, "orjson")
+        hook_utils._select_json_backend.cache_clear()
+        try:
+            assert hook_utils.json_backend() == "json"
+            assert hook_utils.decode_line(b'{"type": "user"}') == {"type": "user"}
+        finally:
+            hook_utils._select_json_backend.cache_clear()
+
+
+class TestIterMarkerLines:
+    """Tests for byte-level candidate line search over a memory map."""
+
+    @staticmethod
+    def naive_spans(buf: bytes, markers: tuple[bytes, ...], start: int = 0):
+        spans = []
+        position = start
+        for line in buf[start:].splitlines(keepends=True):
+            if any(marker in line for marker in markers):
+                spans.append((position, position + len(line)))
+            position += len(line)
+        return spans
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_naive_line_filter(self, seed: int):
+        """Spans equal a line-by-line substring filter on random content."""
+        rng = random.Random(seed)
+        markers = (b"ab", b"cd", b"Skill")
+        pieces = [b"ab", b"cd", b"Skill", b"x", b"yy", b"\n", b"\n", b"a", b"b"]
+        buf = b"".join(rng.choice(pieces) for _ in range(200))
+
+        spans = list(hook_utils.iter_marker_lines(buf, markers))
+
+        assert spans == self.naive_spans(buf, markers)
+
+    def test_respects_start_offset(self):
+        """Lines before the start offset are not reported."""
+        buf = b"Skill one\nplain\nSkill two"
+
+        spans = list(hook_utils.iter_marker_lines(buf, (b"Skill",), start=10))
+
+        assert [buf[s:e] for s, e in spans] == [b"Skill two"]
+
+    def test_line_with_several_markers_reported_once(self):
+        """A line containing multiple markers yields a single span."""
+        buf = b'{"type": "assistant", "name": "Skill"}\n'
+
+        spans = list(hook_utils.iter_marker_lines(buf, hook_utils.SCAN_MARKERS))
+
+        assert spans == [(0, len(buf))]
+
+    def test_scan_uses_memory_map_slices(self, write_transcript, monkeypatch):
+        """The prefiltered scan only decodes candidate lines."""
+        path = write_transcript([LINE_POOL[-3], user_command("do", "/tmp/m.md")])
+        decoded: list[bytes] = []
+        real_decode = hook_utils.decode_line
+
+        def recording_decode(raw: bytes) -> dict[str, Any] | None:
+            decoded.append(raw)
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", recording_decode)
+
+        scan = hook_utils.scan_transcript(path, use_checkpoint=False)
+
+        assert scan.do_flow.do_args == "/tmp/m.md"
+        assert len(decoded) == 1
+        assert b"command-name" in decoded[0]
+
+
+class TestAnchoredScan:
+    """Tests for starting cold scans at the last /do that resets the flow."""
+
+    def test_reversed_spans_match_forward(self):
+        """Reverse marker search reports the forward spans, last first."""
+        rng = random.Random(7)
+        markers = (b"ab", b"Skill")
+        pieces = [b"ab", b"Skill", b"x", b"yy", b"\n", b"\n", b"a", b"b"]
+        for _ in range(20):
+            buf = b"".join(rng.choice(pieces) for _ in range(200))
+            end = buf.rfind(b"\n") + 1
+
+            reverse = list(hook_utils.iter_marker_lines_reversed(buf, markers, end))
+
+            forward = list(hook_utils.iter_marker_lines(buf[:end], markers))
+            assert reverse == forward[::-1]
+
+    def test_decodes_only_after_last_do(self, write_transcript, monkeypatch):
+        """Lines before the last /do with arguments are never decoded."""
+        earlier = [user_command("do", "/tmp/old.md"), assistant("x" * 150)] * 20
+        path = write_transcript(
+            [*earlier, user_command("do", "/tmp/m.md"), assistant()]
+        )
+        decoded: list[bytes] = []
+        real_decode = hook_utils.decode_line
+
+        def recording_decode(raw: bytes) -> dict[str, Any] | None:
+            decoded.append(raw)
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", recording_decode)
+
+        scan = hook_utils.scan_transcript(path, use_checkpoint=False)
+
+        assert scan.do_flow.do_args == "/tmp/m.md"
+        # The /do itself, the short output after it, and one assistant line
+        # before it (substantial, so the streak lookback stops there)
+        assert len(decoded) == 3
+
+    def test_seeds_assistant_state_from_before_do(self, write_transcript):
+        """API error and short streak carry over from lines before the /do."""
+        path = write_transcript(
+            [
+                assistant("x" * 150),
+                assistant(),
+                {
+                    "type": "assistant",
+                    "isApiErrorMessage": True,
+                    "message": {"content": [{"type": "text", "text": "API Error"}]},
+                },
+                user_command("do", "/tmp/m.md"),
+            ]
+        )
+
+        anchored = hook_utils.scan_transcript(path, use_checkpoint=False)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False, anchor=False)
+
+        assert anchored == full
+        assert anchored.api_error is True
+        assert anchored.consecutive_short == 2
+
+    def test_argless_do_is_not_an_anchor(self, write_transcript):
+        """An isMeta expansion after a /do keeps the earlier arguments."""
+        path = write_transcript(
+            [
+                user_command("do", "/tmp/m.md"),
+                LINE_POOL[5],  # isMeta /do expansion, no arguments
+                skill_call("done"),
+                skill_call("do"),  # no arguments: doesn't reset
+            ]
+        )
+
+        scan = hook_utils.scan_transcript(path, use_checkpoint=False)
+
+        assert scan.do_flow.do_args == "/tmp/m.md"
+        assert scan.do_flow.has_done
+
+    @pytest.mark.parametrize("seed", range(25))
+    def test_equivalent_to_full_scan(self, tmp_path: Path, seed: int):
+        """Anchored scans, and checkpoints they leave, match full scans."""
+        rng = random.Random(seed)
+        separators = (",", ":") if seed % 2 else None
+        transcript_file = tmp_path / "transcript.jsonl"
+
+        def append(count: int) -> None:
+            with open(transcript_file, "a", encoding="utf-8") as f:
+                for _ in range(count):
+                    line = rng.choice(LINE_POOL)
+                    f.write(json.dumps(line, separators=separators) + "\n")
+
+        append(rng.randint(1, 60))
+        path = str(transcript_file)
+        full = hook_utils.scan_transcript(path, use_checkpoint=False, prefilter=False)
+
+        assert hook_utils.scan_transcript(path) == full
+
+        append(rng.randint(1, 20))
+        resumed = hook_utils.scan_transcript(path)
+
+        assert resumed == hook_utils.scan_transcript(
+            path, use_checkpoint=False, prefilter=False
+        )
+
+
+class TestPendingCheckpoints:
+    """Tests for holding back checkpoint writes."""
+
+    def test_discarded_on_exit(self, write_transcript):
+        """Scans inside the block see their checkpoint; nothing is stored."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+
+        with hook_utils.pending_checkpoints() as pending:
+            hook_utils.scan_transcript(path)
+            assert pending.load(path) is not None
+
+        assert hook_utils.load_checkpoint(path) is None
+
+    def test_nested_blocks_collect_and_flush(self, write_transcript):
+        """An enclosing block collects inner writes until flushed."""
+        path = write_transcript([user_command("do", "/tmp/m.md")])
+
+        with (
+            hook_utils.pending_checkpoints() as outer,
+            hook_utils.pending_checkpoints(),
+        ):
+            hook_utils.scan_transcript(path)
+        assert hook_utils.load_checkpoint(path) is None
+
+        outer.flush()
+
+        assert hook_utils.load_checkpoint(path) == outer.base.load(path)
+        assert hook_utils.load_checkpoint(path) is not None
+
+
+class TestIterStopPoints:
+    """Tests for replaying the Stop hook inputs turn by turn."""
+
+    def stop_points(self, path: str) -> list[hook_utils.StopPoint]:
+        with open(path, "rb") as f:
+            return list(hook_utils.iter_stop_points(f))
+
+    def test_turn_ends(self, write_transcript):
+        """Turns end before user prompts and at EOF, not at tool results."""
+        path = write_transcript(
+            [
+                prompt(),
+                assistant(),
+                tool_result(),
+                assistant(),
+                prompt(),
+                user_command("do", "/tmp/m.md"),
+                skill_call("verify"),
+                tool_result(),
+            ]
+        )
+
+        points = self.stop_points(path)
+
+        assert [p.line for p in points] == [4]
+        lines = Path(path).read_text().splitlines(keepends=True)
+        assert points[0].offset == len("".join(lines[:4]))
+        assert points[0].scan.consecutive_short == 2
+
+    def test_invocations_between_points(self, write_transcript):
+        """Each point counts the workflow skills invoked since the last one."""
+        path = write_transcript(
+            [
+                user_command("do", "/tmp/m.md"),
+                skill_call("verify"),
+                skill_call("verify"),
+                prompt(),
+                skill_call("done"),
+            ]
+        )
+
+        points = self.stop_points(path)
+
+        assert [p.invoked for p in points] == [{"do": 1, "verify": 2}, {"done": 1}]
+        assert points[-1].scan.do_flow.has_done
+
+    def test_tool_results_not_decoded(self, write_transcript, monkeypatch):
+        """Tool results are recognized without decoding them."""
+        path = write_transcript([assistant(), tool_result("x" * 1000), assistant()])
+        decoded: list[bytes] = []
+        real_decode = hook_utils.decode_line
+
+        def spy(raw: bytes) -> dict[str, Any] | None:
+            decoded.append(raw)
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", spy)
+
+        assert len(self.stop_points(path)) == 1
+        assert all(b"tool_result" not in raw for raw in decoded)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_prefix_scans(self, tmp_path: Path, seed: int):
+        """Every point's scan is what the Stop hook sees at that prefix."""
+        rng = random.Random(seed)
+        pool = [*LINE_POOL, prompt(), tool_result(), tool_result()]
+        transcript_file = tmp_path / "transcript.jsonl"
+        transcript_file.write_text(
+            "".join(json.dumps(rng.choice(pool)) + "\n" for _ in range(80))
+        )
+        data = transcript_file.read_bytes()
+        prefix_file = tmp_path / "prefix.jsonl"
+        points = self.stop_points(str(transcript_file))
+
+        assert points
+        for point in points:
+            prefix_file.write_bytes(data[: point.offset])
+            assert point.scan == hook_utils.scan_transcript(
+                str(prefix_file), use_checkpoint=False, prefilter=False
+            )
+
+
+class TestBoundedLines:
+    """Tests for reading transcripts without buffering oversized lines."""
+
+    CONTENT = b'{"a": 1}\n\n' + b"x" * 100 + b'\n{"b": 2}\n' + b"y" * 50
+
+    def test_forward_whole_lines(self, tmp_path: Path):
+        """Lines within the limit come whole, newline included."""
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(self.CONTENT)
+
+        with open(path, "rb") as f:
+            lines = list(hook_utils.iter_bounded_lines(f, 1000))
+
+        assert lines == [(line, len(line)) for line in self.CONTENT.splitlines(True)]
+
+    def test_forward_oversized(self, tmp_path: Path, monkeypatch):
+        """Oversized lines come as their head, keeping complete lines' newline."""
+        monkeypatch.setattr(hook_utils, "LINE_HEAD_BYTES", 8)
+        monkeypatch.setattr(hook_utils, "SKIP_CHUNK_BYTES", 7)
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(self.CONTENT)
+
+        with open(path, "rb") as f:
+            lines = list(hook_utils.iter_bounded_lines(f, 20))
+
+        assert lines == [
+            (b'{"a": 1}\n', 9),
+            (b"\n", 1),
+            (b"x" * 8 + b"\n", 101),
+            (b'{"b": 2}\n', 9),
+            (b"y" * 8, 50),
+        ]
+
+    @pytest.mark.parametrize("block_size", [1, 3, 7, 64, 65536])
+    def test_reversed_matches_iter_lines_reversed(self, tmp_path: Path, block_size):
+        """Within the limit, the bounded reader yields the same lines."""
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(self.CONTENT)
+
+        lines = list(
+            hook_utils.iter_bounded_lines_reversed(str(path), 1000, block_size)
+        )
+
+        expected = list(hook_utils.iter_lines_reversed(str(path), block_size))
+        assert lines == [(line, len(line)) for line in expected]
+
+    @pytest.mark.parametrize("block_size", [1, 3, 7, 64, 65536])
+    def test_reversed_oversized(self, tmp_path: Path, monkeypatch, block_size):
+        """Oversized lines come as their head, with their full size."""
+        monkeypatch.setattr(hook_utils, "LINE_HEAD_BYTES", 8)
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"head" + b"x" * 100 + b"\nok\n")
+
+        lines = list(hook_utils.iter_bounded_lines_reversed(str(path), 20, block_size))
+
+        assert lines == [(b"", 0), (b"ok", 2), (b"headxxxx", 104)]
+
+
+class TestOversizedLines:
+    """Tests for classifying oversized lines from their head."""
+
+    @pytest.mark.parametrize(
+        "line,expected",
+        [
+            (assistant("x" * 5000), {"type": "assistant", "short": False}),
+            (
+                {"type": "user", "message": {"content": [{"type": "tool_result"}]}},
+                {"type": "user", "tool_result": True},
+            ),
+            ({"type": "user", "isMeta": True, "message": {"content": "x"}}, {}),
+            ({"type": "system", "content": "x" * 5000}, None),
+        ],
+    )
+    def test_decode_line_head(self, line: dict[str, Any], expected):
+        """Heads say a line's type, whether it's a tool result or isMeta."""
+        raw = json.dumps(line, separators=(",", ":")).encode()
+
+        data = hook_utils.decode_line_head(raw[:100])
+
+        if expected is None:
+            assert data is None
+            return
+        assert data is not None
+        assert data["type"] == line["type"]
+        assert not hook_utils.classify_skill_invocations(data)
+        if "short" in expected:
+            assert hook_utils.is_short_output(data) is expected["short"]
+        content = data["message"]["content"]
+        assert bool(content and content[0]["type"] == "tool_result") is bool(
+            expected.get("tool_result")
+        )
+        assert data.get("isMeta", False) is bool(line.get("isMeta"))
+
+    @pytest.mark.parametrize(
+        "role,tool_result",
+        [("assistant", False), ("user", True), ("user", False)],
+    )
+    def test_type_after_message(self, role: str, tool_result: bool):
+        """As Claude Code writes them: the role decides when type is past the head."""
+        block = (
+            {"type": "tool_result", "content": "x" * 8000}
+            if tool_result
+            else {"type": "text", "text": "x" * 8000}
+        )
+        line = {
+            "parentUuid": "p",
+            "message": {"role": role, "content": [block]},
+            "requestId": "r",
+            "type": role,
+        }
+        raw = json.dumps(line, separators=(",", ":")).encode()
+
+        data = hook_utils.decode_line_head(raw[: hook_utils.LINE_HEAD_BYTES])
+
+        assert data is not None
+        assert data["type"] == role
+        if role == "assistant":
+            assert hook_utils.is_short_output(data) is False
+        content = data["message"]["content"]
+        assert bool(content and content[0]["type"] == "tool_result") is tool_result
+
+    def test_unclassifiable_is_substantial(self):
+        """A head with neither type nor role counts as output, not nothing."""
+        data = hook_utils.decode_line_head(b'{"uuid":"' + b"x" * 200)
+
+        assert data is not None
+        assert hook_utils.is_short_output(data) is False
+
+    def test_large_output_breaks_short_streak(self, write_transcript, monkeypatch):
+        """A message-first oversized output isn't dropped from a streak."""
+        big = {
+            "message": {"role": "assistant", "content": [{"type": "text"}]},
+            "type": "assistant",
+        }
+        big["message"]["content"][0]["text"] = "y" * 8000
+        path = write_transcript(
+            [assistant(), assistant(), big, assistant(), assistant()]
+        )
+        monkeypatch.setattr(hook_utils, "MAX_LINE_BYTES", 1024)
+
+        assert hook_utils.count_consecutive_short_outputs(path) == 2
+        scan = hook_utils.scan_transcript(path, use_checkpoint=False)
+        assert scan.consecutive_short == 2
+
+    @pytest.fixture
+    def big_transcript(self, write_transcript, monkeypatch) -> str:
+        """Transcript with oversized tool results and output, small limit.
+
+        The scan result without a limit is stored as self.expected.
+        """
+        path = write_transcript(
+            [
+                user_command("do", "/tmp/m.md"),
+                skill_call("verify"),
+                {
+                    "type": "user",
+                    "message": {
+                        "content": [
+                            {"type": "tool_result", "content": "isMeta " + "x" * 5000}
+                        ]
+                    },
+                },
+                assistant('"assistant" ' + "y" * 5000),
+                assistant(),
+                assistant(),
+            ]
+        )
+        self.expected = hook_utils.scan_transcript(path, use_checkpoint=False)
+        monkeypatch.setattr(hook_utils, "MAX_LINE_BYTES", 1024)
+        return path
+
+    def limit_decoding(self, monkeypatch) -> None:
+        """Fail the test if anything decodes more than the line limit."""
+        real_decode = hook_utils.decode_line
+
+        def bounded_decode(raw: bytes) -> dict[str, Any] | None:
+            assert len(raw) <= hook_utils.MAX_LINE_BYTES
+            return real_decode(raw)
+
+        monkeypatch.setattr(hook_utils, "decode_line", bounded_decode)
+
+    @pytest.mark.parametrize("prefilter", [True, False])
+    def test_scan(self, big_transcript: str, monkeypatch, prefilter: bool):
+        """Scans give the same answer without decoding oversized lines."""
+        self.limit_decoding(monkeypatch)
+
+        scan = hook_utils.scan_transcript(
+            big_transcript, use_checkpoint=False, prefilter=prefilter
+        )
+
+        assert scan == self.expected
+        assert scan.consecutive_short == 2
+        assert scan.do_flow.has_verify
+
+    def test_tail_queries(self, big_transcript: str, monkeypatch):
+        """Tail reads stop at the oversized substantial output."""
+        self.limit_decoding(monkeypatch)
+
+        assert hook_utils.count_consecutive_short_outputs(big_transcript) == 2
+        assert hook_utils.has_recent_api_error(big_transcript) is False
+
+    def test_stop_points(self, big_transcript: str, monkeypatch):
+        """Turn-by-turn replay handles oversized lines too."""
+        self.limit_decoding(monkeypatch)
+
+        with open(big_transcript, "rb") as f:
+            (point,) = hook_utils.iter_stop_points(f)
+
+        assert point.scan == self.expected
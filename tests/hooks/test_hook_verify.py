@@ -0,0 +1,446 @@
+"""
+Tests for the manifest-dev local runner for bash-method criteria.
+
+Tests which criteria run, pass/fail/timeout records, parallelism, the
+report and the CLI.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import hook_verify  # noqa: E402
+
+import hook_impact  # noqa: E402
+import hook_manifest  # noqa: E402
+
+
+def criterion(item_id: str, verify: str) -> str:
+    """A manifest entry with a verify block (lines indented under verify:)."""
+    body = "\n".join(f"    {line}" for line in verify.splitlines())
+    return (
+        f"- [{item_id}] Description: {item_id}\n  ```yaml\n  verify:\n{body}\n  ```\n"
+    )
+
+
+MANIFEST = (
+    "# Definition: Runner\n"
+    + criterion("INV-G1", 'method: bash\ncommand: "echo ok"')
+    + criterion("INV-G2", "method: bash\ncommand: |\n  echo broken >&2\n  exit 3")
+    + criterion("INV-G3", "method: subagent\nagent: code-bugs-reviewer")
+    + "- [PG-1] Description: not a criterion\n"
+    + criterion("AC-1.1", 'method: bash\ncommand: "pwd"')
+    + criterion("AC-1.2", "method: bash")
+)
+
+
+def items(*verify: str) -> list[hook_manifest.ManifestItem]:
+    """Bash criteria parsed from verify blocks, as AC-1.1, AC-1.2, ..."""
+    text = "".join(
+        criterion(f"AC-1.{n}", block) for n, block in enumerate(verify, start=1)
+    )
+    return hook_verify.bash_criteria(hook_manifest.parse_manifest(text))
+
+
+class TestBashCriteria:
+    """Tests for picking the criteria to run."""
+
+    def test_only_bash_with_command(self, manifest_file: Path):
+        """Criteria with method bash and a command, in manifest order."""
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        found = hook_verify.bash_criteria(manifest)
+
+        assert [item.id for item in found] == ["INV-G1", "INV-G2", "AC-1.1"]
+
+    def test_only_ids(self, manifest_file: Path):
+        """A subset of IDs can be picked."""
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+
+        found = hook_verify.bash_criteria(manifest, ["AC-1.1", "INV-G3"])
+
+        assert [item.id for item in found] == ["AC-1.1"]
+
+    @pytest.mark.parametrize(
+        "block,expected",
+        [
+            ("method: bash\ncommand: x\ntimeout: 5", 5.0),
+            ("method: bash\ncommand: x\ntimeout: 2.5", 2.5),
+            ("method: bash\ncommand: x\ntimeout: 0", 60.0),
+            ("method: bash\ncommand: x\ntimeout: soon", 60.0),
+            ("method: bash\ncommand: x", 60.0),
+        ],
+    )
+    def test_timeout(self, block: str, expected: float):
+        """The verify block's positive timeout, else the default."""
+        (item,) = items(block)
+
+        assert hook_verify.criterion_timeout(item, 60.0) == expected
+
+
+class TestRunCriteria:
+    """Tests for running commands."""
+
+    def test_pass_and_fail(self, tmp_path: Path):
+        """Exit codes decide; output tails and the cwd are recorded."""
+        records = hook_verify.run_criteria(
+            items(
+                'method: bash\ncommand: "pwd"',
+                "method: bash\ncommand: |\n  echo broken >&2\n  exit 3",
+            ),
+            str(tmp_path),
+            jobs=2,
+        )
+
+        assert [r["status"] for r in records] == ["pass", "fail"]
+        assert records[0]["stdout"].strip() == str(tmp_path)
+        assert records[1]["exit_code"] == 3
+        assert records[1]["stderr"] == "broken\n"
+
+    def test_timeout_kills_process_group(self, tmp_path: Path):
+        """A command past its timeout is killed with the processes it started."""
+        marker = tmp_path / "survived"
+        command = f"(sleep 2; touch {marker}) & sleep 30"
+
+        start = time.monotonic()
+        (record,) = hook_verify.run_criteria(
+            items(f"method: bash\ncommand: '{command}'\ntimeout: 0.5"),
+            str(tmp_path),
+            jobs=1,
+        )
+
+        assert record["status"] == "timeout"
+        assert time.monotonic() - start < 10
+        time.sleep(2.5)
+        assert not marker.exists()
+
+    def test_runs_concurrently(self, tmp_path: Path):
+        """Commands overlap up to jobs at a time."""
+        sleeps = ["method: bash\ncommand: sleep 0.5"] * 4
+
+        start = time.monotonic()
+        records = hook_verify.run_criteria(items(*sleeps), str(tmp_path), jobs=4)
+
+        assert all(r["status"] == "pass" for r in records)
+        assert time.monotonic() - start < 1.5
+
+    def test_output_tail(self, tmp_path: Path, monkeypatch):
+        """Only the end of long output is kept."""
+        monkeypatch.setattr(hook_verify, "OUTPUT_TAIL_CHARS", 10)
+
+        (record,) = hook_verify.run_criteria(
+            items("method: bash\ncommand: 'seq 1 1000'"), str(tmp_path), jobs=1
+        )
+
+        assert record["stdout"] == "\n998\n999\n1000\n"[-10:]
+
+    def test_missing_cwd(self, tmp_path: Path):
+        """A command that can't start is an error, not a failure."""
+        (record,) = hook_verify.run_criteria(
+            items("method: bash\ncommand: 'true'"), str(tmp_path / "missing"), jobs=1
+        )
+
+        assert record["status"] == "error"
+        assert record["stderr"]
+
+
+class TestReport:
+    """Tests for the report."""
+
+    def test_summary(self, manifest_file: Path, tmp_path: Path):
+        """Counts per status, and passed only when every criterion passed."""
+        manifest = hook_manifest.load_manifest(str(manifest_file))
+        records = hook_verify.run_criteria(
+            hook_verify.bash_criteria(manifest), str(tmp_path), jobs=2
+        )
+
+        report = hook_verify.build_report(manifest, records, 0.5, 2)
+
+        assert report["passed"] is False
+        assert report["summary"]["criteria"] == 3
+        assert report["summary"]["pass"] == 2
+        assert report["summary"]["fail"] == 1
+        assert [r["id"] for r in report["criteria"]] == ["INV-G1", "INV-G2", "AC-1.1"]
+        text = hook_verify.format_report(report)
+        assert "FAIL    INV-G2" in text
+        assert "    broken" in text
+
+
+class TestCli:
+    """Tests for the command line."""
+
+    def run_cli(self, *args: str, cwd: Path) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "hook_verify.py"), *args],
+            capture_output=True,
+            text=True,
+            cwd=str(cwd),
+        )
+
+    def test_json_report(self, manifest_file: Path, tmp_path: Path):
+        """--json prints the report; a failure exits 1."""
+        result = self.run_cli(str(manifest_file), "--json", cwd=tmp_path)
+
+        assert result.returncode == 1
+        report = json.loads(result.stdout)
+        assert report["summary"]["fail"] == 1
+
+    def test_passing_subset(self, manifest_file: Path, tmp_path: Path):
+        """All selected criteria passing exits 0."""
+        result = self.run_cli(
+            str(manifest_file), "--criteria", "INV-G1,AC-1.1", cwd=tmp_path
+        )
+
+        assert result.returncode == 0
+        assert "2 bash criteria: 2 passed" in result.stdout
+
+    def test_unknown_criteria(self, manifest_file: Path, tmp_path: Path):
+        """IDs that aren't bash criteria exit 2 and are listed, nothing runs."""
+        result = self.run_cli(
+            str(manifest_file), "--criteria", "INV-G1,AC-9.9,INV-G3", cwd=tmp_path
+        )
+
+        assert result.returncode == 2
+        assert result.stdout == ""
+        assert "AC-9.9, INV-G3" in result.stderr
+
+    def test_missing_manifest(self, tmp_path: Path):
+        """An unreadable manifest exits 2."""
+        result = self.run_cli(str(tmp_path / "missing.md"), cwd=tmp_path)
+
+        assert result.returncode == 2
+        assert "Cannot read" in result.stderr
+
+
+def counting(path: Path, block: str = "") -> str:
+    """A verify block whose command appends a line to path each time it runs."""
+    return f"method: bash\ncommand: 'echo run >> {path}'" + block
+
+
+def runs(path: Path) -> int:
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+class TestResultCache:
+    """Tests for caching passes across runs."""
+
+    def test_unchanged_tree_is_cached(self, repo: Path, tmp_path: Path):
+        """A pass on an unchanged working tree isn't run again."""
+        log = tmp_path / "runs.log"
+        criteria = items(counting(log))
+
+        first = hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        second = hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+
+        assert runs(log) == 1
+        assert [r["cached"] for r in first + second] == [False, True]
+        assert second[0]["status"] == "pass"
+
+    def test_uncommitted_change_reruns(self, repo: Path, tmp_path: Path):
+        """Edited and untracked files change the tree hash."""
+        log = tmp_path / "runs.log"
+        criteria = items(counting(log))
+
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        (repo / "app.py").write_text("x = 2\n")
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        (repo / "new.py").write_text("y = 1\n")
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        (repo / "app.py").unlink()
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+
+        assert runs(log) == 4
+
+    def test_index_untouched(self, repo: Path, tmp_path: Path):
+        """Hashing the working tree doesn't stage anything."""
+        (repo / "new.py").write_text("y = 1\n")
+
+        assert hook_verify.working_tree_hash(str(repo))
+        status = subprocess.run(
+            ["git", "status", "--porcelain"], cwd=repo, capture_output=True, text=True
+        )
+        assert status.stdout == "?? new.py\n"
+
+    def test_object_store_untouched(self, repo: Path):
+        """Hashing the working tree writes no objects into the repository."""
+        (repo / "app.py").write_text("x = 2\n")
+        (repo / "new.py").write_text("y = 1\n")
+
+        def objects() -> set[Path]:
+            return set((repo / ".git" / "objects").rglob("*"))
+
+        before = objects()
+        assert hook_verify.working_tree_hash(str(repo))
+        assert objects() == before
+
+    def test_paths_not_on_command_line(self, repo: Path, monkeypatch):
+        """The command line doesn't grow with the changed files, so can't overflow."""
+        for index in range(50):
+            (repo / f"new{index}.py").write_text(f"y = {index}\n")
+        calls: list[list[str]] = []
+        git_output = hook_verify.git_output
+
+        def recording(args: list[str], *rest, **kwargs) -> str | None:
+            calls.append(args)
+            return git_output(args, *rest, **kwargs)
+
+        monkeypatch.setattr(hook_verify, "git_output", recording)
+
+        assert hook_verify.working_tree_hash(str(repo))
+        assert not any("new0.py" in args for args in calls)
+
+    def test_awkward_names(self, repo: Path):
+        """Files named with newlines or leading quotes are hashed by content."""
+        names = ["line\nbreak.py", '"quoted".py', "back\\slash.py"]
+        for name in names:
+            (repo / name).write_text("y = 1\n")
+        before = hook_verify.working_tree_hash(str(repo))
+
+        for name in names:
+            (repo / name).write_text("y = 2\n")
+            after = hook_verify.working_tree_hash(str(repo))
+            assert after and after != before
+            before = after
+
+    def test_changed_definition_reruns(self, repo: Path, tmp_path: Path):
+        """Editing a criterion's verify block invalidates its pass."""
+        log = tmp_path / "runs.log"
+
+        hook_verify.run_criteria(items(counting(log)), str(repo), jobs=1, cache=True)
+        hook_verify.run_criteria(
+            items(counting(log, "\ntimeout: 30")), str(repo), jobs=1, cache=True
+        )
+
+        assert runs(log) == 2
+
+    def test_scope_ignores_other_files(self, repo: Path, tmp_path: Path):
+        """A scoped run reruns only when the scoped files change."""
+        log = tmp_path / "runs.log"
+        criteria = items(counting(log))
+
+        def run() -> None:
+            hook_verify.run_criteria(
+                criteria, str(repo), jobs=1, cache=True, scope=["*.py"]
+            )
+
+        run()
+        (repo / "notes.txt").write_text("unrelated\n")
+        run()
+        assert runs(log) == 1
+
+        (repo / "app.py").write_text("x = 2\n")
+        run()
+        assert runs(log) == 2
+
+    def test_failures_not_cached(self, repo: Path):
+        """A failing criterion runs every time."""
+        criteria = items("method: bash\ncommand: 'exit 1'")
+
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        (record,) = hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+
+        assert record["cached"] is False
+
+    def test_outside_git_not_cached(self, tmp_path: Path, isolated_state_dir: Path):
+        """Without a tree hash or scope there's no key, so nothing is stored."""
+        hook_verify.run_criteria(
+            items("method: bash\ncommand: 'true'"), str(tmp_path), jobs=1, cache=True
+        )
+
+        assert not (isolated_state_dir / "verify").exists()
+
+    def test_expired(self, repo: Path, tmp_path: Path, monkeypatch):
+        """Passes older than the maximum age are run again."""
+        log = tmp_path / "runs.log"
+        criteria = items(counting(log))
+
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+        monkeypatch.setattr(hook_verify, "VERIFY_CACHE_MAX_AGE", -1)
+        hook_verify.run_criteria(criteria, str(repo), jobs=1, cache=True)
+
+        assert runs(log) == 2
+
+    def test_size_eviction(self, isolated_state_dir: Path, monkeypatch):
+        """Past the size cap the oldest entries go first."""
+        cache_dir = isolated_state_dir / "verify"
+        cache_dir.mkdir(parents=True)
+        for age, name in enumerate(["new", "mid", "old"]):
+            entry = cache_dir / f"{name}.json"
+            entry.write_text("x" * 100)
+            os.utime(entry, (time.time() - age * 10, time.time() - age * 10))
+        monkeypatch.setattr(hook_verify, "VERIFY_CACHE_MAX_BYTES", 250)
+
+        hook_verify.prune_cache()
+
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["mid.json", "new.json"]
+
+    def test_prune_throttled(self, repo: Path, tmp_path: Path, monkeypatch):
+        """The cache is pruned at most once per interval, not after every run."""
+        prunes: list[None] = []
+        monkeypatch.setattr(hook_verify, "prune_cache", lambda: prunes.append(None))
+
+        def run(verify: str) -> None:
+            hook_verify.run_criteria(items(verify), str(repo), jobs=1, cache=True)
+
+        run("method: bash\ncommand: 'true'")
+        run("method: bash\ncommand: 'true; true'")
+        assert len(prunes) == 1
+
+        monkeypatch.setattr(hook_verify, "VERIFY_CACHE_PRUNE_INTERVAL", -1)
+        run("method: bash\ncommand: 'true; true; true'")
+        assert len(prunes) == 2
+
+    def test_cli_no_cache(self, manifest_file: Path, repo: Path):
+        """--no-cache runs everything; otherwise passes come from the cache."""
+        args = [str(manifest_file), "--criteria", "INV-G1", "--cwd", str(repo)]
+        cli = TestCli()
+
+        cli.run_cli(*args, cwd=repo)
+        cached = cli.run_cli(*args, cwd=repo)
+        bypassed = cli.run_cli(*args, "--no-cache", cwd=repo)
+
+        assert "1 passed (1 cached)" in cached.stdout
+        assert "1 passed," in bypassed.stdout
+
+    def test_cli_scope(self, manifest_file: Path, tmp_path: Path):
+        """--scope keys passes by the files it names, even outside git."""
+        (tmp_path / "app.py").write_text("x = 1\n")
+        args = [str(manifest_file), "--criteria", "INV-G1", "--scope", "*.py"]
+        cli = TestCli()
+
+        cli.run_cli(*args, cwd=tmp_path)
+        cached = cli.run_cli(*args, cwd=tmp_path)
+        (tmp_path / "app.py").write_text("x = 2\n")
+        changed = cli.run_cli(*args, cwd=tmp_path)
+
+        assert "1 passed (1 cached)" in cached.stdout
+        assert "1 passed," in changed.stdout
+
+
+class TestImpactRecording:
+    """Tests for recording what runs read, for hook_impact."""
+
+    def test_cli_records_output_paths(self, tmp_path: Path):
+        """Files a command names in its output are learned for its criterion."""
+        (tmp_path / "app.py").write_text("")
+        manifest = tmp_path / "manifest.md"
+        manifest.write_text(
+            criterion("AC-1.1", "method: bash\ncommand: 'echo checked app.py'")
+        )
+
+        TestCli().run_cli(str(manifest), "--cwd", str(tmp_path), cwd=tmp_path)
+
+        assert hook_impact.load_learned(str(manifest)) == {"AC-1.1": ["app.py"]}
@@ -6,12 +6,15 @@ Tests the SessionStart hook (compact matcher) that restores /do workflow context
 
 from __future__ import annotations
 
+import contextlib
+import io
 import json
 import subprocess
 import sys
 from pathlib import Path
 from typing import Any
 
+import post_compact_hook
 import pytest
 
 # Path to the hooks directory
@@ -34,18 +37,19 @@ def run_post_compact_hook(
                 f.write(json.dumps(line) + "\n")
         transcript_path = str(transcript_file)
 
-    # Prepare stdin input
     hook_input = {"transcript_path": transcript_path or ""}
-    stdin_data = json.dumps(hook_input)
-
-    result = subprocess.run(
-        [sys.executable, str(HOOKS_DIR / "post_compact_hook.py")],
-        input=stdin_data,
-        capture_output=True,
-        text=True,
-        cwd=str(HOOKS_DIR),
+    return evaluate_in_process(hook_input)
+
+
+def evaluate_in_process(hook_input: dict[str, Any]) -> subprocess.CompletedProcess:
+    """Evaluate the hook in-process, returning what running the script gives."""
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        output = post_compact_hook.evaluate(hook_input)
+    stdout = "" if output is None else json.dumps(output) + "\n"
+    return subprocess.CompletedProcess(
+        args=["post_compact_hook"], returncode=0, stdout=stdout, stderr=stderr.getvalue()
     )
-    return result
 
 
 @pytest.fixture
@@ -0,0 +1,252 @@
+"""
+Tests for manifest-dev pre_compact_hook and compaction snapshots.
+
+Tests the PreCompact hook that snapshots /do workflow state, finding the
+execution log in the transcript, and the post-compact hook restoring
+context from the snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import post_compact_hook  # noqa: E402
+import pre_compact_hook  # noqa: E402
+import workflow_event_hook  # noqa: E402
+
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import do_command, skill_call, tool_result  # noqa: E402
+
+
+def write_call(file_path: str) -> dict[str, Any]:
+    """Assistant Write tool call."""
+    block = {
+        "type": "tool_use",
+        "name": "Write",
+        "input": {"file_path": file_path, "content": "# Execution log"},
+    }
+    return {"type": "assistant", "message": {"content": [block]}}
+
+
+def append_lines(path: str, lines: list[dict[str, Any]]) -> None:
+    """Append lines to a transcript, as compaction does."""
+    with open(path, "a", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+
+
+def recovery_context(transcript: str) -> str | None:
+    """The post-compact hook's reminder, or None."""
+    output = post_compact_hook.evaluate({"transcript_path": transcript})
+    return None if output is None else output["hookSpecificOutput"]["additionalContext"]
+
+
+# An active /do that created its own execution log
+ACTIVE_DO = [
+    do_command("/tmp/m.md"),
+    write_call("/tmp/do-log-20260101-120000.md"),
+    tool_result(),
+]
+
+
+class TestFindDoLogPath:
+    """Tests for finding the execution log the current /do writes to."""
+
+    def test_log_written_by_agent(self, write_transcript):
+        """The newest do-log path after the /do is the log."""
+        path = write_transcript(
+            [*ACTIVE_DO, write_call("/tmp/do-log-20260101-130000.md")]
+        )
+
+        assert hook_utils.find_do_log_path(path) == "/tmp/do-log-20260101-130000.md"
+
+    def test_ignores_older_run(self, write_transcript):
+        """A log from before the last /do belongs to another run."""
+        path = write_transcript([*ACTIVE_DO, do_command("/tmp/other.md")])
+
+        assert hook_utils.find_do_log_path(path) is None
+
+    def test_ignores_skill_placeholder(self, write_transcript):
+        """The /do skill's own do-log-{timestamp}.md template isn't a log."""
+        expansion = {
+            "type": "user",
+            "isMeta": True,
+            "message": {"content": "Create `/tmp/do-log-{timestamp}.md` at start."},
+        }
+        path = write_transcript([do_command("/tmp/m.md"), expansion])
+
+        assert hook_utils.find_do_log_path(path) is None
+
+    def test_deadline(self, write_transcript):
+        """An expired deadline gives no answer rather than a guess."""
+        path = write_transcript(ACTIVE_DO)
+
+        assert hook_utils.find_do_log_path(path, deadline=0.0) is None
+
+    def test_missing_transcript(self, tmp_path: Path):
+        """A missing transcript has no log."""
+        assert hook_utils.find_do_log_path(str(tmp_path / "missing.jsonl")) is None
+
+
+class TestSplitDoArgs:
+    """Tests for reading paths from /do arguments."""
+
+    @pytest.mark.parametrize(
+        "do_args,expected",
+        [
+            ("/tmp/m.md /tmp/l.md", ("/tmp/m.md", "/tmp/l.md")),
+            ("  /tmp/m.md  ", ("/tmp/m.md", None)),
+            (None, (None, None)),
+        ],
+    )
+    def test_split(self, do_args, expected):
+        """The manifest comes first, then the optional log."""
+        assert hook_utils.split_do_args(do_args) == expected
+
+
+class TestPreCompactHook:
+    """Tests for taking the snapshot."""
+
+    def test_snapshots_active_do(self, write_transcript):
+        """The flow, manifest and log are captured."""
+        path = write_transcript(ACTIVE_DO)
+
+        assert pre_compact_hook.evaluate({"transcript_path": path}) is None
+
+        snapshot = hook_utils.load_compact_snapshot(path)
+        assert snapshot is not None
+        assert snapshot.state.has_do and not snapshot.state.has_done
+        assert snapshot.manifest_path == "/tmp/m.md"
+        assert snapshot.log_path == "/tmp/do-log-20260101-120000.md"
+        assert snapshot.offset == os.path.getsize(path)
+
+    def test_log_from_args(self, write_transcript):
+        """A log given to /do is taken from its arguments."""
+        path = write_transcript([do_command("/tmp/m.md /tmp/given.md")])
+
+        pre_compact_hook.evaluate({"transcript_path": path})
+
+        snapshot = hook_utils.load_compact_snapshot(path)
+        assert snapshot is not None
+        assert snapshot.log_path == "/tmp/given.md"
+
+    def test_no_transcript(self, isolated_state_dir: Path):
+        """Without a transcript nothing is written."""
+        assert pre_compact_hook.evaluate({}) is None
+        assert not isolated_state_dir.exists()
+
+    def test_script(self, write_transcript):
+        """Run as Claude Code would, it prints nothing and writes the snapshot."""
+        path = write_transcript(ACTIVE_DO)
+
+        result = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "pre_compact_hook.py")],
+            input=json.dumps({"transcript_path": path, "trigger": "auto"}),
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert result.stdout == ""
+        assert hook_utils.load_compact_snapshot(path) is not None
+
+
+class TestSnapshotRecovery:
+    """Tests for the post-compact hook reading the snapshot."""
+
+    def compact(self, path: str) -> None:
+        """Snapshot, then append what compaction writes."""
+        pre_compact_hook.evaluate({"transcript_path": path})
+        boundary = {"type": "system", "subtype": "compact_boundary"}
+        append_lines(path, [boundary])
+
+    def test_reminder_names_log(self, write_transcript):
+        """The reminder gives the exact log, not a search of /tmp/."""
+        path = write_transcript(ACTIVE_DO)
+        self.compact(path)
+
+        context = recovery_context(path)
+
+        assert context is not None
+        assert "/tmp/m.md" in context
+        assert "/tmp/do-log-20260101-120000.md" in context
+        assert "do-log-*.md" not in context
+
+    def test_reads_snapshot_not_transcript(self, write_transcript, monkeypatch):
+        """A current snapshot answers without reading the flow."""
+        path = write_transcript(ACTIVE_DO)
+        self.compact(path)
+
+        def fail(*args: Any) -> None:
+            raise AssertionError("read the flow")
+
+        monkeypatch.setattr(post_compact_hook, "current_do_flow", fail)
+        output, strategy = post_compact_hook.evaluate_with_strategy(
+            {"transcript_path": path}
+        )
+
+        assert output is not None
+        assert strategy == hook_utils.STRATEGY_SNAPSHOT
+
+    def test_completed_do(self, write_transcript):
+        """A snapshot of a finished /do restores nothing."""
+        path = write_transcript([*ACTIVE_DO, skill_call("manifest-dev:done")])
+        self.compact(path)
+
+        assert recovery_context(path) is None
+
+    def test_stale_after_workflow_event(self, write_transcript):
+        """A workflow event after the snapshot makes it stale."""
+        path = write_transcript(ACTIVE_DO)
+        self.compact(path)
+
+        workflow_event_hook.evaluate(
+            {"transcript_path": path, "prompt": "/manifest-dev:do /tmp/new.md"}
+        )
+
+        assert hook_utils.load_compact_snapshot(path) is None
+        context = recovery_context(path)
+        assert context is not None
+        assert "/tmp/new.md" in context
+
+    def test_stale_when_replaced(self, write_transcript, tmp_path: Path):
+        """A snapshot for a replaced transcript is ignored."""
+        path = write_transcript(ACTIVE_DO)
+        self.compact(path)
+
+        replacement = tmp_path / "replacement.jsonl"
+        replacement.write_text(json.dumps(do_command("/tmp/other.md")) + "\n")
+        os.replace(replacement, path)
+
+        assert hook_utils.load_compact_snapshot(path) is None
+
+    def test_stale_when_old(self, write_transcript, monkeypatch):
+        """A snapshot from an earlier compaction is ignored."""
+        path = write_transcript(ACTIVE_DO)
+        self.compact(path)
+
+        monkeypatch.setattr(hook_utils, "COMPACT_SNAPSHOT_MAX_AGE", -1)
+
+        assert hook_utils.load_compact_snapshot(path) is None
+
+    def test_log_from_args_without_snapshot(self, write_transcript):
+        """Without a snapshot, a log given to /do is still named exactly."""
+        path = write_transcript([do_command("/tmp/m.md /tmp/given.md")])
+
+        context = recovery_context(path)
+
+        assert context is not None
+        assert "Read the execution log to recover progress: /tmp/given.md" in context
@@ -6,12 +6,15 @@ Tests the PreToolUse hook that reminds to read manifest/log before verification.
 
 from __future__ import annotations
 
+import contextlib
+import io
 import json
 import subprocess
 import sys
 from pathlib import Path
 from typing import Any
 
+import pretool_verify_hook
 import pytest
 
 # Path to the hooks directory
@@ -21,17 +24,17 @@ HOOKS_DIR = (
 
 
 def run_pretool_verify_hook(hook_input: dict[str, Any]) -> subprocess.CompletedProcess:
-    """Helper to run the pretool-verify hook with given input."""
-    stdin_data = json.dumps(hook_input)
-
-    result = subprocess.run(
-        [sys.executable, str(HOOKS_DIR / "pretool_verify_hook.py")],
-        input=stdin_data,
-        capture_output=True,
-        text=True,
-        cwd=str(HOOKS_DIR),
+    """Evaluate the hook in-process, returning what running the script gives."""
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        output = pretool_verify_hook.evaluate(hook_input)
+    stdout = "" if output is None else json.dumps(output) + "\n"
+    return subprocess.CompletedProcess(
+        args=["pretool_verify_hook"],
+        returncode=0,
+        stdout=stdout,
+        stderr=stderr.getvalue(),
     )
-    return result
 
 
 class TestPretoolVerifyHookNoOutput:
@@ -329,3 +332,146 @@ class TestPretoolVerifyHookEdgeCases:
         result = run_pretool_verify_hook(hook_input)
 
         assert result.stderr == ""
+
+
+PLAN_MANIFEST = """\
+# Definition: Plan
+
+## 3. Global Invariants (The Constitution)
+- [INV-G1] Description: Tests pass | Verify: bash
+  ```yaml
+  verify:
+    method: bash
+    command: pytest -q
+  ```
+- [INV-G2] Description: No bugs | Verify: subagent
+  ```yaml
+  verify:
+    method: subagent
+    agent: code-bugs-reviewer
+  ```
+
+## 4. Process Guidance (Non-Verifiable)
+- [PG-1] Description: Small commits
+
+## 6. Deliverables (The Work)
+
+### Deliverable 1: Docs
+- [AC-1.1] Description: README explains it | Verify: manual
+- [AC-1.2] Description: Links work
+  ```yaml
+  verify:
+    method: research
+  ```
+- [AC-1.3] Description: Examples run
+"""
+
+
+class TestVerificationPlan:
+    """Tests for the precomputed verification plan."""
+
+    @pytest.fixture
+    def manifest(self, tmp_path: Path) -> Path:
+        path = tmp_path / "manifest.md"
+        path.write_text(PLAN_MANIFEST, encoding="utf-8")
+        return path
+
+    def plan_context(self, args: str, **hook_input: Any) -> str:
+        hook_input = {
+            "tool_name": "Skill",
+            "tool_input": {"skill": "manifest-dev:verify", "args": args},
+            **hook_input,
+        }
+        output = pretool_verify_hook.evaluate(hook_input)
+        assert output is not None
+        return output["hookSpecificOutput"]["additionalContext"]
+
+    def test_groups_criteria_by_verifier(self, manifest: Path):
+        """Every criterion is listed under its verifier, in method order."""
+        context = self.plan_context(f"{manifest} /tmp/log.md")
+
+        assert "5 criteria" in context
+        plan = context[context.index("criteria-checker (bash):") :]
+        assert plan.index("- INV-G1 (line 4): Tests pass") < plan.index(
+            "criteria-checker (research):\n- AC-1.2 (line 24): Links work"
+        )
+        assert "code-bugs-reviewer (subagent):\n- INV-G2 (line 10): No bugs" in plan
+        assert f"{pretool_verify_hook.MANUAL_HEADING}:\n- AC-1.1" in plan
+        assert f"{pretool_verify_hook.UNSPECIFIED_HEADING}:\n- AC-1.3" in plan
+        assert "PG-1" not in plan
+
+    def test_keeps_arguments(self, manifest: Path):
+        """The /verify arguments, including --scope, are still shown."""
+        context = self.plan_context(f"{manifest} /tmp/log.md --scope=src/a.py")
+
+        assert f"Arguments: {manifest} /tmp/log.md --scope=src/a.py" in context
+
+    def test_relative_to_cwd(self, manifest: Path):
+        """A relative manifest path is resolved against the session's cwd."""
+        context = self.plan_context("manifest.md /tmp/log.md", cwd=str(manifest.parent))
+
+        assert "INV-G1" in context
+        assert "5 criteria" in context
+
+    def test_unreadable_manifest_falls_back(self, tmp_path: Path):
+        """Without a readable manifest the generic reminder is used."""
+        context = self.plan_context(f"{tmp_path / 'missing.md'} /tmp/log.md")
+
+        assert "read the manifest and execution log in FULL" in context
+
+    def test_no_criteria_falls_back(self, tmp_path: Path):
+        """A file without criteria gets the generic reminder."""
+        path = tmp_path / "notes.md"
+        path.write_text("# Notes\n")
+
+        context = self.plan_context(f"{path} /tmp/log.md")
+
+        assert "read the manifest and execution log in FULL" in context
+
+    def test_no_cache_writes(self, manifest: Path, isolated_state_dir: Path):
+        """evaluate() holds back the parse-cache write; main() keeps it."""
+        self.plan_context(f"{manifest} /tmp/log.md")
+
+        assert not isolated_state_dir.exists()
+
+        result = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "pretool_verify_hook.py")],
+            input=json.dumps(
+                {
+                    "tool_name": "Skill",
+                    "tool_input": {
+                        "skill": "manifest-dev:verify",
+                        "args": f"{manifest} /tmp/log.md",
+                    },
+                }
+            ),
+            capture_output=True,
+            text=True,
+        )
+
+        assert "5 criteria" in result.stdout
+        assert len(list((isolated_state_dir / "manifests").iterdir())) == 1
+
+    def test_scope_impact(self, tmp_path: Path):
+        """With --scope, the plan says which criteria those files can affect."""
+        path = tmp_path / "scoped.md"
+        scoped = (
+            "- [AC-1.4] Description: Handlers documented\n"
+            "  ```yaml\n  verify:\n    method: codebase\n    scope: [src/handlers]\n"
+            "  ```\n"
+        )
+        path.write_text(PLAN_MANIFEST + scoped, encoding="utf-8")
+
+        context = self.plan_context(
+            f"{path} /tmp/log.md --scope=README.md,docs/a.md", cwd=str(tmp_path)
+        )
+
+        assert "Change impact of the --scope files (README.md, docs/a.md):" in context
+        assert "5 of 6 criteria to re-verify:" in context
+        assert "Unaffected: AC-1.4" in context
+
+    def test_no_scope_no_impact(self, manifest: Path):
+        """Without --scope there's no impact section."""
+        context = self.plan_context(f"{manifest} /tmp/log.md")
+
+        assert "Change impact" not in context
@@ -0,0 +1,132 @@
+"""
+Tests for the synthetic transcript generator used by the hook benchmarks.
+
+The benchmarks are only meaningful if generated transcripts are reproducible
+and parse the way the generator says they do.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "claude-plugins" / "manifest-dev" / "hooks"))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks" / "hooks"))
+
+import bench_hooks  # noqa: E402
+import generate_transcript  # noqa: E402
+
+import hook_utils  # noqa: E402
+
+
+class TestGenerateTranscript:
+    """Tests for generate_transcript."""
+
+    def test_deterministic(self, tmp_path: Path):
+        """Same size and seed produce the same bytes."""
+        first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+        generate_transcript.generate_transcript(first, 256 * 1024, seed=3)
+        generate_transcript.generate_transcript(second, 256 * 1024, seed=3)
+
+        assert first.read_bytes() == second.read_bytes()
+
+    @pytest.mark.parametrize("size", [1024, 64 * 1024, 1024 * 1024])
+    def test_reaches_target_size(self, tmp_path: Path, size: int):
+        """Output is at least the target and overshoots by at most one line."""
+        path = tmp_path / "t.jsonl"
+        stats = generate_transcript.generate_transcript(path, size)
+
+        actual = path.stat().st_size
+        assert actual == stats.size_bytes
+        assert size <= actual < size * 1.5
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_expected_do_flow_matches_scan(self, tmp_path: Path, seed: int):
+        """scan_transcript agrees with the flow the generator wrote."""
+        path = tmp_path / "t.jsonl"
+        stats = generate_transcript.generate_transcript(path, 2 * 1024 * 1024, seed)
+
+        do_flow = hook_utils.scan_transcript(str(path), use_checkpoint=False).do_flow
+
+        assert do_flow.has_do
+        assert do_flow.do_args == stats.do_args
+        assert do_flow.has_verify == stats.has_verify
+        assert do_flow.has_done == stats.has_done
+        assert do_flow.has_escalate == stats.has_escalate
+
+    def test_covers_workflow_events(self, tmp_path: Path):
+        """A mid-sized transcript exercises every event the hooks care about."""
+        stats = generate_transcript.generate_transcript(
+            tmp_path / "t.jsonl", 16 * 1024 * 1024
+        )
+
+        assert stats.do_invocations > 1
+        assert stats.compactions > 0
+        assert stats.api_errors > 0
+        assert set(stats.skills) == {"verify", "done", "escalate"}
+
+    def test_parse_size(self):
+        """Sizes parse with and without units."""
+        assert generate_transcript.parse_size("512") == 512
+        assert generate_transcript.parse_size("64KB") == 64 * 1024
+        assert generate_transcript.parse_size("1gb") == 1024**3
+        assert generate_transcript.format_size(16 * 1024**2) == "16MB"
+
+
+class TestCompare:
+    """Tests for flagging regressions against a baseline."""
+
+    def measurement(self, seconds: float, rss: int = 20_000) -> bench_hooks.Measurement:
+        return bench_hooks.Measurement(
+            target="stop_do_hook",
+            kind="hook",
+            size="1MB",
+            size_bytes=1024 * 1024,
+            lines=200,
+            seconds=seconds,
+            peak_rss_kb=rss,
+        )
+
+    def baseline(self, seconds: float, rss: int = 20_000) -> dict:
+        return {
+            "results": [
+                {
+                    "target": "stop_do_hook",
+                    "size": "1MB",
+                    "seconds": seconds,
+                    "peak_rss_kb": rss,
+                }
+            ]
+        }
+
+    def test_flags_slowdown(self):
+        """Slower than tolerance x baseline is a regression."""
+        regressions = bench_hooks.compare(
+            [self.measurement(0.2)], self.baseline(0.1), 1.5
+        )
+
+        assert len(regressions) == 1
+        assert "stop_do_hook @ 1MB" in regressions[0]
+
+    def test_flags_memory_growth(self):
+        """Peak RSS beyond tolerance x baseline is a regression."""
+        regressions = bench_hooks.compare(
+            [self.measurement(0.1, rss=50_000)], self.baseline(0.1), 1.5
+        )
+
+        assert len(regressions) == 1
+        assert "peak RSS" in regressions[0]
+
+    def test_ignores_noise_on_tiny_timings(self):
+        """Sub-millisecond timings aren't compared by ratio."""
+        assert (
+            bench_hooks.compare([self.measurement(0.0004)], self.baseline(0.0001), 1.5)
+            == []
+        )
+
+    def test_ignores_unknown_targets(self):
+        """Targets missing from the baseline aren't regressions."""
+        assert bench_hooks.compare([self.measurement(1.0)], {"results": []}, 1.5) == []
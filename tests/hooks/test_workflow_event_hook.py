@@ -0,0 +1,290 @@
+"""
+Tests for manifest-dev workflow_event_hook and the workflow event log.
+
+Tests the PostToolUse(Skill) / UserPromptSubmit hook that records /do workflow
+transitions, and the Stop and post-compact hooks reading them back without
+scanning the transcript.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Path to the hooks directory
+HOOKS_DIR = (
+    Path(__file__).parent.parent.parent / "claude-plugins" / "manifest-dev" / "hooks"
+)
+sys.path.insert(0, str(HOOKS_DIR))
+
+import workflow_event_hook  # noqa: E402
+
+import hook_utils  # noqa: E402
+from tests.hooks.conftest import do_command, skill_call  # noqa: E402
+
+DO_COMMAND = {
+    "type": "user",
+    "message": {
+        "content": "<command-name>/do</command-name><command-args>/tmp/transcript-do.md</command-args>"
+    },
+}
+
+
+def run_hook(hook_name: str, hook_input: dict[str, Any]) -> subprocess.CompletedProcess:
+    """Run a hook script as Claude Code would."""
+    return subprocess.run(
+        [sys.executable, str(HOOKS_DIR / f"{hook_name}.py")],
+        input=json.dumps(hook_input),
+        capture_output=True,
+        text=True,
+        cwd=str(HOOKS_DIR),
+    )
+
+
+def skill_event(transcript: str, skill: str, args: str = "") -> dict[str, Any]:
+    """PostToolUse input for a Skill tool call."""
+    return {
+        "hook_event_name": "PostToolUse",
+        "transcript_path": transcript,
+        "tool_name": "Skill",
+        "tool_input": {"skill": f"manifest-dev:{skill}", "args": args},
+        "tool_response": {},
+    }
+
+
+def prompt_event(transcript: str, prompt: str) -> dict[str, Any]:
+    """UserPromptSubmit input for a typed prompt."""
+    return {
+        "hook_event_name": "UserPromptSubmit",
+        "transcript_path": transcript,
+        "prompt": prompt,
+    }
+
+
+@pytest.fixture
+def transcript(tmp_path: Path) -> str:
+    """Transcript with a little unrelated conversation."""
+    path = tmp_path / "transcript.jsonl"
+    line = {"type": "user", "message": {"content": "hello"}}
+    path.write_text(json.dumps(line) + "\n", encoding="utf-8")
+    return str(path)
+
+
+class TestParseWorkflowEvent:
+    """Tests for recognizing workflow transitions in hook inputs."""
+
+    @pytest.mark.parametrize(
+        "prompt,expected",
+        [
+            ("/do /tmp/m.md", ("do", "/tmp/m.md")),
+            ("/manifest-dev:do /tmp/m.md /tmp/log.md", ("do", "/tmp/m.md /tmp/log.md")),
+            ("  /verify  ", ("verify", None)),
+            (
+                "/escalate blocked on credentials",
+                ("escalate", "blocked on credentials"),
+            ),
+            ("/other-plugin:do x", None),
+            ("/doctor", None),
+            ("please do /do later", None),
+            ("", None),
+        ],
+    )
+    def test_prompts(self, prompt: str, expected):
+        """Only slash commands for workflow skills are events."""
+        assert workflow_event_hook.parse_workflow_event({"prompt": prompt}) == expected
+
+    def test_skill_calls(self):
+        """Skill tool calls match plain and plugin-qualified names."""
+        parse = workflow_event_hook.parse_workflow_event
+
+        assert parse(skill_event("t", "done")) == ("done", None)
+        assert parse(skill_event("t", "do", " /tmp/m.md ")) == ("do", "/tmp/m.md")
+        assert parse(skill_event("t", "define")) is None
+        assert parse({"tool_name": "Bash", "tool_input": {"command": "ls"}}) is None
+
+
+class TestRecordWorkflowEvent:
+    """Tests for appending to and reading the workflow event log."""
+
+    def test_records_transitions(self, transcript: str):
+        """Each event advances the recorded flow."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/m.md")
+        hook_utils.record_workflow_event(transcript, "verify")
+
+        state = hook_utils.load_workflow_state(transcript)
+
+        assert state is not None
+        assert (state.has_do, state.has_verify, state.has_done) == (True, True, False)
+        assert state.do_args == "/tmp/m.md"
+
+    def test_new_do_resets(self, transcript: str):
+        """A /do with args starts a fresh flow."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/first.md")
+        hook_utils.record_workflow_event(transcript, "done")
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/second.md")
+
+        state = hook_utils.load_workflow_state(transcript)
+
+        assert state is not None
+        assert not state.has_done
+        assert state.do_args == "/tmp/second.md"
+
+    def test_missing_log(self, transcript: str):
+        """No log means no answer - callers fall back to the transcript."""
+        assert hook_utils.load_workflow_state(transcript) is None
+
+    def test_first_event_seeds_from_transcript(self, transcript: str):
+        """A /done with no log yet builds on the /do already in the transcript."""
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(json.dumps(DO_COMMAND) + "\n")
+
+        hook_utils.record_workflow_event(transcript, "done")
+        state = hook_utils.load_workflow_state(transcript)
+
+        assert state is not None
+        assert state.has_done
+        assert state.do_args == "/tmp/transcript-do.md"
+
+    def test_replaced_transcript_is_stale(self, transcript: str):
+        """A log recorded for another file at the same path is ignored."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/m.md")
+        replacement = Path(transcript).with_name("replacement.jsonl")
+        replacement.write_text(Path(transcript).read_text() * 2)
+        replacement.replace(transcript)
+
+        assert hook_utils.load_workflow_state(transcript) is None
+
+    def test_truncated_transcript_is_stale(self, transcript: str):
+        """A transcript shorter than when the event was recorded is rewritten."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/m.md")
+        with open(transcript, "r+", encoding="utf-8") as f:
+            f.truncate(3)
+
+        assert hook_utils.load_workflow_state(transcript) is None
+
+    def test_catches_up_missed_events(self, transcript: str):
+        """Invocations past the last event count even if never recorded."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/first.md")
+        hook_utils.record_workflow_event(transcript, "done")
+        # A new /do whose hook event was lost
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(json.dumps(skill_call("manifest-dev:do", "/tmp/second.md")))
+            f.write("\n")
+
+        state = hook_utils.load_workflow_state(transcript)
+
+        assert state is not None
+        assert (state.has_do, state.has_done) == (True, False)
+        assert state.do_args == "/tmp/second.md"
+
+    def test_catch_up_past_deadline(self, transcript: str):
+        """A catch-up that can't finish in time defers to the caller's scan."""
+        hook_utils.record_workflow_event(transcript, "do", "/tmp/m.md")
+        with open(transcript, "a", encoding="utf-8") as f:
+            for _ in range(200):
+                f.write(json.dumps(skill_call("manifest-dev:verify")) + "\n")
+
+        assert hook_utils.load_workflow_state(transcript, deadline=0.0) is None
+        assert hook_utils.load_workflow_state(transcript) is not None
+
+    def test_seed_scan_past_deadline(self, transcript: str):
+        """The first event records nothing if seeding can't finish in time."""
+        with open(transcript, "a", encoding="utf-8") as f:
+            for _ in range(200):
+                f.write(json.dumps(do_command("/tmp/m.md")) + "\n")
+
+        assert (
+            hook_utils.record_workflow_event(transcript, "done", deadline=0.0) is None
+        )
+        assert hook_utils.load_workflow_state(transcript) is None
+
+    def test_ignores_non_workflow_skills(self, transcript: str):
+        """Only WORKFLOW_SKILLS are recorded."""
+        assert hook_utils.record_workflow_event(transcript, "define") is None
+        assert hook_utils.load_workflow_state(transcript) is None
+
+
+class TestWorkflowEventHook:
+    """Tests for the hook script and the hooks reading its log."""
+
+    def test_prompt_records_without_output(self, transcript: str):
+        """UserPromptSubmit records the /do and adds nothing to context."""
+        result = run_hook(
+            "workflow_event_hook", prompt_event(transcript, "/do /tmp/m.md")
+        )
+
+        assert result.returncode == 0
+        assert result.stdout == ""
+        state = hook_utils.load_workflow_state(transcript)
+        assert state is not None and state.do_args == "/tmp/m.md"
+
+    def test_ordinary_prompt_writes_nothing(
+        self, transcript: str, isolated_state_dir: Path
+    ):
+        """Non-workflow prompts don't create a log."""
+        result = run_hook(
+            "workflow_event_hook", prompt_event(transcript, "fix the bug")
+        )
+
+        assert result.returncode == 0
+        assert not (isolated_state_dir / "workflow").exists()
+
+    def test_invalid_input(self):
+        """Unreadable input is ignored (fail open)."""
+        result = subprocess.run(
+            [sys.executable, str(HOOKS_DIR / "workflow_event_hook.py")],
+            input="not json",
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert result.stdout == ""
+
+    def test_stop_hook_uses_log(self, transcript: str):
+        """The Stop hook blocks on a /do known only from the log."""
+        run_hook("workflow_event_hook", prompt_event(transcript, "/do /tmp/m.md"))
+
+        result = run_hook("stop_do_hook", {"transcript_path": transcript})
+
+        assert json.loads(result.stdout)["decision"] == "block"
+
+    def test_stop_hook_allows_after_logged_done(self, transcript: str):
+        """A /done in the log allows the stop even if the transcript lags."""
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(json.dumps(DO_COMMAND) + "\n")
+        run_hook("workflow_event_hook", skill_event(transcript, "done"))
+
+        result = run_hook("stop_do_hook", {"transcript_path": transcript})
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == ""
+
+    def test_stop_hook_reads_api_error_from_tail(self, transcript: str):
+        """With the log blocking, an API error at the tail still allows."""
+        run_hook("workflow_event_hook", prompt_event(transcript, "/do /tmp/m.md"))
+        api_error = {
+            "type": "assistant",
+            "isApiErrorMessage": True,
+            "message": {"content": [{"type": "text", "text": "API Error: 529"}]},
+        }
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(json.dumps(api_error) + "\n")
+
+        result = run_hook("stop_do_hook", {"transcript_path": transcript})
+
+        assert result.stdout.strip() == ""
+
+    def test_post_compact_uses_log(self, transcript: str):
+        """The post-compact reminder names the /do args from the log."""
+        run_hook("workflow_event_hook", prompt_event(transcript, "/do /tmp/logged.md"))
+
+        result = run_hook("post_compact_hook", {"transcript_path": transcript})
+
+        context = json.loads(result.stdout)["hookSpecificOutput"]["additionalContext"]
+        assert "/tmp/logged.md" in context